@@ -3,12 +3,18 @@
 Voice Virtual Assistant using ElevenLabs and OpenAI
 """
 
+from startup import load_in_background, report_ready  # First: records the launch time
 import os
 import sys
 import speech_recognition as sr
 from elevenlabs.client import ElevenLabs
 from openai import OpenAI
 from dotenv import load_dotenv
+from audio_output import default_sink
+from capture import CaptureSession
+from stt import StreamingTranscriber, create_stt
+from wake_word import attach_wake_word
+from voice_pipeline import VoicePipeline
 
 # Load environment variables
 load_dotenv()
@@ -17,47 +23,94 @@ load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+ELEVENLABS_OUTPUT_FORMAT = "pcm_22050"  # Raw 16-bit PCM: playable as it arrives, no MP3 decoding
+ELEVENLABS_SAMPLE_RATE = int(ELEVENLABS_OUTPUT_FORMAT.split("_")[1])
+STT_ENGINE = "google"  # google, vosk, whisper or auto (offline if available)
+FULL_DUPLEX = True  # Keep listening while speaking; talking over the assistant interrupts it
+WAKE_WORD = None  # "hey_jarvis" (openWakeWord) or a folder of your recordings; None: always listen
+EXIT_WORDS = ["exit", "quit", "goodbye"]
+STOP_WORDS = ["stop", "cancel"]  # Interrupt the reply, keep listening
 
 if not ELEVENLABS_API_KEY or not OPENAI_API_KEY:
     print("Error: Missing API keys. Please set them in .env file.")
     sys.exit(1)
 
+# Speech-to-text engine, loaded in the background so listening can start right away
+stt_engine = load_in_background(create_stt, STT_ENGINE)
 eleven_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Speakers, kept open between replies
+audio_sink = default_sink()
+
 # Conversation history
 conversation_history = [
     {"role": "system", "content": "You are a helpful voice assistant. Keep responses concise and conversational."}
 ]
 
 
+def recognize_speech(audio):
+    """
+    Convert captured audio to text using the configured speech-to-text engine
+    """
+    try:
+        print("\r\033[KProcessing speech...")  # Overwrites the last partial result
+        text = stt_engine.result().transcribe(audio)
+        print(f"You said: {text}")
+        return text
+    except sr.UnknownValueError:
+        print("Could not understand audio. Try speaking more clearly.")
+        return None
+    except sr.RequestError as e:
+        print(f"Could not request results; {e}")
+        return None
+
+
+# Microphone session: opened once, noise floor tracked in the background
+capture_session = None
+
+
+def show_partial(text):
+    """Show what the recognizer has heard so far"""
+    print(f"\r\033[K   … {text}", end="", flush=True)
+
+
+def attach_streaming_stt(future):
+    """Once the STT engine is loaded, transcribe while the user is still talking"""
+    if future.exception() is None and future.result().streaming:
+        capture_session.set_stream_listener(StreamingTranscriber(future.result(), on_partial=show_partial))
+
+
+def get_capture_session():
+    """Open the shared microphone session on first use"""
+    global capture_session
+    if capture_session is None:
+        capture_session = CaptureSession()
+        if WAKE_WORD:
+            attach_wake_word(capture_session, WAKE_WORD)
+        stt_engine.add_done_callback(attach_streaming_stt)
+        capture_session.open()
+    return capture_session
+
+
 def listen_to_microphone():
     """
-    Capture audio from microphone and convert to text using Google Speech Recognition
+    Capture audio from microphone and convert to text
     """
-    recognizer = sr.Recognizer()
-    recognizer.energy_threshold = 4000  # Adjust based on ambient noise
-    recognizer.dynamic_energy_threshold = True
-    
-    with sr.Microphone() as source:
+    session = get_capture_session()
+    report_ready()
+    if session.wake_word:
+        print("Listening... (say the wake word first)")
+    else:
         print("Listening... (speak now)")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        
-        try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
-            print("Processing speech...")
-            text = recognizer.recognize_google(audio)
-            print(f"You said: {text}")
-            return text
-        except sr.WaitTimeoutError:
-            print("No speech detected. Speak louder or closer to the microphone.")
-            return None
-        except sr.UnknownValueError:
-            print("Could not understand audio. Try speaking more clearly.")
-            return None
-        except sr.RequestError as e:
-            print(f"Could not request results; {e}")
-            return None
+    session.clear()  # Drop anything captured while we were talking
+    
+    audio = session.listen(timeout=None if session.wake_word else 10)
+    if audio is None:
+        print("No speech detected. Speak louder or closer to the microphone.")
+        return None
+    
+    return recognize_speech(audio)
 
 
 def get_ai_response(user_input):
@@ -83,29 +136,35 @@ def get_ai_response(user_input):
         return "I'm sorry, I encountered an error processing your request."
 
 
-def speak_with_elevenlabs(text):
+def stream_elevenlabs(text):
+    """Raw PCM chunks of the spoken text, as ElevenLabs sends them"""
+    return eleven_client.generate(
+        text=text,
+        voice=ELEVENLABS_VOICE_ID,
+        model="eleven_monolingual_v1",
+        stream=True,
+        output_format=ELEVENLABS_OUTPUT_FORMAT
+    )
+
+
+def speak_with_elevenlabs(text, synthesize=stream_elevenlabs):
     """
-    Convert text to speech using ElevenLabs and play it
+    Convert text to speech using ElevenLabs and play it.
+    Playback starts with the first chunk instead of after the whole reply
+    was downloaded; synthesize can be swapped for a fake chunk generator.
     """
     try:
         print(f"Assistant: {text}")
-        audio = eleven_client.generate(
-            text=text,
-            voice=ELEVENLABS_VOICE_ID,
-            model="eleven_monolingual_v1"
-        )
-        # Convert generator to bytes
-        audio_bytes = b''.join(audio)
-        # Play using a simple method
-        import io
-        from pydub import AudioSegment
-        from pydub.playback import play
-        audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
-        play(audio_segment)
+        audio_sink.play_stream(synthesize(text), ELEVENLABS_SAMPLE_RATE)
     except Exception as e:
         print(f"Error with text-to-speech: {e}")
 
 
+def stop_speaking():
+    """Interrupt the current reply"""
+    audio_sink.stop()
+
+
 def list_available_voices():
     """
     List all available ElevenLabs voices
@@ -119,6 +178,39 @@ def list_available_voices():
         print(f"Error listing voices: {e}")
 
 
+def run_full_duplex():
+    """
+    Listen, think and speak concurrently.
+    The microphone stays open while the assistant talks, and speaking over
+    it cancels the rest of the current answer.
+    """
+    pipeline = None
+    
+    def on_command(text):
+        if text.lower() in EXIT_WORDS:
+            pipeline.say("Goodbye! Have a great day!")  # Through the TTS stage, after the reply
+            pipeline.stop()
+            return True
+        if text.lower() in STOP_WORDS:
+            return True  # Barge-in already silenced the reply
+        if "list voices" in text.lower():
+            list_available_voices()
+            return True
+        return False
+    
+    pipeline = VoicePipeline(
+        capture=get_capture_session(),
+        recognize=recognize_speech,
+        respond=lambda text, on_sentence, cancel_event: get_ai_response(text),
+        speak=speak_with_elevenlabs,
+        stop_speaking=stop_speaking,
+        handle_command=on_command
+    )
+    report_ready()
+    print("Listening... (speak any time, talk over me to interrupt)")
+    pipeline.run()
+
+
 def main():
     """
     Main loop for the voice assistant
@@ -130,6 +222,10 @@ def main():
     print("- Press Ctrl+C to exit\n")
     
     try:
+        if FULL_DUPLEX:
+            run_full_duplex()
+            return
+        
         while True:
             # Listen for user input
             user_input = listen_to_microphone()
@@ -138,9 +234,11 @@ def main():
                 continue
             
             # Check for exit commands
-            if user_input.lower() in ["exit", "quit", "goodbye", "stop"]:
+            if user_input.lower() in EXIT_WORDS:
                 speak_with_elevenlabs("Goodbye! Have a great day!")
                 break
+            if user_input.lower() in STOP_WORDS:
+                continue  # Nothing is playing while we listen
             
             # Check for list voices command
             if "list voices" in user_input.lower():
@@ -7,174 +7,409 @@ Enhanced FREE Voice Virtual Assistant
 - Configurable settings
 """
 
-import os
+from startup import load_in_background, report_ready  # First: records the launch time
 import sys
-import json
+from contextlib import contextmanager
 import speech_recognition as sr
-import subprocess
 import requests
 from datetime import datetime
-from pathlib import Path
 from jarvis_voice import JarvisVoice
+from history_store import HistoryStore
+from memory_index import MemoryIndex, create_embedder
+from response_cache import ResponseCache, is_cacheable
+from telemetry import Tracer, ollama_stats
+from intents import (IntentRouter, spoken_time, spoken_date, TIME_PATTERNS, DATE_PATTERNS, EXIT_PATTERNS,
+                     STOP_PATTERNS)
+from capture import CaptureSession
+from stt import StreamingTranscriber, create_stt
+from wake_word import attach_wake_word
+from voice_pipeline import VoicePipeline
+from ollama_client import (OllamaClient, PromptContext, FragmentCounter, ROLE_STOP_SEQUENCES,
+                           format_history, iter_sentences, iter_until_stop)
+from llm_backends import LLMRequest, BackendError, OllamaBackend, OpenAIBackend, HedgedLLM
+from sentence_stream import split_sentences
 
 # Configuration
 CONFIG = {
-    "voice": "Jarvis",  # Options: Jarvis, Samantha, Alex, Daniel, Karen, Moira, etc.
-    "speech_rate": 200,   # Words per minute (default 200, range 90-720)
+    "voice": "Jarvis",  # Jarvis, or a voice of a lighter engine (macOS: Samantha, Daniel, ...; espeak: en-gb, ...)
+    "speech_rate": 200,   # Words per minute of the lighter engines (default 200, range 90-720)
     "model": "qwen2.5:1.5b",    # Smaller, faster model for low-end Macs
     "save_history": True,
-    "history_file": "conversation_history.json",
-    "use_jarvis": True  # Use Jarvis voice (Coqui TTS)
+    "history_file": "conversation_history.json",  # Legacy file, migrated once into history_db
+    "history_db": "conversation_history.db",
+    "history_window": 10,  # Recent exchanges kept in memory for context
+    "context_tokens": 1536,  # Token budget for the conversation sent to the model
+    "memory": True,  # Recall related exchanges from the whole history
+    "memory_dir": "memory_index",
+    "memory_embedder": "hashing",  # hashing (no model) or ollama (uses embedding_model)
+    "embedding_model": "nomic-embed-text",
+    "memory_k": 3,  # Past exchanges recalled per turn
+    "memory_tokens": 256,  # Token budget for recalled exchanges
+    "use_jarvis": True,  # Use Jarvis voice (Coqui TTS)
+    "tts_engines": ["piper", "espeak", "say"],  # Lighter voices, used where they're installed
+    "tts_latency_budget": 2.0,  # Seconds a phrase may take to synthesize before a faster voice is used
+    "tts_backend": "torch",  # Jarvis voice on the CPU: "torch", "onnx" (pip install onnx) or "default"
+    "keep_alive": "30m",  # How long Ollama keeps the model loaded between turns
+    "fallback_backend": None,  # "openai": also ask an OpenAI-compatible server (OPENAI_BASE_URL, OPENAI_API_KEY) when Ollama is slow
+    "fallback_model": "gpt-4o-mini",
+    "hedge_after": 2.0,  # Seconds without a first token from Ollama before the fallback is asked too
+    "stream_responses": True,  # Speak each sentence while the model is still generating
+    "full_duplex": True,  # Keep listening while speaking; talking over the assistant interrupts it
+    "stt_engine": "auto",  # auto (offline if available), vosk, whisper, google
+    "wake_word": None,  # "hey_jarvis" (openWakeWord) or a folder of your recordings; None: always listen
+    "max_sentences": 2,  # Keep spoken replies short
+    "early_stop": True,  # Stop generating as soon as max_sentences sentences are complete
+                         # (no final chunk then: the next turn re-sends the history, see context_lost)
+    "response_cache": True,  # Answer repeated questions without calling the model
+    "response_cache_db": "response_cache.db",
+    "response_cache_ttl": 7 * 24 * 3600,  # Seconds a cached answer stays valid
+    "intent_log": "intent_log.jsonl",  # Routing decisions (local vs model); None to disable
+    "trace_file": "trace.jsonl",  # Per-stage timing spans; None to disable
+    "metrics_port": None  # e.g. 9464 to serve Prometheus metrics at /metrics
 }
 
-# Conversation history
+# Generation options sent to Ollama (also part of the response cache key)
+GENERATION_OPTIONS = {
+    "temperature": 0.7,
+    "num_predict": 100,
+    "top_p": 0.9,
+    "stop": ROLE_STOP_SEQUENCES  # Don't let the model write the user's next turn
+}
+
+# Conversation history (recent exchanges only; the full history lives in history_store)
 conversation_history = []
+history_store = None
+memory_index = None
+
+# Speech-to-text engine (offline Vosk/Whisper when installed, Google otherwise),
+# loaded in the background so listening can start right away
+stt_engine = load_in_background(create_stt, CONFIG["stt_engine"])
+
+# Per-stage timing (capture, STT, LLM, TTS)
+tracer = Tracer(CONFIG["trace_file"], labels={"assistant": "enhanced"})
+
+# Shared Ollama client (pooled connection, bounded timeouts)
+ollama = OllamaClient(keep_alive=CONFIG["keep_alive"])
+
+
+def create_llm():
+    """Ollama first; with a fallback backend configured, slow turns are hedged to it"""
+    backends = [OllamaBackend(ollama, CONFIG["model"], GENERATION_OPTIONS)]
+    if CONFIG["fallback_backend"] == "openai":
+        backends.append(OpenAIBackend(CONFIG["fallback_model"], max_tokens=GENERATION_OPTIONS["num_predict"],
+                                      temperature=GENERATION_OPTIONS["temperature"],
+                                      stop=GENERATION_OPTIONS.get("stop")))
+    return HedgedLLM(backends, CONFIG["hedge_after"])
+
+
+llm = create_llm()
+
+# Conversation state kept by Ollama between turns, so only the new input is evaluated
+SYSTEM_PROMPT = "You are a helpful, friendly voice assistant. Keep responses brief (1-2 sentences) and conversational."
+prompt_context = PromptContext(SYSTEM_PROMPT, CONFIG["context_tokens"], GENERATION_OPTIONS["num_predict"])
+
+# Cached answers to repeated questions, persisted across restarts
+response_cache = None
+if CONFIG["response_cache"]:
+    try:
+        response_cache = ResponseCache(CONFIG["response_cache_db"], ttl_seconds=CONFIG["response_cache_ttl"])
+    except Exception as e:
+        print(f"Warning: Could not open response cache: {e}")
 
 
 def check_ollama_installed():
     """Check if Ollama is installed and running"""
-    try:
-        response = requests.get("http://localhost:11434/api/tags")
-        return response.status_code == 200
-    except:
-        return False
+    return ollama.is_available()
 
 
 def load_conversation_history():
-    """Load previous conversation history"""
-    history_path = Path(CONFIG["history_file"])
-    if history_path.exists():
-        try:
-            with open(history_path, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    """Open the history store and load the most recent exchanges"""
+    global history_store
+    try:
+        history_store = HistoryStore(CONFIG["history_db"])
+        migrated = history_store.migrate_json(CONFIG["history_file"])
+        if migrated:
+            print(f"📦 Migrated {migrated} messages from {CONFIG['history_file']}")
+        open_memory_index()
+        return history_store.recent(CONFIG["history_window"])
+    except Exception as e:
+        print(f"Warning: Could not open history: {e}")
+        return []
+
+
+def open_memory_index():
+    """Open the memory index and index any exchanges it hasn't seen (in the background)"""
+    global memory_index
+    if not CONFIG["memory"]:
+        return
+    try:
+        embedder = create_embedder(CONFIG["memory_embedder"], ollama, CONFIG["embedding_model"])
+        memory_index = MemoryIndex(CONFIG["memory_dir"], embedder)
+        load_in_background(memory_index.sync, history_store)
+    except Exception as e:
+        print(f"Warning: Could not open memory index: {e}")
 
 
-def save_conversation_history():
-    """Save conversation history to file"""
-    if CONFIG["save_history"]:
+def save_conversation_history(entry):
+    """Append one exchange to the history store (and the memory index)"""
+    if CONFIG["save_history"] and history_store:
         try:
-            with open(CONFIG["history_file"], 'w') as f:
-                json.dump(conversation_history, f, indent=2)
+            entry["id"] = history_store.append(entry)
+            if memory_index:
+                load_in_background(memory_index.sync, history_store)
         except Exception as e:
             print(f"Warning: Could not save history: {e}")
 
 
-def list_available_voices():
-    """List all available macOS voices"""
+def recall_memories(user_input, history):
+    """Past exchanges related to user_input, outside the recent window, as prompt text"""
+    if not (memory_index and history_store):
+        return ""
     try:
-        result = subprocess.run(["say", "-v", "?"], capture_output=True, text=True)
-        print("\n=== Available Voices ===")
-        voices = []
-        for line in result.stdout.split('\n')[:30]:  # Show first 30
-            if line.strip():
-                voice_name = line.split()[0]
-                voices.append(voice_name)
-                print(f"  - {voice_name}")
-        return voices
+        recent_ids = {entry["id"] for entry in history if "id" in entry}
+        hits = memory_index.search(user_input, k=CONFIG["memory_k"], exclude=recent_ids)
+        # Least similar first: format_history keeps the end of the list when trimming
+        entries = history_store.get([history_id for history_id, score in reversed(hits)])
     except Exception as e:
-        print(f"Error listing voices: {e}")
-        return []
+        print(f"Warning: Could not search memory: {e}")
+        return ""
+    text = format_history(entries, CONFIG["memory_tokens"])
+    return f"(Earlier conversation that may be relevant:\n{text})\n" if text else ""
+
+
+def list_available_voices():
+    """List the voices of every installed TTS engine"""
+    print("\n=== Available Voices ===")
+    voices = []
+    for engine, names in jarvis_tts.voices().items():
+        if engine == "jarvis":
+            names = ["Jarvis"] if jarvis_tts.coqui.is_ready() else []
+        names = names[:30]  # Show first 30
+        if names:
+            print(f"  {engine}: {', '.join(names)}")
+        voices.extend(names)
+    return voices
 
 
 def test_voice(voice_name):
     """Test a specific voice"""
+    engine = jarvis_tts.coqui if voice_name == "Jarvis" else jarvis_tts.set_voice(voice_name)
+    if engine is None or not engine.is_ready():
+        print(f"⚠️  No installed engine has the voice {voice_name}")
+        return
     try:
-        subprocess.run(["say", "-v", voice_name, f"Hello! My name is {voice_name}"], check=True)
+        jarvis_tts.speak(f"Hello! My name is {voice_name}", engine=engine)
     except Exception as e:
         print(f"Error testing voice: {e}")
 
 
+def recognize_speech(audio):
+    """
+    Convert captured audio to text using the configured speech-to-text engine
+    """
+    try:
+        print("\r\033[K⏳ Processing speech...")  # Overwrites the last partial result
+        engine = stt_engine.result()
+        with tracer.span("stt", engine=engine.name):
+            text = engine.transcribe(audio)
+        print(f"💬 You: {text}")
+        return text
+    except sr.UnknownValueError:
+        print("❓ Could not understand audio.")
+        return None
+    except sr.RequestError as e:
+        print(f"❌ Speech recognition error: {e}")
+        return None
+
+
+# Microphone session: opened once, noise floor tracked in the background
+capture_session = None
+
+
+def show_partial(text):
+    """Show what the recognizer has heard so far"""
+    print(f"\r\033[K   … {text}", end="", flush=True)
+
+
+def attach_streaming_stt(future):
+    """Once the STT engine is loaded, transcribe while the user is still talking"""
+    if future.exception() is None and future.result().streaming:
+        capture_session.set_stream_listener(StreamingTranscriber(future.result(), on_partial=show_partial))
+
+
+def get_capture_session():
+    """Open the shared microphone session on first use"""
+    global capture_session
+    if capture_session is None:
+        capture_session = CaptureSession()
+        if CONFIG["wake_word"]:
+            attach_wake_word(capture_session, CONFIG["wake_word"])
+        stt_engine.add_done_callback(attach_streaming_stt)
+        capture_session.open()
+    return capture_session
+
+
 def listen_to_microphone():
     """
-    Capture audio from microphone and convert to text using Google Speech Recognition
+    Capture audio from microphone and convert to text
     """
-    recognizer = sr.Recognizer()
-    recognizer.energy_threshold = 4000
-    recognizer.dynamic_energy_threshold = True
-    
-    with sr.Microphone() as source:
+    session = get_capture_session()
+    report_ready()
+    if session.wake_word:
+        print("\n🎤 Listening... (say the wake word first)")
+    else:
         print("\n🎤 Listening... (speak now)")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        
-        try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
-            print("⏳ Processing speech...")
-            text = recognizer.recognize_google(audio)
-            print(f"💬 You: {text}")
-            return text
-        except sr.WaitTimeoutError:
-            print("⏱️  No speech detected.")
-            return None
-        except sr.UnknownValueError:
-            print("❓ Could not understand audio.")
-            return None
-        except sr.RequestError as e:
-            print(f"❌ Speech recognition error: {e}")
-            return None
-
-
-def get_ai_response(user_input):
+    session.clear()  # Drop anything captured while we were talking
+    
+    tracer.begin_turn()
+    with tracer.span("capture") as span:
+        # With a wake word there's nothing to time out on: wait to be called
+        audio = session.listen(timeout=None if session.wake_word else 10)
+        if audio is not None:
+            span.set(utterance_seconds=round(len(audio.frame_data) / (audio.sample_rate * audio.sample_width), 3))
+    if audio is None:
+        print("⏱️  No speech detected.")
+        return None
+    
+    return recognize_speech(audio)
+
+
+def clean_response(text):
+    """Remove any "User:" or "Assistant:" labels the model echoes back"""
+    return text.replace("User:", "").replace("Assistant:", "").strip()
+
+
+def stream_response(fragments, on_sentence=None, cancel_event=None, span=None):
+    """
+    Read a streamed reply sentence by sentence, handing each to on_sentence
+    (if given) as soon as it is complete. Returns the assembled reply.
+    Stops reading (which aborts generation) once cancel_event is set, at a
+    role label, and with early_stop as soon as max_sentences sentences are
+    complete. Tokens generated but not used are counted on span, with
+    the rate they arrived at.
+    """
+    spoken = []
+    used_chars = 0
+    counter = FragmentCounter(iter_until_stop(fragments))
+    for sentence in iter_sentences(counter):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if len(spoken) >= CONFIG["max_sentences"]:
+            continue
+        used_chars += len(sentence) + 1
+        sentence = clean_response(sentence)
+        if not sentence:
+            continue
+        if span:
+            span.mark("first_sentence")
+        if on_sentence:
+            on_sentence(sentence)
+        spoken.append(sentence)
+        if len(spoken) >= CONFIG["max_sentences"] and CONFIG["early_stop"]:
+            break
+    if span:
+        span.set(generated_tokens=counter.count, wasted_tokens=counter.wasted(used_chars),
+                 stream_tokens_per_second=counter.rate())
+    return " ".join(spoken)
+
+
+def remember_exchange(user_input, assistant_message, history):
+    """Add an exchange to the context window and the history store"""
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "user": user_input,
+        "assistant": assistant_message
+    }
+    history.append(entry)
+    del history[:-CONFIG["history_window"]]
+    save_conversation_history(entry)
+
+
+def get_ai_response(user_input, on_sentence=None, cancel_event=None, history=None, prompt_state=None):
     """
     Get response from Ollama (local AI model)
+    
+    If on_sentence is given the reply is streamed, and each sentence is
+    passed to on_sentence while the model keeps generating. Setting
+    cancel_event stops a streamed reply early.
+    
+    history and prompt_state (a PromptContext) hold the conversation; by
+    default the assistant's own is used, the server passes one per session.
     """
+    stream = on_sentence is not None
+    if history is None:
+        history = conversation_history
+    if prompt_state is None:
+        prompt_state = prompt_context
     try:
-        # Build context from recent history
-        context = ""
-        if len(conversation_history) > 0:
-            recent = conversation_history[-6:]  # Last 3 exchanges
-            for entry in recent:
-                context += f"User: {entry['user']}\nAssistant: {entry['assistant']}\n"
+        # Repeated standalone questions are answered from the cache, before
+        # anything else is looked up. Follow-ups and questions about the
+        # speaker always go to the model, so the conversation so far isn't
+        # part of the key: only what shapes a standalone answer is
+        cache_key = None
+        if response_cache:
+            if is_cacheable(user_input):
+                cache_key = ResponseCache.make_key(user_input, CONFIG["model"], GENERATION_OPTIONS, SYSTEM_PROMPT)
+                cached = response_cache.get(cache_key)
+                if cached:
+                    if stream:
+                        for sentence in split_sentences(cached):
+                            if cancel_event is not None and cancel_event.is_set():
+                                break
+                            on_sentence(sentence)
+                    remember_exchange(user_input, cached, history)
+                    # Ollama's context doesn't contain this exchange; rebuild next turn
+                    prompt_state.reset()
+                    return cached
+            else:
+                response_cache.note_bypass()
         
-        # Build prompt
-        system_prompt = "You are a helpful, friendly voice assistant. Keep responses brief (1-2 sentences) and conversational."
-        full_prompt = f"{system_prompt}\n\n{context}User: {user_input}\nAssistant:"
+        # Related exchanges from the whole history
+        recalled = recall_memories(user_input, history)
         
-        # Call Ollama API
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": CONFIG["model"],
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": 100,
-                    "top_p": 0.9
-                }
-            },
-            timeout=60
-        )
+        # Build prompt: just the new turn when Ollama still holds the
+        # conversation, otherwise system prompt + history within the budget.
+        # A fallback backend always gets the self-contained prompt.
+        prompt, extra = prompt_state.next_prompt(user_input, history, recalled)
+        full_prompt = prompt_state.full_prompt(user_input, history, recalled) if extra else prompt
         
-        if response.status_code == 200:
-            result = response.json()
-            assistant_message = result.get("response", "").strip()
-            
-            if not assistant_message:
-                return "I'm thinking... try asking again."
+        # Ask Ollama (and the fallback, if Ollama is slow to start answering)
+        info = {}
+        span = tracer.span("llm", model=CONFIG["model"], stream=stream, reused_context="context" in extra)
+        with span:
+            fragments = llm.stream(LLMRequest(prompt, extra, full_prompt), cancel_event, info)
+            try:
+                assistant_message = stream_response(fragments, on_sentence, cancel_event, span)
+            finally:
+                fragments.close()  # Stopped early: cancel the rest of the generation
+            result = info.get("stats")
+            span.set(backend=info.get("backend"), model=info.get("model", CONFIG["model"]),
+                     hedged=bool(info.get("hedged")), **ollama_stats(result or {}))
             
-            # Clean up response
-            sentences = assistant_message.split('. ')
-            if len(sentences) > 2:
-                assistant_message = '. '.join(sentences[:2]) + '.'
-            
-            assistant_message = assistant_message.replace("User:", "").replace("Assistant:", "").strip()
-            
-            # Save to history
-            conversation_history.append({
-                "timestamp": datetime.now().isoformat(),
-                "user": user_input,
-                "assistant": assistant_message
-            })
-            save_conversation_history()
-            
-            return assistant_message
-        else:
-            print(f"⚠️  API returned status code: {response.status_code}")
-            return "Let me think about that differently. Can you rephrase?"
+            # Only a complete reply from Ollama leaves a context to continue
+            # from. Early stop and barge-in close the stream before the final
+            # chunk: no context (the next turn sends the full prompt) and no
+            # server-side token stats, so the arrival rate stands in for them
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            from_ollama = info.get("backend") == "ollama"
+            carried = result if from_ollama and result and not cancelled else None
+            prompt_state.update(carried)
+            if from_ollama and not carried:
+                span.set(context_lost=1, tokens_per_second=span.attrs.get("stream_tokens_per_second"))
+        
+        if not assistant_message:
+            return "I'm thinking... try asking again."
+        
+        # A reply cut short by barge-in is not worth caching
+        if cache_key and not cancelled:
+            response_cache.put(cache_key, assistant_message, user_input)
+        
+        remember_exchange(user_input, assistant_message, history)
+        return assistant_message
             
+    except BackendError as e:
+        print(f"⚠️  {e}")
+        return "Let me think about that differently. Can you rephrase?"
     except requests.exceptions.Timeout:
         return "Sorry, I'm thinking too slowly. Try again."
     except Exception as e:
@@ -182,36 +417,85 @@ def get_ai_response(user_input):
         return "I encountered an error. Try asking something else."
 
 
-# Initialize Jarvis voice if enabled
-jarvis_tts = None
-if CONFIG.get("use_jarvis", False):
-    try:
-        jarvis_tts = JarvisVoice()
-    except Exception as e:
-        print(f"⚠️  Could not initialize Jarvis voice: {e}")
+# Fixed phrases, pre-synthesized at startup so they play instantly
+SYSTEM_PHRASES = [
+    "Goodbye! Have a great day!",
+    "Goodbye!",
+    "History cleared!",
+    "I'm thinking... try asking again.",
+    "Let me think about that differently. Can you rephrase?",
+    "Sorry, I'm thinking too slowly. Try again.",
+    "I encountered an error. Try asking something else.",
+]
+
+# Jarvis voice (if enabled) plus the lighter engines
+lighter_voice = CONFIG["voice"] if CONFIG["voice"] != "Jarvis" else None
+jarvis_tts = JarvisVoice(
+    use_coqui=CONFIG.get("use_jarvis", False),
+    engines=CONFIG["tts_engines"],
+    latency_budget=CONFIG["tts_latency_budget"],
+    backend=CONFIG["tts_backend"],
+    engine_options={
+        "say": {"voice": lighter_voice or "Daniel", "rate": CONFIG["speech_rate"]},
+        "espeak": {"voice": lighter_voice or "en-gb", "rate": CONFIG["speech_rate"]},
+    }
+)
+jarvis_tts.prewarm(SYSTEM_PHRASES)
+
+# The running VoicePipeline in full-duplex mode; it does all the speaking
+active_pipeline = None
+
 
 def speak_with_tts(text):
     """
-    Convert text to speech using Jarvis or macOS system voice
+    Convert text to speech with Jarvis or a lighter engine, whichever
+    the engine policy picks for this phrase. In full-duplex mode the text
+    is handed to the pipeline's TTS stage, so only one phrase plays at a time.
     """
+    if active_pipeline:
+        active_pipeline.say(text)
+        return
+    speak_now(text)
+
+
+def speak_now(text):
+    """Speak text on this thread, blocking until it has played"""
     try:
         print(f"🤖 Assistant: {text}")
-        
-        # Use Jarvis voice if enabled and available
-        if CONFIG.get("use_jarvis", False) and jarvis_tts:
+        with tracer.span("tts", characters=len(text)) as span:
             jarvis_tts.speak(text)
-        else:
-            # Fallback to macOS system voice
-            subprocess.run([
-                "say", 
-                "-v", CONFIG.get("voice", "Samantha"),
-                "-r", str(CONFIG["speech_rate"]),
-                text
-            ], check=True)
+            timing = dict(jarvis_tts.last_timing)
+            span.set(voice=timing.pop("engine", None), **timing)
     except Exception as e:
         print(f"❌ Error with text-to-speech: {e}")
 
 
+@contextmanager
+def streamed_speech():
+    """
+    Speak a reply while it streams in: put() each sentence and it is
+    synthesized while the previous one plays. Leaving the block waits
+    until everything has played (an exception stops it instead).
+    """
+    with tracer.span("tts", streamed=True) as span:
+        speech = jarvis_tts.speech_queue(on_phrase=lambda text: print(f"🤖 Assistant: {text}"))
+        try:
+            yield speech
+        except BaseException:
+            speech.stop()
+            raise
+        finally:
+            speech.close()
+            speech.wait()
+            timing = speech.timing()
+            span.set(voice=timing.pop("engine", None), **timing)
+
+
+def stop_speaking():
+    """Interrupt whatever is being spoken (barge-in)"""
+    jarvis_tts.stop()
+
+
 def show_menu():
     """Show interactive menu"""
     print("\n" + "="*50)
@@ -222,9 +506,12 @@ def show_menu():
     print("  • Say 'change voice' to pick a different voice")
     print("  • Say 'test voice' to hear current voice")
     print("  • Say 'show history' to see conversation")
+    print("  • Say 'search history for ...' to find past messages")
     print("  • Say 'clear history' to reset")
     print("  • Say 'settings' to see configuration")
+    print("  • Ask 'what time is it' or 'what's the date'")
     print("  • Say 'exit' or 'quit' to stop")
+    print("  • Say 'stop' or 'cancel' to interrupt a reply")
     print("  • Press Ctrl+C to force exit")
     print(f"\nCurrent Voice: {CONFIG['voice']}")
     print(f"AI Model: {CONFIG['model']}")
@@ -236,33 +523,68 @@ def show_settings():
     print("\n=== Current Settings ===")
     for key, value in CONFIG.items():
         print(f"  {key}: {value}")
+    if jarvis_tts.cache:
+        print(f"  tts_cache: {jarvis_tts.cache_stats()}")
+    print(f"  tts_engines: {jarvis_tts.engine_stats()}")
+    if response_cache:
+        print(f"  response_cache: {response_cache.stats()}")
+    print(f"  intents: {router.stats()}")
+    print(f"  llm: {llm.stats()}")
+    if capture_session and capture_session.wake_word:
+        detector = capture_session.wake_word
+        print(f"  wake_word: {detector.name}, {detector.detections} detections, "
+              f"{capture_session.gated} utterances ignored, CPU {detector.cpu_percent():.2f}% of a core")
+    print()
+
+
+def print_entries(entries):
+    """Print a list of history entries"""
+    for i, entry in enumerate(entries, 1):
+        print(f"\n[{i}] {entry.get('timestamp', 'Unknown time')}")
+        print(f"You: {entry['user']}")
+        print(f"AI: {entry['assistant']}")
     print()
 
 
 def show_history():
     """Display conversation history"""
-    if not conversation_history:
+    entries = history_store.recent(10) if history_store else conversation_history[-10:]
+    if not entries:
         print("\n📝 No conversation history yet.\n")
         return
     
     print("\n=== Conversation History ===")
-    for i, entry in enumerate(conversation_history[-10:], 1):  # Last 10
-        print(f"\n[{i}] {entry.get('timestamp', 'Unknown time')}")
-        print(f"You: {entry['user']}")
-        print(f"AI: {entry['assistant']}")
-    print()
+    print_entries(entries)
+
+
+def search_history(query):
+    """Full-text search over past conversations"""
+    if not history_store or not query:
+        print("\n📝 Nothing to search.\n")
+        return
+    
+    results = history_store.search(query, limit=10)
+    if not results:
+        print(f"\n🔍 No past messages about '{query}'.\n")
+        return
+    
+    print(f"\n=== History matching '{query}' ===")
+    print_entries(results)
 
 
 def clear_history():
     """Clear conversation history"""
     global conversation_history
     conversation_history = []
+    prompt_context.reset()
     try:
-        if Path(CONFIG["history_file"]).exists():
-            os.remove(CONFIG["history_file"])
+        if history_store:
+            history_store.clear()
+        if memory_index:
+            memory_index.clear()
         print("✅ History cleared!")
     except Exception as e:
-        print(f"⚠️  Could not clear history file: {e}")
+        print(f"⚠️  Could not clear history: {e}")
 
 
 def change_voice():
@@ -283,6 +605,93 @@ def change_voice():
         print("⚠️  Voice not found, keeping current.")
 
 
+def say_locally(reply):
+    """Print and speak an answer that did not need the model"""
+    print(f"🤖 AI: {reply}")
+    speak_with_tts(reply)
+
+
+def say_goodbye(match):
+    speak_with_tts("Goodbye! Have a great day!")
+    return "exit"
+
+
+def search_history_intent(match):
+    search_history((match.group("query") or "").strip())
+
+
+def clear_history_intent(match):
+    clear_history()
+    speak_with_tts("History cleared!")
+
+
+# Local commands and questions; anything unmatched goes to Ollama
+router = IntentRouter(log_path=CONFIG.get("intent_log"))
+router.register("exit", EXIT_PATTERNS, say_goodbye)
+router.register("stop", STOP_PATTERNS, lambda match: "stop")  # Barge-in already silenced the reply
+router.register("time", TIME_PATTERNS, lambda match: say_locally(spoken_time()))
+router.register("date", DATE_PATTERNS, lambda match: say_locally(spoken_date()))
+router.register("change_voice", [r".*\bchange (?:the |your )?voice\b.*"], lambda match: change_voice())
+router.register("test_voice", [r".*\btest (?:the |your )?voice\b.*"], lambda match: test_voice(CONFIG["voice"]))
+router.register("search_history", [r".*\bsearch (?:the |my )?history(?:(?: for)? (?P<query>.*))?"], search_history_intent)
+router.register("show_history", [r".*\bshow (?:me )?(?:the |my )?history\b.*"], lambda match: show_history())
+router.register("clear_history", [r".*\bclear (?:the |my )?history\b.*"], clear_history_intent)
+router.register("settings", [r".*\bsettings\b.*"], lambda match: show_settings())
+
+
+def handle_command(user_input):
+    """
+    Run a local voice command.
+    Returns "exit" to stop, True if the command was handled, False otherwise.
+    """
+    intent, result = router.route(user_input)
+    if intent is None:
+        return False
+    return "exit" if result == "exit" else True
+
+
+def run_full_duplex():
+    """
+    Listen, think and speak concurrently.
+    The microphone stays open while the assistant talks, and speaking over
+    it cancels the current answer.
+    """
+    global active_pipeline
+    pipeline = None
+    
+    def recognize_turn(audio):
+        tracer.begin_turn()
+        return recognize_speech(audio)
+    
+    def on_command(text):
+        result = handle_command(text)
+        if result == "exit":
+            pipeline.stop()
+        return bool(result)
+    
+    def respond(text, on_sentence, cancel_event):
+        if not CONFIG.get("stream_responses", False):
+            on_sentence = None
+        return get_ai_response(text, on_sentence=on_sentence, cancel_event=cancel_event)
+    
+    pipeline = VoicePipeline(
+        capture=get_capture_session(),
+        recognize=recognize_turn,
+        respond=respond,
+        speak=speak_now,
+        stop_speaking=stop_speaking,
+        handle_command=on_command,
+        open_speech=streamed_speech
+    )
+    report_ready()
+    print("\n🎤 Listening... (speak any time, talk over me to interrupt)")
+    active_pipeline = pipeline
+    try:
+        pipeline.run()
+    finally:
+        active_pipeline = None
+
+
 def main():
     """
     Main loop for the voice assistant
@@ -295,15 +704,25 @@ def main():
         print("  ollama pull llama2\n")
         sys.exit(1)
     
+    if CONFIG["metrics_port"]:
+        tracer.serve_metrics(CONFIG["metrics_port"])
+    
+    # Load the model now so the first question doesn't pay for it
+    ollama.warm_up_in_background(CONFIG["model"])
+    
     # Load previous history
     global conversation_history
     conversation_history = load_conversation_history()
-    if conversation_history:
-        print(f"📚 Loaded {len(conversation_history)} previous messages")
+    if history_store and conversation_history:
+        print(f"📚 Loaded {history_store.count()} previous messages")
     
     show_menu()
     
     try:
+        if CONFIG.get("full_duplex", False):
+            run_full_duplex()
+            return
+        
         while True:
             # Listen for user input
             user_input = listen_to_microphone()
@@ -311,45 +730,40 @@ def main():
             if user_input is None:
                 continue
             
-            user_lower = user_input.lower()
-            
-            # Check for commands
-            if user_lower in ["exit", "quit", "goodbye", "stop"]:
-                speak_with_tts("Goodbye! Have a great day!")
+            result = handle_command(user_input)
+            if result == "exit":
                 break
-            
-            elif "change voice" in user_lower:
-                change_voice()
-                continue
-            
-            elif "test voice" in user_lower:
-                test_voice(CONFIG["voice"])
-                continue
-            
-            elif "show history" in user_lower:
-                show_history()
-                continue
-            
-            elif "clear history" in user_lower:
-                clear_history()
-                speak_with_tts("History cleared!")
-                continue
-            
-            elif "settings" in user_lower:
-                show_settings()
+            if result:
                 continue
             
-            # Get AI response
-            ai_response = get_ai_response(user_input)
+            # Get AI response (streamed sentences are spoken as they arrive,
+            # the next one synthesized while the previous one plays)
+            spoken = []
+            if CONFIG.get("stream_responses", False):
+                with streamed_speech() as speech:
+                    def speak_sentence(sentence):
+                        spoken.append(sentence)
+                        speech.put(sentence)
+                    
+                    ai_response = get_ai_response(user_input, on_sentence=speak_sentence)
+            else:
+                ai_response = get_ai_response(user_input)
             
-            # Speak the response
-            speak_with_tts(ai_response)
+            # Speak the response (errors and non-streamed replies)
+            if not spoken:
+                speak_with_tts(ai_response)
             
     except KeyboardInterrupt:
         print("\n\n👋 Exiting...")
         speak_with_tts("Goodbye!")
     finally:
-        save_conversation_history()
+        if memory_index:
+            memory_index.close()
+        if history_store:
+            history_store.close()
+        if response_cache:
+            response_cache.close()
+        tracer.close()
 
 
 if __name__ == "__main__":
@@ -4,114 +4,275 @@ Free Voice Virtual Assistant using Ollama (local AI) and system TTS
 No API costs - runs completely locally!
 """
 
+from startup import load_in_background, report_ready  # First: records the launch time
 import os
 import sys
+from contextlib import contextmanager
 import speech_recognition as sr
-import subprocess
 import requests
 from jarvis_voice import JarvisVoice
+from ollama_client import OllamaClient, FragmentCounter, ROLE_STOP_SEQUENCES, iter_sentences, iter_until_stop
+from llm_backends import LLMRequest, BackendError, OllamaBackend, OpenAIBackend, HedgedLLM
+from response_cache import ResponseCache, is_cacheable
+from sentence_stream import split_sentences
+from telemetry import Tracer, ollama_stats
+from intents import (IntentRouter, spoken_time, spoken_date, TIME_PATTERNS, DATE_PATTERNS, EXIT_PATTERNS,
+                     STOP_PATTERNS)
+from capture import CaptureSession
+from stt import StreamingTranscriber, create_stt
+from wake_word import attach_wake_word
+from voice_pipeline import VoicePipeline
 
 # Conversation history
 conversation_history = []
 
 # Configuration
-USE_JARVIS = True  # Set to False to use macOS system voice
+USE_JARVIS = True  # Set to False to use only the lighter voices below
+TTS_ENGINES = ["piper", "espeak", "say"]  # Lighter voices, used where they're installed
+TTS_LATENCY_BUDGET = 2.0  # Seconds a phrase may take to synthesize before a faster voice is used
+TTS_BACKEND = "torch"  # Jarvis voice on the CPU: "torch", "onnx" (pip install onnx) or "default"
+STREAM_RESPONSES = True  # Speak each sentence while the model is still generating
+STT_ENGINE = "auto"  # auto (offline if available), vosk, whisper, google
+FULL_DUPLEX = True  # Keep listening while speaking; talking over the assistant interrupts it
+WAKE_WORD = None  # "hey_jarvis" (openWakeWord) or a folder of your recordings; None: always listen
+MAX_SENTENCES = 2  # Keep spoken replies short
+OLLAMA_MODEL = "llama3.2:1b"  # Faster, newer model
+OLLAMA_KEEP_ALIVE = "30m"  # How long Ollama keeps the model loaded between turns
+OLLAMA_OPTIONS = {
+    "temperature": 0.7,
+    "num_predict": 100,  # Limit response length
+    "top_p": 0.9,
+    "stop": ROLE_STOP_SEQUENCES  # Don't let the model write the user's next turn
+}
+FALLBACK_BACKEND = None  # "openai": also ask an OpenAI-compatible server (OPENAI_BASE_URL, OPENAI_API_KEY) when Ollama is slow
+FALLBACK_MODEL = "gpt-4o-mini"
+HEDGE_AFTER = 2.0  # Seconds without a first token from Ollama before the fallback is asked too
+RESPONSE_CACHE = True  # Answer repeated questions without calling the model
+INTENT_LOG = "intent_log.jsonl"  # Routing decisions (local vs model); None to disable
+TRACE_FILE = "trace.jsonl"  # Per-stage timing spans; None to disable
+METRICS_PORT = None  # e.g. 9464 to serve Prometheus metrics at /metrics
 
-# Initialize Jarvis voice
-jarvis_tts = None
-if USE_JARVIS:
+# Speech-to-text engine (offline Vosk/Whisper when installed, Google otherwise),
+# loaded in the background so listening can start right away
+stt_engine = load_in_background(create_stt, STT_ENGINE)
+
+# Per-stage timing (capture, STT, LLM, TTS)
+tracer = Tracer(TRACE_FILE, labels={"assistant": "free"})
+
+# Shared Ollama client (pooled connection, bounded timeouts)
+ollama = OllamaClient(keep_alive=OLLAMA_KEEP_ALIVE)
+
+
+def create_llm():
+    """Ollama first; with a fallback backend configured, slow turns are hedged to it"""
+    backends = [OllamaBackend(ollama, OLLAMA_MODEL, OLLAMA_OPTIONS)]
+    if FALLBACK_BACKEND == "openai":
+        backends.append(OpenAIBackend(FALLBACK_MODEL, max_tokens=OLLAMA_OPTIONS["num_predict"],
+                                      temperature=OLLAMA_OPTIONS["temperature"],
+                                      stop=OLLAMA_OPTIONS.get("stop")))
+    return HedgedLLM(backends, HEDGE_AFTER)
+
+
+llm = create_llm()
+
+# Cached answers to repeated questions, persisted across restarts
+response_cache = None
+if RESPONSE_CACHE:
     try:
-        print("Initializing Jarvis voice...")
-        jarvis_tts = JarvisVoice()
+        response_cache = ResponseCache()
     except Exception as e:
-        print(f"⚠️  Could not initialize Jarvis: {e}")
-        print("Using macOS system voice instead.")
+        print(f"⚠️  Could not open response cache: {e}")
+
+# Fixed phrases, pre-synthesized at startup so they play instantly
+SYSTEM_PHRASES = [
+    "Goodbye! Have a great day!",
+    "Goodbye!",
+    "I'm thinking... try asking again.",
+    "Let me think about that differently. Can you rephrase?",
+    "Sorry, I'm thinking too slowly. Try again.",
+    "I encountered an error. Try asking something else.",
+]
+
+# Jarvis voice (if enabled) plus the lighter engines
+print("Initializing voice...")
+jarvis_tts = JarvisVoice(use_coqui=USE_JARVIS, engines=TTS_ENGINES, latency_budget=TTS_LATENCY_BUDGET,
+                         backend=TTS_BACKEND)
+jarvis_tts.prewarm(SYSTEM_PHRASES)
 
 
 def check_ollama_installed():
     """Check if Ollama is installed and running"""
+    return ollama.is_available()
+
+
+def recognize_speech(audio):
+    """
+    Convert captured audio to text using the configured speech-to-text engine
+    """
     try:
-        response = requests.get("http://localhost:11434/api/tags")
-        return response.status_code == 200
-    except:
-        return False
+        print("\r\033[KProcessing speech...")  # Overwrites the last partial result
+        engine = stt_engine.result()
+        with tracer.span("stt", engine=engine.name):
+            text = engine.transcribe(audio)
+        print(f"You said: {text}")
+        return text
+    except sr.UnknownValueError:
+        print("Could not understand audio. Try speaking more clearly.")
+        return None
+    except sr.RequestError as e:
+        print(f"Could not request results; {e}")
+        return None
+
+
+# Microphone session: opened once, noise floor tracked in the background
+capture_session = None
+
+
+def show_partial(text):
+    """Show what the recognizer has heard so far"""
+    print(f"\r\033[K   … {text}", end="", flush=True)
+
+
+def attach_streaming_stt(future):
+    """Once the STT engine is loaded, transcribe while the user is still talking"""
+    if future.exception() is None and future.result().streaming:
+        capture_session.set_stream_listener(StreamingTranscriber(future.result(), on_partial=show_partial))
+
+
+def get_capture_session():
+    """Open the shared microphone session on first use"""
+    global capture_session
+    if capture_session is None:
+        capture_session = CaptureSession()
+        if WAKE_WORD:
+            attach_wake_word(capture_session, WAKE_WORD)
+        stt_engine.add_done_callback(attach_streaming_stt)
+        capture_session.open()
+    return capture_session
 
 
 def listen_to_microphone():
     """
-    Capture audio from microphone and convert to text using Google Speech Recognition
+    Capture audio from microphone and convert to text
     """
-    recognizer = sr.Recognizer()
-    recognizer.energy_threshold = 4000
-    recognizer.dynamic_energy_threshold = True
-    
-    with sr.Microphone() as source:
+    session = get_capture_session()
+    report_ready()
+    if session.wake_word:
+        print("Listening... (say the wake word first)")
+    else:
         print("Listening... (speak now)")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        
-        try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
-            print("Processing speech...")
-            text = recognizer.recognize_google(audio)
-            print(f"You said: {text}")
-            return text
-        except sr.WaitTimeoutError:
-            print("No speech detected. Speak louder or closer to the microphone.")
-            return None
-        except sr.UnknownValueError:
-            print("Could not understand audio. Try speaking more clearly.")
-            return None
-        except sr.RequestError as e:
-            print(f"Could not request results; {e}")
-            return None
-
-
-def get_ai_response(user_input):
+    session.clear()  # Drop anything captured while we were talking
+    
+    tracer.begin_turn()
+    with tracer.span("capture") as span:
+        audio = session.listen(timeout=None if session.wake_word else 10)
+        if audio is not None:
+            span.set(utterance_seconds=round(len(audio.frame_data) / (audio.sample_rate * audio.sample_width), 3))
+    if audio is None:
+        print("No speech detected. Speak louder or closer to the microphone.")
+        return None
+    
+    return recognize_speech(audio)
+
+
+def clean_response(text):
+    """Remove any "User:" or "Assistant:" labels from a response"""
+    return text.replace("User:", "").replace("Assistant:", "").strip()
+
+
+def stream_response(fragments, on_sentence=None, cancel_event=None, span=None):
+    """
+    Read a streamed reply and hand each sentence to on_sentence (if given)
+    as soon as it is complete. Returns the assembled reply.
+    Stops reading (which aborts generation) once cancel_event is set, at a
+    role label, or as soon as MAX_SENTENCES sentences are complete.
+    Tokens generated but not used are counted on span, with the rate they
+    arrived at.
+    """
+    spoken = []
+    used_chars = 0
+    counter = FragmentCounter(iter_until_stop(fragments))
+    for sentence in iter_sentences(counter):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        used_chars += len(sentence) + 1
+        sentence = clean_response(sentence)
+        if not sentence:
+            continue
+        if span:
+            span.mark("first_sentence")
+        if on_sentence:
+            on_sentence(sentence)
+        spoken.append(sentence)
+        if len(spoken) >= MAX_SENTENCES:
+            break
+    if span:
+        span.set(generated_tokens=counter.count, wasted_tokens=counter.wasted(used_chars),
+                 stream_tokens_per_second=counter.rate())
+    return " ".join(spoken)
+
+
+def get_ai_response(user_input, on_sentence=None, cancel_event=None):
     """
     Get response from Ollama (local AI model)
+    
+    If on_sentence is given the reply is streamed, and each sentence is
+    passed to on_sentence while the model keeps generating. Setting
+    cancel_event stops a streamed reply early.
     """
+    stream = on_sentence is not None
     try:
         # Build a concise prompt
         system_prompt = "You are a helpful voice assistant. Keep responses very brief (1-2 sentences max). Be friendly and direct."
         full_prompt = f"{system_prompt}\n\nUser: {user_input}\nAssistant:"
         
-        # Call Ollama API with generate endpoint
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3.2:1b",  # Faster, newer model
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": 100,  # Limit response length
-                    "top_p": 0.9
-                }
-            },
-            timeout=60
-        )
+        # Repeated questions are answered from the cache (the prompt has no
+        # conversation context; follow-ups, questions about the speaker and
+        # time-sensitive questions are skipped)
+        cache_key = None
+        if response_cache:
+            if is_cacheable(user_input):
+                cache_key = ResponseCache.make_key(user_input, OLLAMA_MODEL, OLLAMA_OPTIONS, system_prompt)
+                cached = response_cache.get(cache_key)
+                if cached:
+                    if stream:
+                        for sentence in split_sentences(cached):
+                            if cancel_event is not None and cancel_event.is_set():
+                                break
+                            on_sentence(sentence)
+                    conversation_history.append({"user": user_input, "assistant": cached})
+                    return cached
+            else:
+                response_cache.note_bypass()
         
-        if response.status_code == 200:
-            result = response.json()
-            assistant_message = result.get("response", "").strip()
-            
-            if not assistant_message:
-                return "I'm thinking... try asking again."
-                
-            # Keep only first 2 sentences for brevity
-            sentences = assistant_message.split('. ')
-            if len(sentences) > 2:
-                assistant_message = '. '.join(sentences[:2]) + '.'
-            
-            # Remove any "User:" or "Assistant:" labels from response
-            assistant_message = assistant_message.replace("User:", "").replace("Assistant:", "").strip()
-            
-            conversation_history.append({"user": user_input, "assistant": assistant_message})
-            return assistant_message
-        else:
-            print(f"API returned status code: {response.status_code}")
-            return "Let me think about that differently. Can you rephrase?"
+        # Ask Ollama (and the fallback, if Ollama is slow to start answering);
+        # the reply is always read as a stream and cut at MAX_SENTENCES
+        info = {}
+        with tracer.span("llm", model=OLLAMA_MODEL, stream=stream) as span:
+            fragments = llm.stream(LLMRequest(full_prompt), cancel_event, info)
+            try:
+                assistant_message = stream_response(fragments, on_sentence, cancel_event, span)
+            finally:
+                fragments.close()  # Stopped early: cancel the rest of the generation
+            span.set(backend=info.get("backend"), model=info.get("model", OLLAMA_MODEL),
+                     hedged=bool(info.get("hedged")), **ollama_stats(info.get("stats", {})))
+            if "stats" not in info:
+                # Stopped before Ollama's final chunk: no server-side token stats
+                span.set(tokens_per_second=span.attrs.get("stream_tokens_per_second"))
+        
+        if not assistant_message:
+            return "I'm thinking... try asking again."
+        
+        # A reply cut short by barge-in is not worth caching
+        if cache_key and not (cancel_event is not None and cancel_event.is_set()):
+            response_cache.put(cache_key, assistant_message, user_input)
+        
+        conversation_history.append({"user": user_input, "assistant": assistant_message})
+        return assistant_message
             
+    except BackendError as e:
+        print(f"API returned an error: {e}")
+        return "Let me think about that differently. Can you rephrase?"
     except requests.exceptions.Timeout:
         return "Sorry, I'm thinking too slowly. Try again."
     except Exception as e:
@@ -119,23 +280,121 @@ def get_ai_response(user_input):
         return "I encountered an error. Try asking something else."
 
 
+# The running VoicePipeline in full-duplex mode; it does all the speaking
+active_pipeline = None
+
+
 def speak_with_system_tts(text):
     """
-    Convert text to speech using Jarvis or macOS built-in voice
+    Convert text to speech with Jarvis or a lighter engine, whichever
+    the engine policy picks for this phrase. In full-duplex mode the text
+    is handed to the pipeline's TTS stage, so only one phrase plays at a time.
     """
+    if active_pipeline:
+        active_pipeline.say(text)
+        return
+    speak_now(text)
+
+
+def speak_now(text):
+    """Speak text on this thread, blocking until it has played"""
     try:
         print(f"Assistant: {text}")
-        
-        # Use Jarvis voice if available
-        if USE_JARVIS and jarvis_tts:
+        with tracer.span("tts", characters=len(text)) as span:
             jarvis_tts.speak(text)
-        else:
-            # Fallback: Use macOS 'say' command
-            subprocess.run(["say", "-v", "Daniel", text], check=True)
+            timing = dict(jarvis_tts.last_timing)
+            span.set(voice=timing.pop("engine", None), **timing)
     except Exception as e:
         print(f"Error with text-to-speech: {e}")
 
 
+@contextmanager
+def streamed_speech():
+    """
+    Speak a reply while it streams in: put() each sentence and it is
+    synthesized while the previous one plays. Leaving the block waits
+    until everything has played (an exception stops it instead).
+    """
+    with tracer.span("tts", streamed=True) as span:
+        speech = jarvis_tts.speech_queue(on_phrase=lambda text: print(f"Assistant: {text}"))
+        try:
+            yield speech
+        except BaseException:
+            speech.stop()
+            raise
+        finally:
+            speech.close()
+            speech.wait()
+            timing = speech.timing()
+            span.set(voice=timing.pop("engine", None), **timing)
+
+
+def stop_speaking():
+    """Interrupt whatever is being spoken (barge-in)"""
+    jarvis_tts.stop()
+
+
+def say_locally(reply):
+    """Print and speak an answer that did not need the model"""
+    print(f"AI: {reply}")
+    speak_with_system_tts(reply)
+
+
+def say_goodbye(match):
+    speak_with_system_tts("Goodbye! Have a great day!")
+    return "exit"
+
+
+# Questions answered without the model; anything unmatched goes to Ollama
+router = IntentRouter(log_path=INTENT_LOG)
+router.register("exit", EXIT_PATTERNS, say_goodbye)
+router.register("stop", STOP_PATTERNS, lambda match: "stop")  # Barge-in already silenced the reply
+router.register("time", TIME_PATTERNS, lambda match: say_locally(spoken_time()))
+router.register("date", DATE_PATTERNS, lambda match: say_locally(spoken_date()))
+
+
+def run_full_duplex():
+    """
+    Listen, think and speak concurrently.
+    The microphone stays open while the assistant talks, and speaking over
+    it cancels the current answer.
+    """
+    global active_pipeline
+    pipeline = None
+    
+    def recognize_turn(audio):
+        tracer.begin_turn()
+        return recognize_speech(audio)
+    
+    def on_command(text):
+        intent, result = router.route(text)
+        if result == "exit":
+            pipeline.stop()
+        return intent is not None
+    
+    def respond(text, on_sentence, cancel_event):
+        if not STREAM_RESPONSES:
+            on_sentence = None
+        return get_ai_response(text, on_sentence=on_sentence, cancel_event=cancel_event)
+    
+    pipeline = VoicePipeline(
+        capture=get_capture_session(),
+        recognize=recognize_turn,
+        respond=respond,
+        speak=speak_now,
+        stop_speaking=stop_speaking,
+        handle_command=on_command,
+        open_speech=streamed_speech
+    )
+    report_ready()
+    print("Listening... (speak any time, talk over me to interrupt)")
+    active_pipeline = pipeline
+    try:
+        pipeline.run()
+    finally:
+        active_pipeline = None
+
+
 def main():
     """
     Main loop for the voice assistant
@@ -153,11 +412,22 @@ def main():
         print("4. Ollama will run automatically\n")
         sys.exit(1)
     
+    if METRICS_PORT:
+        tracer.serve_metrics(METRICS_PORT)
+    
+    # Load the model now so the first question doesn't pay for it
+    ollama.warm_up_in_background(OLLAMA_MODEL)
+    
     print("Commands:")
     print("- Say 'exit' or 'quit' to stop")
+    print("- Say 'stop' or 'cancel' to interrupt a reply")
     print("- Press Ctrl+C to exit\n")
     
     try:
+        if FULL_DUPLEX:
+            run_full_duplex()
+            return
+        
         while True:
             # Listen for user input
             user_input = listen_to_microphone()
@@ -165,20 +435,35 @@ def main():
             if user_input is None:
                 continue
             
-            # Check for exit commands
-            if user_input.lower() in ["exit", "quit", "goodbye", "stop"]:
-                speak_with_system_tts("Goodbye! Have a great day!")
+            # Exit, time and date are handled locally
+            intent, result = router.route(user_input)
+            if result == "exit":
                 break
+            if intent:
+                continue
             
-            # Get AI response
-            ai_response = get_ai_response(user_input)
+            # Get AI response (streamed sentences are spoken as they arrive,
+            # the next one synthesized while the previous one plays)
+            spoken = []
+            if STREAM_RESPONSES:
+                with streamed_speech() as speech:
+                    def speak_sentence(sentence):
+                        spoken.append(sentence)
+                        speech.put(sentence)
+                    
+                    ai_response = get_ai_response(user_input, on_sentence=speak_sentence)
+            else:
+                ai_response = get_ai_response(user_input)
             
-            # Speak the response
-            speak_with_system_tts(ai_response)
+            # Speak the response (errors and non-streamed replies)
+            if not spoken:
+                speak_with_system_tts(ai_response)
             
     except KeyboardInterrupt:
         print("\n\nExiting...")
         speak_with_system_tts("Goodbye!")
+    finally:
+        tracer.close()
 
 
 if __name__ == "__main__":
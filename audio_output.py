@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Audio output sinks
+Plays waveforms straight from memory - no temp files, no player subprocess
+- SoundDeviceSink: real speakers via PortAudio (macOS, Linux, Windows)
+- NullSink: discards audio (headless runs and tests)
+- WavFileSink: writes each utterance to a WAV file
+
+play_stream() takes raw 16-bit PCM as it arrives (e.g. from a streaming
+TTS API); SoundDeviceSink starts playing with the first chunk.
+"""
+
+import io
+import time
+import wave
+import threading
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+# sounddevice is imported when a SoundDeviceSink is created (it loads PortAudio)
+HAS_SOUNDDEVICE = importlib.util.find_spec("sounddevice") is not None
+
+
+def wav_to_samples(wav_bytes):
+    """Decode 16-bit mono WAV bytes into (int16 samples, sample_rate)"""
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, dtype="<i2"), sample_rate
+
+
+def pcm_chunks_to_samples(chunks):
+    """Join 16-bit PCM byte chunks into int16 samples (a trailing odd byte is dropped)"""
+    pcm = b"".join(chunks)
+    return np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype="<i2")
+
+
+def samples_to_wav(samples, sample_rate):
+    """Encode int16 or float (-1..1) samples as 16-bit mono WAV bytes"""
+    samples = np.asarray(samples)
+    if samples.dtype != np.int16:
+        samples = (np.clip(samples.astype(np.float32), -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class AudioSink:
+    """Base class: play() blocks until the audio is done (or stop() is called)"""
+
+    def play(self, samples, sample_rate):
+        raise NotImplementedError
+
+    def play_stream(self, chunks, sample_rate):
+        """Play 16-bit mono PCM bytes arriving in chunks; by default waits for all of them"""
+        self.play(pcm_chunks_to_samples(chunks), sample_rate)
+
+    def stop(self):
+        """Interrupt the current playback"""
+
+
+class SoundDeviceSink(AudioSink):
+    """Play through the default output device"""
+
+    def __init__(self, device=None):
+        if not HAS_SOUNDDEVICE:
+            raise RuntimeError("sounddevice is not installed (pip install sounddevice)")
+        # Raises OSError when the PortAudio library itself is missing
+        import sounddevice
+        self.sd = sounddevice
+        self.device = device
+        self.stream = None  # Raw output stream kept open between streamed utterances
+        self.interrupted = threading.Event()
+
+    def play(self, samples, sample_rate):
+        self.sd.play(samples, samplerate=sample_rate, device=self.device)
+        self.sd.wait()
+
+    def _open_stream(self, sample_rate):
+        if self.stream is not None and self.stream.samplerate != sample_rate:
+            self.stream.close()
+            self.stream = None
+        if self.stream is None:
+            self.stream = self.sd.RawOutputStream(samplerate=sample_rate, channels=1, dtype="int16",
+                                                  device=self.device)
+        if not self.stream.active:
+            self.stream.start()
+        return self.stream
+
+    def play_stream(self, chunks, sample_rate):
+        """Write each chunk to the output stream as it arrives"""
+        self.interrupted.clear()
+        stream = self._open_stream(sample_rate)
+        leftover = b""
+        for chunk in chunks:
+            if self.interrupted.is_set():
+                break
+            data = leftover + chunk
+            leftover = data[len(data) // 2 * 2:]
+            try:
+                stream.write(data[:len(data) // 2 * 2])  # Blocks while the device buffer is full
+            except self.sd.PortAudioError:
+                if not self.interrupted.is_set():
+                    raise
+                break  # stop() aborted the stream mid-write
+        else:
+            # Let the buffered tail play out, unless stop() is called first
+            self.interrupted.wait(stream.latency)
+        if self.interrupted.is_set():
+            stream.abort()  # Drop what is buffered; restarted on the next call
+            close = getattr(chunks, "close", None)
+            if close:
+                close()  # Stop the download of the rest of the reply
+
+    def stop(self):
+        self.interrupted.set()
+        self.sd.stop()
+        stream = self.stream
+        if stream is not None:
+            stream.abort()  # Also wakes a blocked write()
+
+
+class NullSink(AudioSink):
+    """
+    Discard audio. With realtime=True it waits as long as the audio would
+    have played, which keeps timing realistic in benchmarks.
+    """
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.played = []  # (num_samples, sample_rate) per utterance
+        self.stopped = threading.Event()
+
+    def play(self, samples, sample_rate):
+        self.played.append((len(samples), sample_rate))
+        if self.realtime:
+            self.stopped.clear()
+            self.stopped.wait(len(samples) / sample_rate)
+
+    def play_stream(self, chunks, sample_rate):
+        """'Play' each chunk as it arrives (in real time with realtime=True)"""
+        self.stopped.clear()
+        total = 0
+        played_until = time.perf_counter()
+        for chunk in chunks:
+            if self.stopped.is_set():
+                break
+            samples = len(chunk) // 2
+            total += samples
+            if self.realtime:
+                # Playback can't start before the chunk arrived
+                played_until = max(played_until, time.perf_counter()) + samples / sample_rate
+                self.stopped.wait(max(0.0, played_until - time.perf_counter() - 0.05))
+        if self.realtime and not self.stopped.is_set():
+            self.stopped.wait(max(0.0, played_until - time.perf_counter()))
+        self.played.append((total, sample_rate))
+
+    def stop(self):
+        self.stopped.set()
+
+    @property
+    def seconds_played(self):
+        return sum(n / rate for n, rate in self.played)
+
+
+class WavFileSink(AudioSink):
+    """Write every utterance to <directory>/<prefix>_<n>.wav"""
+
+    def __init__(self, directory, prefix="utterance"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.count = 0
+        self.files = []
+        self.lock = threading.Lock()
+
+    def play(self, samples, sample_rate):
+        with self.lock:
+            self.count += 1
+            path = self.directory / f"{self.prefix}_{self.count:04d}.wav"
+        path.write_bytes(samples_to_wav(samples, sample_rate))
+        self.files.append(path)
+
+
+def default_sink():
+    """Speakers if available, otherwise a silent sink"""
+    if HAS_SOUNDDEVICE:
+        try:
+            return SoundDeviceSink()
+        except Exception as e:
+            print(f"⚠️  Audio output unavailable: {e}")
+    else:
+        print("⚠️  sounddevice not installed - audio will not be played.")
+    return NullSink()
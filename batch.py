@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Batch mode: run the assistant over a directory of WAV files
+- Each file goes through STT -> get_ai_response -> Jarvis synthesis,
+  exactly as a spoken turn would (each file is its own conversation)
+- Files are spread over a pool of worker processes (or threads), so
+  STT and synthesis use every core of a CPU-only box
+- Per file: <name>.json (transcript, reply, timings) and <name>.reply.wav
+- manifest.json: every result plus totals and per-stage latency
+- Process workers each load their own Jarvis voice (~1.6 GB), so the
+  default number of workers also fits in the available memory
+
+If the input directory has a manifest.json (benchmarks/make_corpus.py
+format) the reference transcripts are used for word error rate, or
+instead of STT with --stt reference.
+
+Usage:
+    python3 batch.py INPUT_DIR [-o batch_output] [--workers 4] [--pool process|thread]
+        [--stt auto|vosk|whisper|google|reference] [--no-audio]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from telemetry import percentile
+
+WORKER_VOICE_MB = 1600  # Resident memory of a process worker with the Jarvis voice loaded
+
+# Set up in each worker by init_worker (the assistant module is heavy to import)
+assistant = None
+stt_engine = None
+worker_lock = threading.Lock()
+
+
+def init_worker(stt_name, threads):
+    """Load the assistant, STT engine and voice once per worker"""
+    global assistant, stt_engine
+    with worker_lock:
+        if assistant is not None:
+            return
+        # Split the cores between workers instead of every model using all of them
+        # (JARVIS_TTS_THREADS: the voice sets torch's thread count itself)
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "JARVIS_TTS_THREADS"):
+            os.environ[var] = str(threads)
+        # Google's recognizer is only a thin client, the cheapest to load when unused
+        os.environ["STT_ENGINE"] = "google" if stt_name == "reference" else stt_name
+
+        import assistant_enhanced
+        from ollama_client import OllamaClient
+        # Batch runs don't touch the user's history, memory, cache or trace
+        assistant_enhanced.response_cache = None
+        assistant_enhanced.tracer.close()
+        assistant_enhanced.tracer = assistant_enhanced.Tracer(labels={"assistant": "batch"})
+        assistant_enhanced.ollama = OllamaClient(keep_alive=assistant_enhanced.CONFIG["keep_alive"])
+        assistant_enhanced.llm = assistant_enhanced.create_llm()
+        if stt_name != "reference":
+            stt_engine = assistant_enhanced.stt_engine.result()
+        assistant = assistant_enhanced
+
+
+def transcribe_file(path):
+    import speech_recognition as sr
+    with sr.AudioFile(str(path)) as source:
+        audio = sr.Recognizer().record(source)
+    try:
+        return stt_engine.transcribe(audio)
+    except sr.UnknownValueError:
+        return ""
+
+
+def process_file(path, output_dir, reference, stt_name, threads, audio):
+    """One turn for one file; returns its result record"""
+    init_worker(stt_name, threads)
+    from ollama_client import PromptContext
+    path = Path(path)
+    output_dir = Path(output_dir)
+    record = {"file": path.name, "reference": reference, "timings": {}, "error": None}
+    timings = record["timings"]
+    try:
+        start = time.perf_counter()
+        if stt_name == "reference":
+            transcript = reference or ""
+        else:
+            transcript = transcribe_file(path)
+            timings["stt"] = time.perf_counter() - start
+        record["transcript"] = transcript
+        if reference is not None and stt_name != "reference":
+            record["wer"] = word_error_rate(reference, transcript)
+
+        if transcript:
+            start = time.perf_counter()
+            context = PromptContext(assistant.SYSTEM_PROMPT, assistant.CONFIG["context_tokens"],
+                                    assistant.GENERATION_OPTIONS["num_predict"])
+            reply = assistant.get_ai_response(transcript, history=[], prompt_state=context)
+            timings["llm"] = time.perf_counter() - start
+            record["reply"] = reply
+
+            voice = assistant.jarvis_tts
+            if audio and voice and voice.wait_until_ready():
+                from audio_output import wav_to_samples
+                start = time.perf_counter()
+                wav_bytes = voice.synthesize(reply)
+                timings["tts"] = time.perf_counter() - start
+                samples, sample_rate = wav_to_samples(wav_bytes)
+                record["audio_seconds"] = round(len(samples) / sample_rate, 3)
+                if record["audio_seconds"]:
+                    record["rtf"] = round(timings["tts"] / record["audio_seconds"], 3)
+                reply_wav = output_dir / f"{path.stem}.reply.wav"
+                reply_wav.write_bytes(wav_bytes)
+                record["reply_wav"] = reply_wav.name
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    (output_dir / f"{path.stem}.json").write_text(json.dumps(record, indent=2))
+    return record
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance / reference length (case and punctuation ignored)"""
+    def words(text):
+        return "".join(c if c.isalnum() or c.isspace() or c == "'" else " " for c in text.lower()).split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return round(row[-1] / len(ref), 3)
+
+
+def load_references(input_dir):
+    """file name -> reference transcript, from manifest.json if present"""
+    manifest = input_dir / "manifest.json"
+    if not manifest.exists():
+        return {}
+    return {entry["file"]: entry["text"] for entry in json.loads(manifest.read_text())}
+
+
+def summarize(records, wall_seconds):
+    ok = [r for r in records if not r["error"]]
+    summary = {
+        "files": len(records),
+        "errors": len(records) - len(ok),
+        "wall_seconds": round(wall_seconds, 2),
+        "files_per_second": round(len(records) / wall_seconds, 3) if wall_seconds else None,
+        "stages": {},
+    }
+    for stage in ("stt", "llm", "tts"):
+        values = [r["timings"][stage] for r in ok if stage in r["timings"]]
+        if values:
+            summary["stages"][stage] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "total": round(sum(values), 2),
+            }
+    wers = [r["wer"] for r in ok if "wer" in r]
+    if wers:
+        summary["mean_wer"] = round(sum(wers) / len(wers), 3)
+    rtfs = [r["rtf"] for r in ok if "rtf" in r]
+    if rtfs:
+        summary["mean_rtf"] = round(sum(rtfs) / len(rtfs), 3)
+    return summary
+
+
+def available_memory_mb():
+    """Memory available for new processes (MemAvailable on Linux, physical memory elsewhere), or None"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2 ** 20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_workers(cores, pool, audio):
+    """One worker per core; process workers with the voice only as many as fit in memory"""
+    if pool != "process" or not audio:
+        return cores
+    memory = available_memory_mb()
+    if memory is None:
+        return cores
+    fit = max(1, memory // WORKER_VOICE_MB)
+    if fit < cores:
+        print(f"💾 {memory} MB available: {fit} worker(s) with the voice loaded "
+              f"(~{WORKER_VOICE_MB} MB each); set --workers to override")
+    return min(cores, fit)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Run the assistant over a directory of WAV files")
+    parser.add_argument("input_dir")
+    parser.add_argument("-o", "--output", default="batch_output")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="default: one per core, as many as fit in memory with the voice loaded")
+    parser.add_argument("--pool", choices=["process", "thread"], default="process",
+                        help="processes use every core; threads share one loaded voice")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="math library threads per worker (default: cores / workers)")
+    parser.add_argument("--stt", default="auto", help="auto, vosk, whisper, google or reference")
+    parser.add_argument("--no-audio", action="store_true", help="skip synthesis")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir)
+    files = sorted(input_dir.glob("*.wav"))
+    if not files:
+        print(f"❌ No WAV files in {input_dir}")
+        sys.exit(1)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    references = load_references(input_dir)
+    if args.stt == "reference" and not references:
+        print(f"❌ --stt reference needs {input_dir / 'manifest.json'}")
+        sys.exit(1)
+
+    audio = not args.no_audio
+    workers = args.workers or default_workers(cores, args.pool, audio)
+    workers = max(1, min(workers, len(files)))
+    threads = args.threads_per_worker or (max(1, cores // workers) if args.pool == "process" else cores)
+    print(f"📂 {len(files)} files, {workers} {args.pool} workers x {threads} threads, STT: {args.stt}")
+
+    pool_class = ProcessPoolExecutor if args.pool == "process" else ThreadPoolExecutor
+    records = []
+    start = time.perf_counter()
+    with pool_class(max_workers=workers, initializer=init_worker, initargs=(args.stt, threads)) as pool:
+        futures = [pool.submit(process_file, path, output_dir, references.get(path.name),
+                               args.stt, threads, audio) for path in files]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            status = f"❌ {record['error']}" if record["error"] else f"💬 {record.get('transcript', '')!r}"
+            print(f"[{len(records)}/{len(files)}] {record['file']}: {status}")
+    wall_seconds = time.perf_counter() - start
+
+    records.sort(key=lambda r: r["file"])
+    summary = summarize(records, wall_seconds)
+    (output_dir / "manifest.json").write_text(json.dumps({"summary": summary, "results": records}, indent=2))
+
+    print(f"\n✅ {summary['files'] - summary['errors']}/{summary['files']} files in {summary['wall_seconds']}s "
+          f"({summary['files_per_second']} files/s)")
+    for stage, stats in summary["stages"].items():
+        print(f"   {stage}: p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s")
+    if "mean_wer" in summary:
+        print(f"   word error rate: {summary['mean_wer']:.1%}")
+    if "mean_rtf" in summary:
+        print(f"   synthesis real-time factor: {summary['mean_rtf']:.3f}")
+    print(f"📄 Manifest: {output_dir / 'manifest.json'}")
+
+
+if __name__ == "__main__":
+    main()
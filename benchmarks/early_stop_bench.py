@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Early-stop benchmark, fully offline
+
+Runs assistant_enhanced.get_ai_response against a fake Ollama whose reply
+rambles on past max_sentences and then starts a "User:" turn of its own.
+Two settings:
+
+- baseline: no stop sequences, the whole reply is read and then trimmed
+- early stop: role stop sequences sent to the server, and the stream is
+  closed as soon as max_sentences sentences are complete
+
+Reports time per turn and tokens generated (counted by the server) and
+wasted (generated but never spoken) per turn.
+
+Usage:
+    python3 benchmarks/early_stop_bench.py [--turns 20] [--tokens-per-second 25] [--max-sentences 2]
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("STT_ENGINE", "google")  # Nothing is transcribed; skip loading offline STT
+from fake_ollama import start_fake_ollama  # noqa: E402
+from ollama_client import OllamaClient, ROLE_STOP_SEQUENCES  # noqa: E402
+from telemetry import Tracer  # noqa: E402
+
+RAMBLING_REPLY = (
+    "The capital of France is Paris. It sits on the Seine in the north of the country. "
+    "Paris has been the capital for most of the last thousand years. "
+    "It is known for the Eiffel Tower, the Louvre and its cafes. "
+    "Around two million people live in the city itself. "
+    "User: what about Germany? Assistant: The capital of Germany is Berlin."
+)
+
+
+def run(module, early_stop, args):
+    server = start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.latency,
+                               reply=RAMBLING_REPLY)
+    module.ollama = OllamaClient(base_url=server.url)
+    if early_stop:
+        module.GENERATION_OPTIONS["stop"] = ROLE_STOP_SEQUENCES
+    else:
+        module.GENERATION_OPTIONS.pop("stop", None)
+    module.CONFIG.update(early_stop=early_stop, max_sentences=args.max_sentences)
+    module.llm = module.create_llm()
+    module.tracer = Tracer()
+
+    seconds = []
+    for i in range(args.turns):
+        module.conversation_history.clear()
+        module.prompt_context.reset()
+        start = time.perf_counter()
+        module.get_ai_response(f"What is the capital of France? ({i})", on_sentence=lambda sentence: None)
+        seconds.append(time.perf_counter() - start)
+    time.sleep(0.2)  # Let the server notice the last closed stream
+    wasted = module.tracer.values.get("voice_llm_wasted_tokens_total", 0)
+    tokens = server.tokens
+    server.shutdown()
+    return seconds, tokens / args.turns, wasted / args.turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early-stop benchmark")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--tokens-per-second", type=float, default=25.0)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds before the first token")
+    parser.add_argument("--max-sentences", type=int, default=2)
+    args = parser.parse_args()
+
+    module = importlib.import_module("assistant_enhanced")
+    module.response_cache = None
+    module.router.log_path = None
+    module.CONFIG.update(save_history=False)
+
+    print(f"\n=== {args.turns} turns, {args.tokens_per_second:g} tokens/s, "
+          f"max {args.max_sentences} sentences ===")
+    print(f"{'setting':<12}{'turn p50':>10}{'p95':>8}{'tokens/turn':>13}{'wasted/turn':>13}")
+    for label, early_stop in (("baseline", False), ("early stop", True)):
+        seconds, tokens, wasted = run(module, early_stop, args)
+        print(f"{label:<12}{np.percentile(seconds, 50):>9.2f}s{np.percentile(seconds, 95):>7.2f}s"
+              f"{tokens:>13.1f}{wasted:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
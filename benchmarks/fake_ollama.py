@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Ollama HTTP API, for offline benchmarks
+
+- GET  /api/tags      -> one fake model
+- POST /api/generate  -> fixed reply, streamed as NDJSON token by token
+                         (or one JSON object with "stream": false)
+- POST /v1/chat/completions -> the same reply as OpenAI-style server-sent
+                         events, to stand in for an OpenAI-compatible backend
+
+Latency before the first token and the token rate are configurable, and
+the final chunk carries prompt_eval_count / eval_count / eval_duration
+and a `context` token array like the real server. Only the new prompt is
+"evaluated" when a context is sent back. The connection is kept alive
+between requests. A fraction of requests can be made slow to model a
+busy or reloading server.
+
+Usage:
+    python3 benchmarks/fake_ollama.py --port 11435 --tokens-per-second 25 --latency 0.3
+    OLLAMA_HOST=http://127.0.0.1:11435 python3 assistant_free.py
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("Sure, here is a short answer to that. "
+                 "I hope that helps, let me know if you want more detail.")
+
+
+def tokenize(text):
+    """Word-ish tokens that join back to the original text"""
+    return re.findall(r"\s*\S+", text)
+
+
+def reply_tokens(reply, stop=None, limit=None):
+    """Tokens of the reply, ending before the first stop sequence and after limit tokens"""
+    tokens = tokenize(reply)
+    text = ""
+    for i, token in enumerate(tokens):
+        text += token
+        if any(s in text for s in stop or ()):
+            # Keep the part of this token before the stop sequence
+            cut = min(text.find(s) for s in stop if s in text)
+            head = token[:len(token) - (len(text) - cut)]
+            tokens = tokens[:i] + ([head] if head else [])
+            break
+    return tokens[:limit] if limit else tokens
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # Client dropped an idle keep-alive connection
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        handlers = {"/api/generate": self._generate, "/v1/chat/completions": self._chat}
+        request = self._read_json()  # Always read the body, so the connection can be reused
+        if self.path not in handlers:
+            self._send_json(404, {"error": "not found"})
+            return
+        self.server.count_request()
+        try:
+            handlers[self.path](request)
+        finally:
+            self.server.count_request(-1)
+
+    def _chat(self, request):
+        tokens = reply_tokens(self.server.reply, request.get("stop"), request.get("max_tokens"))
+        time.sleep(self.server.first_token_delay())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._write_event({"choices": [{"index": 0, "delta": {"content": token}}]})
+                self.server.count_tokens()
+                time.sleep(1.0 / self.server.tokens_per_second)
+            self._write_event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self._write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count_cancelled()
+            self.close_connection = True
+
+    def _write_event(self, body):
+        data = f"data: {body if isinstance(body, str) else json.dumps(body)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _generate(self, request):
+        model = request.get("model", self.server.model)
+        prompt = request.get("prompt", "")
+        if not prompt:
+            # Warm-up request: the model "loads" and nothing is generated
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "load"})
+            return
+
+        started = time.perf_counter()
+        options = request.get("options") or {}
+        tokens = reply_tokens(self.server.reply, options.get("stop"), options.get("num_predict"))
+        prompt_tokens = max(1, len(prompt) // 4)
+        context = list(request.get("context") or [])
+        time.sleep(self.server.first_token_delay() + prompt_tokens * self.server.prompt_seconds_per_token)
+        prompt_done = time.perf_counter()
+        context += [0] * (prompt_tokens + len(tokens))
+
+        if request.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token in tokens:
+                    self._write_chunk({"model": model, "response": token, "done": False})
+                    self.server.count_tokens()
+                    time.sleep(1.0 / self.server.tokens_per_second)
+                self._write_chunk(self._final(model, "", started, prompt_done, prompt_tokens, len(tokens), context))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # Client stopped reading (cancelled turn)
+                self.server.count_cancelled()
+                self.close_connection = True
+        else:
+            time.sleep(len(tokens) / self.server.tokens_per_second)
+            self.server.count_tokens(len(tokens))
+            self._send_json(200, self._final(model, "".join(tokens), started, prompt_done,
+                                             prompt_tokens, len(tokens), context))
+
+    def _write_chunk(self, body):
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    @staticmethod
+    def _final(model, response, started, prompt_done, prompt_tokens, eval_tokens, context):
+        now = time.perf_counter()
+        return {
+            "model": model,
+            "response": response,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((now - started) * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int((prompt_done - started) * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int((now - prompt_done) * 1e9),
+            "context": context,
+        }
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, tokens_per_second=25.0, latency=0.3,
+                 reply=DEFAULT_REPLY, model="fake", prompt_seconds_per_token=0.0,
+                 slow_fraction=0.0, slow_latency=5.0, seed=None):
+        super().__init__((host, port), FakeOllamaHandler)
+        self.tokens_per_second = tokens_per_second
+        self.latency = latency
+        self.slow_fraction = slow_fraction  # Share of requests that wait slow_latency instead
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.prompt_seconds_per_token = prompt_seconds_per_token
+        self.reply = reply
+        self.model = model
+        self.requests = 0
+        self.active = 0  # Requests being answered right now
+        self.max_active = 0
+        self.cancelled = 0  # Streams the client hung up on
+        self.tokens = 0  # Tokens "generated" over all requests
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self, delta=1):
+        """Track a request starting (+1) or finishing (-1)"""
+        with self.lock:
+            if delta > 0:
+                self.requests += 1
+            self.active += delta
+            self.max_active = max(self.max_active, self.active)
+
+    def count_tokens(self, n=1):
+        with self.lock:
+            self.tokens += n
+
+    def count_cancelled(self):
+        with self.lock:
+            self.cancelled += 1
+
+    def first_token_delay(self):
+        with self.lock:
+            slow = self.random.random() < self.slow_fraction
+        return self.slow_latency if slow else self.latency
+
+
+def start_fake_ollama(**kwargs):
+    """Start a FakeOllamaServer on a background thread and return it"""
+    server = FakeOllamaServer(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens-per-second", type=float, default=25.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--prompt-ms-per-token", type=float, default=0.0,
+                        help="extra prompt evaluation time per prompt token")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="share of requests that are slow")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="seconds to first token when slow")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.tokens_per_second, args.latency, args.reply,
+                              prompt_seconds_per_token=args.prompt_ms_per_token / 1000,
+                              slow_fraction=args.slow_fraction, slow_latency=args.slow_latency)
+    print(f"Fake Ollama listening on {server.url} "
+          f"({args.tokens_per_second:g} tokens/s, {args.latency:g}s to first token)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
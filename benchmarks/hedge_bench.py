@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Hedged LLM request benchmark, fully offline
+
+Two fake servers: a local "Ollama" that is occasionally slow (busy or
+reloading the model) and an OpenAI-compatible fallback that is slower on
+average but steady. The same requests run without hedging and with
+hedging after each given deadline. Reports end-to-end first-token and
+total latency (p50/p95/p99), how often the fallback was asked and won,
+and how many losing streams were cancelled.
+
+Usage:
+    python3 benchmarks/hedge_bench.py [--requests 100] [--hedge-after 0.5 1.0]
+        [--slow-fraction 0.1] [--slow-latency 5] [--fallback-latency 0.6]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_ollama import start_fake_ollama  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+from llm_backends import LLMRequest, OllamaBackend, OpenAIBackend, HedgedLLM  # noqa: E402
+
+
+def run(hedge_after, args):
+    primary = start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.latency,
+                                slow_fraction=args.slow_fraction, slow_latency=args.slow_latency, seed=1)
+    fallback = start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.fallback_latency)
+    backends = [OllamaBackend(OllamaClient(base_url=primary.url), "fake")]
+    if hedge_after is not None:
+        backends.append(OpenAIBackend("fake", base_url=f"{fallback.url}/v1"))
+    llm = HedgedLLM(backends, hedge_after)
+
+    first_token, total = [], []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        first = None
+        for fragment in llm.stream(LLMRequest(f"Question number {i}?")):
+            if first is None:
+                first = time.perf_counter() - start
+        first_token.append(first)
+        total.append(time.perf_counter() - start)
+    stats = llm.stats()
+    if stats["hedged"]:
+        # A slow request only notices the closed connection when it starts writing
+        time.sleep(args.slow_latency)
+    stats["cancelled_on_server"] = primary.cancelled + fallback.cancelled
+    primary.shutdown()
+    fallback.shutdown()
+    return first_token, total, stats
+
+
+def ms(values, q):
+    return np.percentile(values, q) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged LLM request benchmark")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--hedge-after", type=float, nargs="+", default=[0.5, 1.0])
+    parser.add_argument("--latency", type=float, default=0.3, help="primary seconds to first token")
+    parser.add_argument("--slow-fraction", type=float, default=0.1, help="share of slow primary requests")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="slow primary seconds to first token")
+    parser.add_argument("--fallback-latency", type=float, default=0.6)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    args = parser.parse_args()
+
+    print(f"\n=== {args.requests} requests; primary {args.latency:g}s "
+          f"({args.slow_fraction:.0%} at {args.slow_latency:g}s), fallback {args.fallback_latency:g}s ===")
+    print(f"{'hedge after':<12}{'first p50':>10}{'p95':>8}{'p99':>8}{'total p99':>11}"
+          f"{'hedged':>8}{'fallback wins':>15}{'cancelled':>11}")
+    for hedge_after in [None] + args.hedge_after:
+        first_token, total, stats = run(hedge_after, args)
+        wins = stats["backends"].get("openai", {}).get("wins", 0)
+        label = "off" if hedge_after is None else f"{hedge_after:g}s"
+        print(f"{label:<12}{ms(first_token, 50):>10.0f}{ms(first_token, 95):>8.0f}{ms(first_token, 99):>8.0f}"
+              f"{ms(total, 99):>11.0f}{stats['hedged']:>8}{wins:>15}{stats['cancelled_on_server']:>11}")
+        for name, backend in stats["backends"].items():
+            if "first_token_p50_ms" in backend:
+                print(f"    {name}: first token p50 {backend['first_token_p50_ms']:.0f} / "
+                      f"p95 {backend['first_token_p95_ms']:.0f} / p99 {backend['first_token_p99_ms']:.0f} ms, "
+                      f"wins {backend['wins']}, cancelled {backend['cancelled']}")
+
+
+if __name__ == "__main__":
+    main()
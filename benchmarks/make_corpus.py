@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Generate the benchmark corpus: one 16 kHz mono WAV per utterance plus
+manifest.json with the transcript of each file.
+
+With espeak-ng installed (--espeak) the utterances are real synthesized
+speech, so real STT engines can be benchmarked too. Otherwise they are
+deterministic speech-like signals (voiced harmonics with a syllable
+envelope and a little background noise) - enough for capture/VAD timing,
+with transcripts supplied by the harness.
+
+Usage:
+    python3 benchmarks/make_corpus.py [benchmarks/corpus] [--espeak]
+"""
+
+import sys
+import json
+import wave
+import shutil
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+UTTERANCES = [
+    "What is the capital of France",
+    "Tell me a fun fact about octopuses",
+    "How far away is the moon",
+    "What time is it",
+    "Give me a quick tip for sleeping better",
+    "Why is the sky blue",
+    "What's the date today",
+    "How do I boil an egg",
+    "Recommend a good science fiction book",
+    "What is the speed of light",
+    "Explain what a black hole is",
+    "How many legs does a spider have",
+]
+
+
+def synthetic_speech(text, rng):
+    """Voiced, syllable-modulated tone roughly as long as the spoken text"""
+    syllables = max(2, int(len(text) / 3.5))
+    seconds = syllables * 0.2
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(110, 190) * (1 + 0.08 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(np.pi * t / 0.2) ** 2, 0, 1)  # One bump per syllable
+    envelope *= rng.uniform(0.6, 1.0, syllables).repeat(int(0.2 * SAMPLE_RATE))[:len(t)]
+    return 0.3 * voiced * envelope
+
+
+def espeak_speech(text):
+    with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+        subprocess.run(["espeak-ng", "-w", tmp.name, text], check=True)
+        with wave.open(tmp.name, "rb") as wav:
+            rate = wav.getframerate()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16) / 32768.0
+    # Resample to 16 kHz (linear interpolation is plenty for STT)
+    n_out = int(len(samples) * SAMPLE_RATE / rate)
+    return np.interp(np.linspace(0, len(samples) - 1, n_out), np.arange(len(samples)), samples)
+
+
+def write_wav(path, signal, rng):
+    lead = np.zeros(int(0.5 * SAMPLE_RATE))
+    tail = np.zeros(int(0.3 * SAMPLE_RATE))
+    audio = np.concatenate([lead, signal, tail])
+    audio += rng.normal(0, 0.002, len(audio))  # Room noise
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    return len(audio) / SAMPLE_RATE
+
+
+def make_corpus(folder, use_espeak=False, seed=0):
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    manifest = []
+    for i, text in enumerate(UTTERANCES, 1):
+        signal = espeak_speech(text) if use_espeak else synthetic_speech(text, rng)
+        name = f"utterance_{i:02d}.wav"
+        seconds = write_wav(folder / name, signal, rng)
+        manifest.append({"file": name, "text": text, "seconds": round(seconds, 3)})
+    (folder / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the benchmark WAV corpus")
+    parser.add_argument("folder", nargs="?", default=str(Path(__file__).parent / "corpus"))
+    parser.add_argument("--espeak", action="store_true", help="render real speech with espeak-ng")
+    args = parser.parse_args()
+
+    if args.espeak and not shutil.which("espeak-ng"):
+        print("❌ espeak-ng not found (apt install espeak-ng / brew install espeak-ng)")
+        sys.exit(1)
+    manifest = make_corpus(args.folder, args.espeak)
+    print(f"✅ Wrote {len(manifest)} utterances to {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
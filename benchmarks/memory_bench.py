@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Memory index build/query benchmark
+
+Builds a MemoryIndex from N synthetic exchanges (incrementally, in
+batches, like a growing history), then measures top-k query latency with
+a cold (freshly memory-mapped) and warm index, and checks that an exact
+stored question comes back as the top hit.
+
+Usage:
+    python3 benchmarks/memory_bench.py [--sizes 10000 100000] [--dim 256] [--k 3]
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from memory_index import MemoryIndex, HashingEmbedder  # noqa: E402
+
+TOPICS = ["weather", "music", "cooking", "travel", "space", "history", "sports", "movies",
+          "books", "science", "health", "coding", "gardening", "animals", "art", "money"]
+WORDS = ["what", "how", "why", "tell", "me", "about", "best", "way", "to", "learn", "make",
+         "find", "good", "the", "a", "for", "beginners", "quickly", "today", "ideas", "facts",
+         "fun", "history", "of", "tips", "easy", "cheap", "healthy", "famous", "new"]
+
+
+def synthetic_history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    entries = []
+    for i in range(1, n + 1):
+        topic = TOPICS[rng.integers(len(TOPICS))]
+        words = rng.choice(WORDS, size=rng.integers(4, 10))
+        user = f"{' '.join(words[:3])} {topic} {' '.join(words[3:])} {i}"
+        assistant = f"Here is something about {topic}: {' '.join(rng.choice(WORDS, size=12))}."
+        entries.append({"id": i, "user": user, "assistant": assistant})
+    return entries
+
+
+def ms(values, q):
+    return np.percentile(values, q) * 1000
+
+
+def run(n, args):
+    directory = Path(tempfile.mkdtemp(prefix="memory_bench_"))
+    try:
+        embedder = HashingEmbedder(args.dim)
+        entries = synthetic_history(n)
+
+        start = time.perf_counter()
+        embedder.embed([f"{e['user']}\n{e['assistant']}" for e in entries[:1000]])
+        embed_rate = 1000 / (time.perf_counter() - start)
+
+        index = MemoryIndex(directory, embedder)
+        start = time.perf_counter()
+        for i in range(0, n, args.batch):
+            index.add(entries[i:i + args.batch])
+        build_seconds = time.perf_counter() - start
+        index.close()
+
+        # Cold: reopen (maps the files again) and run the first query
+        start = time.perf_counter()
+        index = MemoryIndex(directory, embedder)
+        open_ms = (time.perf_counter() - start) * 1000
+        rng = np.random.default_rng(1)
+        probes = [entries[i] for i in rng.integers(0, n, args.queries)]
+        start = time.perf_counter()
+        index.search(probes[0]["user"], k=args.k)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        latencies, hits = [], 0
+        for entry in probes:
+            start = time.perf_counter()
+            results = index.search(entry["user"], k=args.k, min_score=0.0)
+            latencies.append(time.perf_counter() - start)
+            hits += bool(results) and results[0][0] == entry["id"]
+
+        # Appending one exchange to a full index (the per-turn cost)
+        start = time.perf_counter()
+        index.add([{"id": n + 1, "user": "one more question", "assistant": "one more answer"}])
+        append_ms = (time.perf_counter() - start) * 1000
+        size_mb = sum(p.stat().st_size for p in directory.iterdir()) / 1e6
+        index.close()
+
+        return {
+            "entries": n,
+            "build_s": build_seconds,
+            "embed_per_s": embed_rate,
+            "open_ms": open_ms,
+            "cold_query_ms": cold_ms,
+            "query_p50_ms": ms(latencies, 50),
+            "query_p95_ms": ms(latencies, 95),
+            "append_ms": append_ms,
+            "top1": hits / len(probes),
+            "disk_mb": size_mb,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=256, help="exchanges per incremental add")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"\n=== Memory index: hashing-{args.dim}, top-{args.k} ===")
+    print(f"{'entries':>9}{'build s':>9}{'embed/s':>9}{'open ms':>9}{'cold ms':>9}"
+          f"{'q p50':>8}{'q p95':>8}{'add ms':>8}{'top1':>6}{'MB':>7}")
+    for n in args.sizes:
+        r = run(n, args)
+        print(f"{r['entries']:>9}{r['build_s']:>9.2f}{r['embed_per_s']:>9.0f}{r['open_ms']:>9.2f}"
+              f"{r['cold_query_ms']:>9.2f}{r['query_p50_ms']:>8.2f}{r['query_p95_ms']:>8.2f}"
+              f"{r['append_ms']:>8.2f}{r['top1']:>6.2f}{r['disk_mb']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark, fully offline (works on Linux)
+
+Runs the assistant's own listen_to_microphone -> get_ai_response -> speak
+turn against:
+- the WAV corpus from make_corpus.py, replayed in real time through a
+  CaptureSession (VAD endpointing exactly as with a microphone)
+- a fake Ollama server with configurable latency and token rate
+- a fake voice (configurable synthesis speed) or the real Jarvis voice
+  playing into a NullSink
+
+Reports p50/p95/p99 per stage and for time-to-first-audio (end of the
+user's speech -> first assistant audio).
+
+Usage:
+    python3 benchmarks/pipeline_bench.py [--assistant assistant_enhanced|assistant_free]
+        [--corpus benchmarks/corpus] [--repeat 3] [--stt manifest|auto|vosk|whisper]
+        [--tts fake|jarvis] [--tokens-per-second 25] [--latency 0.3] [--no-speech-queue] [--json]
+"""
+
+import sys
+import json
+import time
+import argparse
+import importlib
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_ollama import start_fake_ollama  # noqa: E402
+from make_corpus import make_corpus  # noqa: E402
+from capture import CaptureSession, WavFileSource  # noqa: E402
+from jarvis_voice import SpeechQueue  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+from stt import SpeechToText, create_stt  # noqa: E402
+
+STAGES = ["endpoint", "stt", "llm_first_sentence", "llm", "tts_first_synthesis", "tts",
+          "time_to_first_audio", "turn"]
+
+
+class Turn:
+    """Timestamps of one turn (perf_counter seconds)"""
+
+    def __init__(self, audio_end):
+        self.audio_end = audio_end  # When the corpus file finished playing
+        self.marks = {}
+        self.speak_seconds = 0.0
+        self.llm_speak_seconds = 0.0  # Speaking done inside get_ai_response (streamed replies)
+        self.synth_seconds = 0.0
+
+    def mark(self, name):
+        self.marks.setdefault(name, time.perf_counter())
+
+    def stages(self):
+        m = self.marks
+        spans = {}
+        if "speech_end" in m:
+            spans["endpoint"] = m["speech_end"] - self.audio_end
+        if "stt_end" in m:
+            spans["stt"] = m["stt_end"] - m["stt_start"]
+        if "llm_end" in m:
+            if "first_sentence" in m:
+                spans["llm_first_sentence"] = m["first_sentence"] - m["llm_start"]
+            # Streamed replies are spoken inside get_ai_response; don't count that as LLM time
+            spans["llm"] = m["llm_end"] - m["llm_start"] - self.llm_speak_seconds
+        if "first_audio" in m:
+            spans["tts_first_synthesis"] = self.synth_seconds
+            spans["tts"] = self.speak_seconds
+            spans["time_to_first_audio"] = m["first_audio"] - m["speech_end"]
+        if "speech_end" in m and "done" in m:
+            spans["turn"] = m["done"] - m["speech_end"]
+        return spans
+
+
+class ManifestSTT(SpeechToText):
+    """Returns the known transcript of the file being replayed"""
+
+    name = "manifest"
+
+    def __init__(self):
+        self.expected = ""
+
+    def _transcribe(self, audio):
+        return self._result(self.expected)
+
+
+class FakeVoice:
+    """
+    Stands in for JarvisVoice: 'synthesizes' at synth_rtf x real time, then
+    'plays' for as long as the text would take to say. speech_queue() runs
+    the real SpeechQueue over it, so streamed replies overlap the same way.
+    """
+
+    name = "fake"
+    sample_rate = 1000  # Of the silent 'audio' handed to SpeechQueue
+
+    def __init__(self, words_per_minute=180, synth_rtf=0.3, realtime=True, on_audio=None):
+        self.words_per_minute = words_per_minute
+        self.synth_rtf = synth_rtf
+        self.realtime = realtime
+        self.on_audio = on_audio or (lambda: None)
+        self.stopped = threading.Event()
+        self.last_timing = {}
+        self.selector = self
+        self.sink = None
+        self.current_queue = None
+
+    def _seconds(self, text):
+        return max(0.3, len(text.split()) / self.words_per_minute * 60)
+
+    # SpeechQueue's view: voice.selector, voice.synthesize_with, voice.output().play
+
+    def choose(self, text, short=True):
+        return self
+
+    def fastest(self, text, exclude=()):
+        return None
+
+    def synthesize_with(self, engine, text):
+        seconds = self._seconds(text)
+        time.sleep(seconds * self.synth_rtf)
+        return np.zeros(int(seconds * self.sample_rate), dtype=np.float32), self.sample_rate
+
+    def output(self):
+        return self
+
+    def play(self, samples, sample_rate):
+        self.on_audio()
+        if self.realtime:
+            self.stopped.wait(len(samples) / sample_rate)
+
+    def speech_queue(self, lookahead=1, on_phrase=None):
+        self.stopped.clear()
+        self.current_queue = SpeechQueue(self, lookahead, on_phrase)
+        return self.current_queue
+
+    def speak(self, text):
+        seconds = self._seconds(text)
+        self.stopped.clear()
+        time.sleep(seconds * self.synth_rtf)
+        self.on_audio()
+        if self.realtime:
+            self.stopped.wait(seconds)
+        self.last_timing = {
+            "synthesis_seconds": seconds * self.synth_rtf,
+            "audio_seconds": seconds,
+            "rtf": self.synth_rtf,
+        }
+
+    def stop(self):
+        if self.current_queue:
+            self.current_queue.stop()
+        self.stopped.set()
+
+    def prewarm(self, phrases):
+        pass
+
+
+class TimedSink:
+    """Wraps an AudioSink to timestamp the start of playback"""
+
+    def __init__(self, sink, on_audio):
+        self.sink = sink
+        self.on_audio = on_audio
+
+    def play(self, samples, sample_rate):
+        self.on_audio()
+        self.sink.play(samples, sample_rate)
+
+    def stop(self):
+        self.sink.stop()
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "n": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50 * 1000, 1), "p95": round(p95 * 1000, 1),
+            "p99": round(p99 * 1000, 1), "n": len(values)}
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.turn = None
+        self.results = []
+        self.local_turns = 0
+        self.missed = 0
+
+    def on_audio(self):
+        turn = self.turn
+        if turn and "first_audio" not in turn.marks:
+            turn.mark("first_audio")
+            turn.synth_seconds = turn.marks["first_audio"] - turn.marks["tts_start"]
+
+    def setup(self):
+        args = self.args
+        self.server = start_fake_ollama(tokens_per_second=args.tokens_per_second,
+                                        latency=args.latency)
+        self.module = module = importlib.import_module(args.assistant)
+        module.ollama = OllamaClient(base_url=self.server.url)
+        if hasattr(module, "create_llm"):
+            module.llm = module.create_llm()
+        if not args.response_cache:
+            module.response_cache = None
+        module.router.log_path = None
+        is_enhanced = hasattr(module, "CONFIG")
+        if is_enhanced:
+            module.CONFIG.update(use_jarvis=True, stream_responses=not args.no_stream, save_history=False)
+            self.stream = module.CONFIG["stream_responses"]
+        else:
+            module.USE_JARVIS = True
+            module.STREAM_RESPONSES = not args.no_stream
+            self.stream = module.STREAM_RESPONSES
+        self.speak_name = "speak_with_tts" if is_enhanced else "speak_with_system_tts"
+
+        # Voice
+        if args.tts == "jarvis":
+            from jarvis_voice import JarvisVoice
+            from audio_output import NullSink
+            voice = JarvisVoice(sink=TimedSink(NullSink(realtime=True), self.on_audio), background=False)
+            if not voice.tts:
+                print("❌ Coqui TTS is not available; use --tts fake")
+                sys.exit(1)
+        else:
+            voice = FakeVoice(synth_rtf=args.synth_rtf, realtime=not args.instant_playback,
+                              on_audio=self.on_audio)
+        module.jarvis_tts = voice
+
+        # Speech-to-text
+        self.manifest_stt = None
+        if args.stt == "manifest":
+            self.manifest_stt = engine = ManifestSTT()
+        else:
+            engine = create_stt(args.stt)
+        future = Future()
+        future.set_result(engine)
+        module.stt_engine = future
+
+        # Corpus replayed through a real CaptureSession
+        self.source = WavFileSource(realtime=True, gap_seconds=0.0)
+        module.capture_session = CaptureSession(source=self.source)
+        module.attach_streaming_stt(future)
+        module.capture_session.open()
+        self._instrument()
+
+    def _instrument(self):
+        module = self.module
+        harness = self
+
+        session = module.capture_session
+        listen = session.listen
+
+        def timed_listen(*a, **kw):
+            audio = listen(*a, **kw)
+            if audio is not None:
+                harness.turn.mark("speech_end")
+            return audio
+        session.listen = timed_listen
+
+        recognize = module.recognize_speech
+
+        def timed_recognize(audio):
+            harness.turn.mark("stt_start")
+            try:
+                return recognize(audio)
+            finally:
+                harness.turn.mark("stt_end")
+        module.recognize_speech = timed_recognize
+
+        speak = getattr(module, self.speak_name)
+
+        def timed_speak(text):
+            turn = harness.turn
+            turn.mark("tts_start")
+            start = time.perf_counter()
+            try:
+                speak(text)
+            finally:
+                turn.speak_seconds += time.perf_counter() - start
+        setattr(module, self.speak_name, timed_speak)
+        self.speak = timed_speak
+
+    def run_turn(self, entry, corpus):
+        path = corpus / entry["file"]
+        if self.manifest_stt:
+            self.manifest_stt.expected = entry["text"]
+        self.turn = turn = Turn(time.perf_counter() + entry["seconds"])
+        self.source.add(path)
+
+        text = self.module.listen_to_microphone()
+        if text is None:
+            self.missed += 1
+            return
+
+        intent, result = self.module.router.route(text)
+        if intent:
+            self.local_turns += 1
+        elif self.stream and self.args.speech_queue:
+            self._streamed_turn(turn, text)
+        else:
+            spoken = []
+
+            def on_sentence(sentence):
+                turn.mark("first_sentence")
+                spoken.append(sentence)
+                self.speak(sentence)
+            turn.mark("llm_start")
+            reply = self.module.get_ai_response(text, on_sentence=on_sentence if self.stream else None)
+            turn.mark("llm_end")
+            turn.llm_speak_seconds = turn.speak_seconds
+            if not spoken:
+                self.speak(reply)
+        turn.mark("done")
+        self.results.append(turn.stages())
+
+    def _streamed_turn(self, turn, text):
+        """The assistant's streamed path: sentences go into streamed_speech() as they arrive"""
+        spoken = []
+        start = None
+        turn.mark("llm_start")
+        with self.module.streamed_speech() as speech:
+            def on_sentence(sentence):
+                nonlocal start
+                turn.mark("first_sentence")
+                turn.mark("tts_start")
+                start = start or time.perf_counter()
+                spoken.append(sentence)
+                speech.put(sentence)
+            reply = self.module.get_ai_response(text, on_sentence=on_sentence)
+            turn.mark("llm_end")
+        if start:
+            turn.speak_seconds = time.perf_counter() - start
+        if not spoken:
+            self.speak(reply)
+
+    def run(self, manifest, corpus):
+        for _ in range(self.args.repeat):
+            for entry in manifest:
+                self.run_turn(entry, corpus)
+        self.module.capture_session.close()
+        self.server.shutdown()
+
+    def report(self):
+        summary = {stage: percentiles([r[stage] for r in self.results if stage in r]) for stage in STAGES}
+        print(f"\n=== Pipeline benchmark: {self.args.assistant}, stt={self.args.stt}, tts={self.args.tts}, "
+              f"{self.args.tokens_per_second:g} tok/s, {self.args.latency:g}s first token ===")
+        print(f"turns: {len(self.results)}  local answers: {self.local_turns}  missed utterances: {self.missed}")
+        print(f"{'stage (ms)':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'n':>6}")
+        for stage, p in summary.items():
+            if p["n"]:
+                print(f"{stage:<22}{p['p50']:>9}{p['p95']:>9}{p['p99']:>9}{p['n']:>6}")
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark")
+    parser.add_argument("--assistant", default="assistant_enhanced",
+                        choices=["assistant_enhanced", "assistant_free"])
+    parser.add_argument("--corpus", type=Path, default=Path(__file__).parent / "corpus")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--stt", default="manifest", help="manifest (known transcripts), auto, vosk, whisper, google")
+    parser.add_argument("--tts", default="fake", choices=["fake", "jarvis"])
+    parser.add_argument("--synth-rtf", type=float, default=0.3, help="fake voice synthesis real-time factor")
+    parser.add_argument("--instant-playback", action="store_true", help="fake voice returns right after synthesis")
+    parser.add_argument("--tokens-per-second", type=float, default=25.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Ollama time to first token")
+    parser.add_argument("--no-stream", action="store_true", help="wait for the whole reply before speaking")
+    parser.add_argument("--no-speech-queue", dest="speech_queue", action="store_false",
+                        help="speak streamed sentences one at a time (no synthesis/playback overlap)")
+    parser.add_argument("--response-cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    manifest_path = args.corpus / "manifest.json"
+    if not manifest_path.exists():
+        print(f"📦 Generating corpus in {args.corpus}")
+        make_corpus(args.corpus)
+    manifest = json.loads(manifest_path.read_text())
+
+    harness = Harness(args)
+    harness.setup()
+    harness.run(manifest, args.corpus)
+    summary = harness.report()
+    if args.json:
+        print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
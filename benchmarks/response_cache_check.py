@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Response cache check, fully offline
+
+Runs assistant_enhanced.get_ai_response against a fake Ollama with the
+response cache in a temporary directory and checks that:
+
+- a repeated standalone question is answered from the cache on the
+  second turn, even though the conversation history has grown
+- it is still answered from the cache after a restart (a new cache on
+  the same database)
+- follow-ups and questions about the speaker always go to the model
+
+Exits with status 1 if any check fails.
+
+Usage:
+    python3 benchmarks/response_cache_check.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("STT_ENGINE", "google")  # Nothing is transcribed; skip loading offline STT
+from fake_ollama import start_fake_ollama  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from telemetry import Tracer  # noqa: E402
+
+QUESTION = "What is the capital of France?"
+
+
+def main():
+    import assistant_enhanced as module
+
+    server = start_fake_ollama(tokens_per_second=500, latency=0.01,
+                               reply="The capital of France is Paris.")
+    module.ollama = OllamaClient(base_url=server.url)
+    module.llm = module.create_llm()
+    module.tracer = Tracer()
+    module.CONFIG.update(save_history=False, memory=False)
+    module.conversation_history.clear()
+    module.prompt_context.reset()
+
+    failures = []
+
+    def ask(text):
+        before = server.requests
+        module.get_ai_response(text, on_sentence=lambda sentence: None)
+        return server.requests > before  # True if the model was asked
+
+    def check(name, ok):
+        print(f"{'✅' if ok else '❌'} {name}")
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "response_cache.db")
+        module.response_cache = ResponseCache(db)
+
+        check("first turn goes to the model", ask(QUESTION))
+        ask("Tell me about bees")
+        check("repeated question hits the cache", not ask(QUESTION))
+        check("filler and case don't matter", not ask("hey what is the capital of france"))
+        check("follow-up goes to the model", ask("What about Germany?"))
+        check("question about the speaker goes to the model", ask("What is my name?"))
+        print(f"   {module.response_cache.stats()}")
+        module.response_cache.close()
+
+        # Restart: a new cache on the same database, a fresh conversation
+        module.response_cache = ResponseCache(db)
+        module.conversation_history.clear()
+        module.prompt_context.reset()
+        check("repeated question hits the cache after a restart", not ask(QUESTION))
+        print(f"   {module.response_cache.stats()}")
+        module.response_cache.close()
+
+    server.shutdown()
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ All checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Load test for server.py, fully offline
+
+Starts a fake Ollama server, runs server.py against it (in a temporary
+working directory, so no history or cache files are touched), and has N
+clients hold M-turn conversations at the same time, each in its own
+session.
+
+Reports time to the first sentence / first audio and the whole reply
+(p50/p95/p99), time spent queued, throughput, the most Ollama requests
+seen at once (should never exceed --llm-workers) and how evenly the
+clients were served (Jain's fairness index, 1.0 = perfectly even).
+
+Usage:
+    python3 benchmarks/server_load.py [--clients 8] [--turns 3] [--llm-workers 2]
+        [--tokens-per-second 25] [--latency 0.3] [--audio]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_ollama import start_fake_ollama  # noqa: E402
+
+TOPICS = ["the moon", "volcanoes", "tea", "octopuses", "jazz", "bridges", "rainbows", "chess",
+          "glaciers", "bees", "lighthouses", "comets"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(ollama_url, port, args, workdir):
+    command = [sys.executable, str(ROOT / "server.py"), "--port", str(port),
+               "--llm-workers", str(args.llm_workers)]
+    if not args.audio:
+        command.append("--no-audio")
+    env = dict(os.environ, OLLAMA_HOST=ollama_url, STT_ENGINE="google",
+               JARVIS_TTS_CACHE=str(Path(workdir) / "tts_cache"))
+    log = open(Path(workdir) / "server.log", "w")
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(f"{url}/v1/health", timeout=1).status_code == 200:
+                return process, url
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    log.close()
+    print((Path(workdir) / "server.log").read_text())
+    raise RuntimeError("server.py did not start")
+
+
+def client(url, index, args, results):
+    """One device: a session and a few turns back to back"""
+    http = requests.Session()
+    session_id = http.post(f"{url}/v1/sessions", json={}).json()["session_id"]
+    for turn in range(args.turns):
+        text = f"Tell me something about {TOPICS[(index + turn) % len(TOPICS)]}, number {index}.{turn}"
+        record = {"client": index, "turn": turn, "error": None}
+        start = time.perf_counter()
+        try:
+            with http.post(f"{url}/v1/chat", json={"session_id": session_id, "text": text, "audio": args.audio},
+                           stream=True, timeout=args.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    now = time.perf_counter() - start
+                    if event["event"] == "start":
+                        record["queue"] = event["queue_ms"] / 1000
+                    elif event["event"] == "sentence":
+                        record.setdefault("first_sentence", now)
+                    elif event["event"] == "audio":
+                        record.setdefault("first_audio", now)
+                    elif event["event"] == "error":
+                        record["error"] = event.get("message")
+                    elif event["event"] == "done":
+                        record["total"] = now
+        except requests.exceptions.RequestException as e:
+            record["error"] = str(e)
+        if "total" not in record and not record["error"]:
+            record["error"] = "stream ended early"
+        results.append(record)
+    http.delete(f"{url}/v1/sessions/{session_id}")
+
+
+def ms(values, q):
+    return np.percentile(values, q) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assistant server load test")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--tokens-per-second", type=float, default=25.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Ollama seconds to first token")
+    parser.add_argument("--audio", action="store_true", help="ask for audio (needs Coqui TTS)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    ollama = start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.latency)
+    with tempfile.TemporaryDirectory(prefix="server_load_") as workdir:
+        process, url = start_server(ollama.url, free_port(), args, workdir)
+        try:
+            results = []
+            threads = [threading.Thread(target=client, args=(url, i, args, results))
+                       for i in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    ok = [r for r in results if not r["error"]]
+    print(f"\n=== {args.clients} clients x {args.turns} turns, {args.llm_workers} LLM workers, "
+          f"fake model {args.tokens_per_second:g} tokens/s ===")
+    print(f"{'(ms)':<16}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name in ("queue", "first_sentence", "first_audio", "total"):
+        values = [r[name] for r in ok if name in r]
+        if values:
+            print(f"{name:<16}{ms(values, 50):>9.0f}{ms(values, 95):>9.0f}{ms(values, 99):>9.0f}")
+    print(f"throughput: {len(ok) / elapsed:.2f} replies/s ({len(ok)}/{len(results)} ok, "
+          f"{len(results) - len(ok)} errors)")
+    print(f"most Ollama requests at once: {ollama.max_active} (cap {args.llm_workers})")
+    per_client = [np.mean([r["total"] for r in ok if r["client"] == i]) for i in range(args.clients)
+                  if any(r["client"] == i for r in ok)]
+    if per_client:
+        fairness = sum(per_client) ** 2 / (len(per_client) * sum(x * x for x in per_client))
+        print(f"per-client mean total: {min(per_client) * 1000:.0f}-{max(per_client) * 1000:.0f} ms, "
+              f"fairness {fairness:.3f}")
+    for r in results:
+        if r["error"]:
+            print(f"❌ client {r['client']} turn {r['turn']}: {r['error']}")
+    ollama.shutdown()
+
+
+if __name__ == "__main__":
+    main()
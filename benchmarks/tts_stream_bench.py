@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Streamed vs buffered playback of a cloud TTS reply, fully offline
+
+A fake ElevenLabs-style generator yields raw 16-bit PCM chunks: the
+first after a time-to-first-byte, the rest at a configurable multiple of
+real time. The same chunks are played two ways into a real-time NullSink:
+
+- buffered: join every chunk, then play (the old speak_with_elevenlabs)
+- streamed: AudioSink.play_stream, starting with the first chunk
+
+Reports time to first audio and total time per reply length.
+
+Usage:
+    python3 benchmarks/tts_stream_bench.py [--ttfb 0.3] [--speed 4] [--words 10 40 120]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from audio_output import NullSink, pcm_chunks_to_samples  # noqa: E402
+
+SAMPLE_RATE = 22050
+WORDS_PER_SECOND = 2.5  # Speaking rate of the fake voice
+
+
+def fake_pcm_stream(words, ttfb, speed, chunk_bytes=4096):
+    """PCM for `words` words of speech, delivered like a streaming TTS API"""
+    total = int(words / WORDS_PER_SECOND * SAMPLE_RATE) * 2
+    time.sleep(ttfb)
+    sent = 0
+    while sent < total:
+        size = min(chunk_bytes, total - sent)
+        yield b"\0" * size
+        sent += size
+        time.sleep(size / 2 / SAMPLE_RATE / speed)
+
+
+class TimedSink(NullSink):
+    """Real-time NullSink that notes when audio starts"""
+
+    def __init__(self):
+        super().__init__(realtime=True)
+        self.first_audio = None
+
+    def play(self, samples, sample_rate):
+        self.first_audio = time.perf_counter()
+        super().play(samples, sample_rate)
+
+    def play_stream(self, chunks, sample_rate):
+        def timed():
+            for chunk in chunks:
+                if self.first_audio is None:
+                    self.first_audio = time.perf_counter()
+                yield chunk
+        super().play_stream(timed(), sample_rate)
+
+
+def run(words, args, streamed):
+    sink = TimedSink()
+    start = time.perf_counter()
+    chunks = fake_pcm_stream(words, args.ttfb, args.speed, args.chunk_bytes)
+    if streamed:
+        sink.play_stream(chunks, SAMPLE_RATE)
+    else:
+        samples = pcm_chunks_to_samples(chunks)
+        time.sleep(args.decode_ms / 1000)  # MP3 decode of the whole reply
+        sink.play(samples, SAMPLE_RATE)
+    return sink.first_audio - start, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed vs buffered TTS playback")
+    parser.add_argument("--ttfb", type=float, default=0.3, help="seconds to the first chunk")
+    parser.add_argument("--speed", type=float, default=4.0, help="delivery speed, x real time")
+    parser.add_argument("--chunk-bytes", type=int, default=4096)
+    parser.add_argument("--decode-ms", type=float, default=0.0, help="MP3 decode time added to buffered")
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 40, 120])
+    args = parser.parse_args()
+
+    print(f"\n=== TTFB {args.ttfb:g}s, delivery {args.speed:g}x real time ===")
+    print(f"{'words':>6}{'audio s':>9}{'buffered TTFA':>15}{'streamed TTFA':>15}{'buffered total':>16}"
+          f"{'streamed total':>16}")
+    for words in args.words:
+        buffered_first, buffered_total = run(words, args, streamed=False)
+        streamed_first, streamed_total = run(words, args, streamed=True)
+        print(f"{words:>6}{words / WORDS_PER_SECOND:>9.1f}{buffered_first * 1000:>13.0f}ms"
+              f"{streamed_first * 1000:>13.0f}ms{buffered_total:>15.2f}s{streamed_total:>15.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+VAD latency/accuracy report against a folder of labeled WAV files
+
+Every <name>.wav (16-bit mono) needs a <name>.json next to it:
+    {"speech": [[start_seconds, end_seconds], ...]}
+
+Frames are fed one at a time through the streaming path, exactly like the
+live CaptureSession does, then hangover/min-speech smoothing is applied.
+
+--noise-step DB runs a synthetic check instead: quiet room noise, then a
+steady fan-like noise DB louder for 30 s, with voiced bursts over it. The
+noise must stop counting as speech within --settle seconds and the bursts
+must still be found; exits 1 otherwise.
+
+Usage:
+    python3 benchmarks/vad_report.py fixtures/vad [--vad energy|webrtc] [--hangover-ms 300]
+    python3 benchmarks/vad_report.py --noise-step 26 [--vad energy|webrtc]
+"""
+
+import sys
+import json
+import time
+import wave
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vad import create_vad  # noqa: E402
+
+
+def load_wav(path):
+    with wave.open(str(path), "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono")
+        rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    return samples, rate
+
+
+def label_mask(segments, n_frames, frame_seconds):
+    """Per-frame ground truth from labeled segments"""
+    centers = (np.arange(n_frames) + 0.5) * frame_seconds
+    mask = np.zeros(n_frames, dtype=bool)
+    for start, end in segments:
+        mask |= (centers >= start) & (centers < end)
+    return mask
+
+
+def runs(mask, frame_seconds):
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return [(s * frame_seconds, e * frame_seconds) for s, e in zip(edges[::2], edges[1::2])]
+
+
+def evaluate(path, args):
+    samples, rate = load_wav(path)
+    labels = json.loads(path.with_suffix(".json").read_text())["speech"]
+    vad = create_vad(args.vad, sample_rate=rate, frame_ms=args.frame_ms,
+                     hangover_ms=args.hangover_ms, min_speech_ms=args.min_speech_ms)
+    frame_samples = vad.frame_samples
+    frame_seconds = frame_samples / rate
+    n_frames = len(samples) // frame_samples
+
+    start = time.perf_counter()
+    raw = np.array([vad.is_speech(samples[i * frame_samples:(i + 1) * frame_samples])
+                    for i in range(n_frames)], dtype=bool)
+    detected = vad.smooth(raw)
+    elapsed = time.perf_counter() - start
+
+    truth = label_mask(labels, n_frames, frame_seconds)
+    tp = np.count_nonzero(detected & truth)
+    fp = np.count_nonzero(detected & ~truth)
+    fn = np.count_nonzero(~detected & truth)
+
+    # End-of-speech latency: how long after the labeled end the utterance closes
+    detected_segments = runs(detected, frame_seconds)
+    end_latencies, onset_latencies, missed = [], [], 0
+    for label_start, label_end in labels:
+        overlapping = [(s, e) for s, e in detected_segments if s < label_end and e > label_start]
+        if not overlapping:
+            missed += 1
+            continue
+        onset_latencies.append(overlapping[0][0] - label_start)
+        end_latencies.append(overlapping[-1][1] - label_end)
+    false_segments = sum(
+        1 for s, e in detected_segments
+        if not any(s < label_end and e > label_start for label_start, label_end in labels)
+    )
+
+    return {
+        "file": path.name,
+        "seconds": len(samples) / rate,
+        "tp": tp, "fp": fp, "fn": fn,
+        "frames": n_frames,
+        "correct": int(np.count_nonzero(detected == truth)),
+        "end_latencies": end_latencies,
+        "onset_latencies": onset_latencies,
+        "segments": len(labels),
+        "missed": missed,
+        "false_segments": false_segments,
+        "cpu_seconds": elapsed,
+    }
+
+
+def fan_noise(rng, seconds, rate, rms):
+    """Steady low-frequency noise (fan, air conditioner): low zero-crossing rate like speech"""
+    noise = np.cumsum(rng.normal(0.0, 1.0, int(seconds * rate)))
+    noise -= np.convolve(noise, np.ones(rate // 40) / (rate // 40), "same")  # Drop the drift
+    return rms * noise / noise.std()
+
+
+def voiced_burst(seconds, rate, rms):
+    """A vowel-like harmonic burst at 140 Hz"""
+    t = np.arange(int(seconds * rate)) / rate
+    burst = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 8))
+    return rms * burst * np.hanning(len(t)) / burst.std()
+
+
+def noise_step(args):
+    """Quiet floor, then a steady args.noise_step dB louder noise with voiced bursts over it"""
+    rate, quiet_rms = 16000, 30.0
+    loud_rms = quiet_rms * 10 ** (args.noise_step / 20)
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([fan_noise(rng, 5, rate, quiet_rms), fan_noise(rng, 30, rate, loud_rms)])
+    bursts = [20.0, 26.0, 32.0]  # Start seconds, after the floor should have settled
+    for start in bursts:
+        burst = voiced_burst(0.6, rate, loud_rms * 10)
+        audio[int(start * rate):int(start * rate) + len(burst)] += burst
+    samples = np.clip(audio, -32768, 32767).astype(np.int16)
+
+    vad = create_vad(args.vad, sample_rate=rate, frame_ms=args.frame_ms,
+                     hangover_ms=args.hangover_ms, min_speech_ms=args.min_speech_ms)
+    frame_seconds = vad.frame_samples / rate
+    n_frames = len(samples) // vad.frame_samples
+    raw = np.array([vad.is_speech(samples[i * vad.frame_samples:(i + 1) * vad.frame_samples])
+                    for i in range(n_frames)], dtype=bool)
+    detected = vad.smooth(raw)
+
+    tail = args.hangover_ms / 1000 + frame_seconds  # Hangover after a burst isn't noise
+    truth = label_mask([(start, start + 0.6 + tail) for start in bursts], n_frames, frame_seconds)
+    step_frame = int(5 / frame_seconds)
+    noise_as_speech = np.flatnonzero(detected[step_frame:] & ~truth[step_frame:])
+    settle = (noise_as_speech[-1] + 1) * frame_seconds if len(noise_as_speech) else 0.0
+    found = sum(1 for start in bursts
+                if detected[int(start / frame_seconds):int((start + 0.6) / frame_seconds)].any())
+
+    print(f"\n=== Noise step: +{args.noise_step:g} dB steady noise, {args.vad} VAD ===")
+    print(f"  noise called speech until: {settle:.2f}s after the step (limit {args.settle:g}s)")
+    print(f"  voiced bursts found over the new noise: {found}/{len(bursts)}")
+    print(f"  noise floor: {vad.noise_floor_db:.1f} dB")
+    if settle > args.settle or found < len(bursts):
+        print("❌ The noise floor did not follow the noise step")
+        sys.exit(1)
+    print("✅ The noise floor followed the noise step")
+
+
+def ratio(a, b):
+    return a / b if b else 0.0
+
+
+def ms(values, q):
+    return f"{np.percentile(values, q) * 1000:7.0f}" if values else "      -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD latency/accuracy report")
+    parser.add_argument("folder", type=Path, nargs="?")
+    parser.add_argument("--vad", default="energy", choices=["energy", "webrtc", "auto"])
+    parser.add_argument("--frame-ms", type=int, default=30)
+    parser.add_argument("--hangover-ms", type=int, default=300)
+    parser.add_argument("--min-speech-ms", type=int, default=150)
+    parser.add_argument("--json", action="store_true", help="print machine-readable totals")
+    parser.add_argument("--noise-step", type=float, metavar="DB",
+                        help="synthetic check: a steady noise this much louder must stop being speech")
+    parser.add_argument("--settle", type=float, default=10.0,
+                        help="seconds the VAD may take to settle after the noise step")
+    args = parser.parse_args()
+
+    if args.noise_step is not None:
+        return noise_step(args)
+    if args.folder is None:
+        parser.error("a folder of labeled WAV files is required (or --noise-step)")
+
+    files = sorted(p for p in args.folder.glob("*.wav") if p.with_suffix(".json").exists())
+    if not files:
+        print(f"No labeled WAV files (*.wav + *.json) in {args.folder}")
+        sys.exit(1)
+
+    results = [evaluate(path, args) for path in files]
+
+    print(f"\n=== VAD report: {args.vad}, {args.frame_ms} ms frames, "
+          f"{args.hangover_ms} ms hangover ===")
+    print(f"{'file':<28}{'prec':>6}{'recall':>8}{'acc':>6}{'end p50':>9}{'end p95':>9}{'missed':>8}{'false':>7}")
+    for r in results:
+        print(f"{r['file'][:27]:<28}"
+              f"{ratio(r['tp'], r['tp'] + r['fp']):6.2f}"
+              f"{ratio(r['tp'], r['tp'] + r['fn']):8.2f}"
+              f"{ratio(r['correct'], r['frames']):6.2f}"
+              f"{ms(r['end_latencies'], 50):>9}{ms(r['end_latencies'], 95):>9}"
+              f"{r['missed']:>8}{r['false_segments']:>7}")
+
+    tp = sum(r["tp"] for r in results)
+    fp = sum(r["fp"] for r in results)
+    fn = sum(r["fn"] for r in results)
+    frames = sum(r["frames"] for r in results)
+    correct = sum(r["correct"] for r in results)
+    ends = [x for r in results for x in r["end_latencies"]]
+    onsets = [x for r in results for x in r["onset_latencies"]]
+    audio_seconds = sum(r["seconds"] for r in results)
+    cpu_seconds = sum(r["cpu_seconds"] for r in results)
+    totals = {
+        "files": len(results),
+        "audio_seconds": round(audio_seconds, 2),
+        "precision": round(ratio(tp, tp + fp), 4),
+        "recall": round(ratio(tp, tp + fn), 4),
+        "accuracy": round(ratio(correct, frames), 4),
+        "end_latency_ms_p50": round(float(np.percentile(ends, 50)) * 1000, 1) if ends else None,
+        "end_latency_ms_p95": round(float(np.percentile(ends, 95)) * 1000, 1) if ends else None,
+        "onset_latency_ms_p50": round(float(np.percentile(onsets, 50)) * 1000, 1) if onsets else None,
+        "missed_segments": sum(r["missed"] for r in results),
+        "false_segments": sum(r["false_segments"] for r in results),
+        "labeled_segments": sum(r["segments"] for r in results),
+        "real_time_factor": round(ratio(cpu_seconds, audio_seconds), 5),
+        "us_per_frame": round(ratio(cpu_seconds, frames) * 1e6, 1),
+    }
+
+    print("\n=== Totals ===")
+    for key, value in totals.items():
+        print(f"  {key}: {value}")
+    if args.json:
+        print(json.dumps(totals))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+VITS CPU inference benchmark: real-time factor and peak RSS per backend
+
+Each backend runs in its own process (so peak RSS is its own): load the
+voice model, set up the backend, synthesize a short reply once to warm up,
+then --repeat times. "default" is the current path, Coqui's tts() with
+torch's default threads; the others are vits_cpu.VitsRunner backends.
+
+- load: TTS model load + backend set-up (the ONNX graph is exported before
+  the timed runs, as it's cached after the first start)
+- RTF: synthesis seconds / seconds of audio, p50 over the runs
+- peak RSS: ru_maxrss of the process; steady RSS after the runs
+
+--random-weights builds a VCTK-shaped VITS (109 speakers, character input)
+with random weights instead of downloading tts_models/en/vctk/vits. The
+graph and its cost are the same; the audio is noise and its length
+follows random durations, so compare backends with each other, not with
+the real model's absolute numbers.
+
+Usage:
+    python3 benchmarks/vits_cpu_bench.py [--backends default torch onnx] [--repeat 5]
+        [--threads N] [--random-weights]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+REPLY = ("Good evening, sir. All systems are running normally, "
+         "and the weather looks clear for the rest of the day.")
+SPEAKER = "p227"
+
+
+def rss_mb():
+    """Current resident set size"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def random_vctk_model(directory):
+    """A VCTK-shaped VITS checkpoint with random weights -> (model_path, config_path)"""
+    import torch
+    from TTS.tts.configs.vits_config import VitsConfig
+    from TTS.tts.models.vits import Vits, VitsArgs
+
+    directory = Path(directory)
+    speakers = {f"p{225 + i}": i for i in range(109)}
+    (directory / "speaker_ids.json").write_text(json.dumps(speakers))
+    config = VitsConfig(use_phonemes=False, text_cleaner="english_cleaners",
+                        model_args=VitsArgs(use_speaker_embedding=True, num_speakers=len(speakers),
+                                            speakers_file=str(directory / "speaker_ids.json"),
+                                            init_discriminator=False))
+    config.audio.sample_rate = 22050
+    torch.manual_seed(0)
+    model = Vits.init_from_config(config)
+    torch.save({"model": model.state_dict()}, directory / "model.pth")
+    config.save_json(str(directory / "config.json"))
+    return str(directory / "model.pth"), str(directory / "config.json")
+
+
+def load_tts(args):
+    from TTS.api import TTS
+    if args.model_path:
+        return TTS(model_path=args.model_path, config_path=args.config_path, progress_bar=False)
+    from jarvis_voice import MODEL_NAME
+    return TTS(model_name=MODEL_NAME, progress_bar=False)
+
+
+def worker(args):
+    """One backend, in this process; prints a JSON line"""
+    from vits_cpu import VitsRunner
+    from jarvis_voice import MODEL_NAME
+
+    start = time.perf_counter()
+    tts = load_tts(args)
+    runner = VitsRunner(tts, MODEL_NAME, backend=args.worker, threads=args.threads)
+    if args.worker == "onnx":
+        runner.release_torch_weights()
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    waveform = runner.synthesize(REPLY, SPEAKER)
+    first = time.perf_counter() - start
+    rtf = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        waveform = runner.synthesize(REPLY, SPEAKER)
+        rtf.append((time.perf_counter() - start) / (len(waveform) / runner.sample_rate))
+    print(json.dumps({"backend": args.worker, "load": load_seconds, "first": first,
+                      "rtf": float(np.percentile(rtf, 50)), "rtf_max": max(rtf),
+                      "peak_rss": peak_rss_mb(), "rss": rss_mb()}))
+
+
+def export(args):
+    """Export the ONNX graph once, outside the timed runs"""
+    from vits_cpu import VitsRunner
+    from jarvis_voice import MODEL_NAME
+
+    tts = load_tts(args)
+    if "onnx" in args.backends:
+        VitsRunner(tts, MODEL_NAME, backend="onnx", threads=args.threads)
+
+
+def run_process(args, extra, env):
+    command = [sys.executable, __file__, "--threads", str(args.threads), "--repeat", str(args.repeat),
+               "--backends", *args.backends] + extra
+    if args.model_path:
+        command += ["--model-path", args.model_path, "--config-path", args.config_path]
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        return None
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    from vits_cpu import BACKENDS, TTS_THREADS
+
+    parser = argparse.ArgumentParser(description="VITS CPU inference benchmark")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=TTS_THREADS)
+    parser.add_argument("--random-weights", action="store_true",
+                        help="VCTK-shaped model with random weights (no download)")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--export", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--model-path", help=argparse.SUPPRESS)
+    parser.add_argument("--config-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+    if args.export:
+        return export(args)
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory(prefix="vits_bench_") as tmp:
+        if args.random_weights:
+            args.model_path, args.config_path = random_vctk_model(tmp)
+            env["JARVIS_TTS_CACHE"] = tmp  # Keep the random graphs out of the real cache
+        run_process(args, ["--export"], env)
+
+        print(f"\n=== {'random-weight ' if args.random_weights else ''}VCTK VITS, "
+              f"{args.threads} thread(s), {os.cpu_count()} CPU(s), {args.repeat} runs ===")
+        print(f"{'backend':<11}{'load':>8}{'first':>8}{'RTF p50':>9}{'max':>7}{'peak RSS':>10}{'RSS':>8}")
+        baseline = None
+        for backend in args.backends:
+            result = run_process(args, ["--worker", backend], env)
+            if result is None:
+                print(f"{backend:<11}  failed")
+                continue
+            baseline = baseline or result
+            print(f"{backend:<11}{result['load']:>7.1f}s{result['first']:>7.2f}s{result['rtf']:>9.3f}"
+                  f"{result['rtf_max']:>7.3f}{result['peak_rss']:>8.0f}MB{result['rss']:>6.0f}MB"
+                  f"  ({baseline['rtf'] / result['rtf']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Wake word benchmark: false accepts, false rejects and CPU per hour of audio
+
+A long stream of background audio (chatter, near misses, room noise) with
+wake phrases inserted at known times is pushed frame by frame through the
+same VAD + detector path CaptureSession uses, as fast as possible.
+
+- false reject: an inserted wake phrase with no detection by 0.5 s after it
+- false accept: any other detection, reported per hour of audio
+- CPU: thread time spent in the detector (and in the VAD, which capture
+  runs anyway), as % of one core and seconds per hour of audio
+
+Several thresholds can be given to see the accept/reject trade-off.
+
+Recorded audio: --wake DIR with 16 kHz mono WAVs of the wake phrase (the
+first --enroll are the templates, the rest are inserted) and --background
+with WAVs of everything else. Without them, speech-like audio is
+synthesized: vowel formants on a pitch contour, so a "hey jarvis"-like
+phrase, near misses and random chatter differ the way words do.
+
+Usage:
+    python3 benchmarks/wake_word_bench.py [--minutes 30] [--positives 100] [--enroll 3]
+        [--wake DIR] [--background WAV_OR_DIR ...] [--detector template|hey_jarvis]
+        [--threshold 0.1 0.15]
+"""
+
+import sys
+import time
+import wave
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vad import EnergyVAD  # noqa: E402
+from wake_word import TemplateWakeWord, create_wake_word  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480
+
+# Formants (F1, F2, F3) of a few vowels, Hz
+VOWELS = {
+    "a": (730, 1090, 2440), "i": (270, 2290, 3010), "u": (300, 870, 2240), "e": (530, 1840, 2480),
+    "o": (570, 840, 2410), "ae": (660, 1720, 2410), "er": (490, 1350, 1690), "ih": (390, 1990, 2550),
+    "uh": (520, 1190, 2390),
+}
+WAKE_PHRASE = [("e", 0.14), ("i", 0.08), ("-", 0.05), ("a", 0.2), ("er", 0.1), ("-", 0.04), ("ih", 0.13),
+               ("s", 0.12)]  # "hey jarvis"
+NEAR_MISSES = [
+    [("e", 0.14), ("i", 0.08), ("-", 0.06), ("u", 0.22)],  # "hey you"
+    [("a", 0.2), ("er", 0.1), ("-", 0.05), ("ih", 0.13), ("s", 0.1)],  # "jarvis" alone
+    [("e", 0.14), ("i", 0.08), ("-", 0.05), ("o", 0.2), ("er", 0.1), ("-", 0.04), ("uh", 0.15)],  # "hey mother"
+]
+
+
+def vowel_speech(units, rng, f0=None, tempo=1.0, tract=1.0):
+    """
+    Speech-like audio for a list of (vowel, seconds); "-" is a short
+    closure, "s" a fricative. Formants glide between vowels.
+    """
+    f0 = f0 or rng.uniform(95, 220)
+    parts = []
+    last = None
+    for unit, seconds in units:
+        n = int(seconds / tempo * SAMPLE_RATE)
+        if unit == "-":
+            parts.append(np.zeros(n))
+            continue
+        if unit == "s":
+            parts.append(0.08 * np.diff(rng.normal(0, 1, n + 1)))
+            continue
+        target = np.array(VOWELS[unit], dtype=float) * tract
+        start = target if last is None else last
+        t = np.arange(n) / SAMPLE_RATE
+        glide = np.clip(t / 0.04, 0, 1)[:, None]
+        formants = start + (target - start) * glide
+        pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 3 * t + rng.uniform(0, 6)))
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        signal = np.zeros(n)
+        for k in range(1, int(3800 / f0)):
+            freq = k * pitch
+            gain = sum(np.exp(-0.5 * ((freq - formants[:, j]) / (60 + 30 * j)) ** 2) / (j + 1)
+                       for j in range(3))
+            signal += gain * np.sin(k * phase)
+        envelope = np.minimum(1, np.minimum(t, t[::-1]) / 0.015)
+        parts.append(0.15 * signal * envelope)
+        last = target
+    return np.concatenate(parts)
+
+
+def random_chatter(rng):
+    """A few words of random vowels"""
+    units = []
+    for _ in range(rng.integers(2, 9)):
+        units.append((rng.choice(list(VOWELS)), rng.uniform(0.08, 0.25)))
+        if rng.random() < 0.4:
+            units.append(("-", rng.uniform(0.03, 0.08)) if rng.random() < 0.7 else ("s", rng.uniform(0.05, 0.12)))
+    return units
+
+
+class Synthetic:
+    """Synthesized wake phrases and background"""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def wake(self):
+        rng = self.rng
+        return vowel_speech(WAKE_PHRASE, rng, tempo=rng.uniform(0.8, 1.25), tract=rng.uniform(0.9, 1.1))
+
+    def background(self):
+        rng = self.rng
+        if rng.random() < 0.25:
+            units = NEAR_MISSES[rng.integers(len(NEAR_MISSES))]
+        else:
+            units = random_chatter(rng)
+        speech = vowel_speech(units, rng, tempo=rng.uniform(0.8, 1.25), tract=rng.uniform(0.9, 1.1))
+        return np.concatenate([speech, np.zeros(int(rng.uniform(0.2, 2.0) * SAMPLE_RATE))])
+
+
+def read_wav(path):
+    with wave.open(str(path), "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono at {SAMPLE_RATE} Hz")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16) / 32768.0
+
+
+def wav_paths(items):
+    paths = []
+    for item in items:
+        item = Path(item)
+        paths.extend(sorted(item.glob("*.wav")) if item.is_dir() else [item])
+    return paths
+
+
+class Recorded:
+    """Wake phrases and background from WAV files, cycled as needed"""
+
+    def __init__(self, wake_paths, background_paths, enroll, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.enrollment = [read_wav(p) for p in wake_paths[:enroll]]
+        self.wakes = [read_wav(p) for p in wake_paths[enroll:]]
+        self.backgrounds = [read_wav(p) for p in background_paths]
+        if not self.wakes:
+            raise ValueError("need more wake phrase recordings than --enroll")
+        self.next_wake = 0
+
+    def wake(self):
+        audio = self.wakes[self.next_wake % len(self.wakes)]
+        self.next_wake += 1
+        return audio
+
+    def background(self):
+        if not self.backgrounds:
+            return np.zeros(int(self.rng.uniform(1, 5) * SAMPLE_RATE))
+        return self.backgrounds[self.rng.integers(len(self.backgrounds))]
+
+
+def build_stream(source, minutes, positives, rng):
+    """Background audio with wake phrases at random times -> (pcm, [(start, end) seconds])"""
+    chunks, length = [], 0
+    while length < minutes * 60 * SAMPLE_RATE:
+        chunks.append(source.background())
+        length += len(chunks[-1])
+    slots = np.bincount(rng.integers(0, len(chunks) + 1, positives), minlength=len(chunks) + 1)
+    gap = np.zeros(int(0.5 * SAMPLE_RATE))
+    parts, events, length = [], [], 0
+    for chunk, count in zip(chunks + [None], slots):
+        for _ in range(count):
+            wake = source.wake()
+            start = length + len(gap)
+            events.append((start / SAMPLE_RATE, (start + len(wake)) / SAMPLE_RATE))
+            parts.append(np.concatenate([gap, wake, gap]))
+            length += len(parts[-1])
+        if chunk is not None:
+            parts.append(chunk)
+            length += len(chunk)
+    audio = np.concatenate(parts)
+    audio += rng.normal(0, 0.002, len(audio))  # Room noise
+    return (np.clip(audio, -1, 1) * 32767).astype("<i2"), events
+
+
+def run(detector, pcm, events):
+    vad = EnergyVAD(sample_rate=SAMPLE_RATE, frame_ms=1000 * FRAME_SAMPLES // SAMPLE_RATE)
+    frame_seconds = FRAME_SAMPLES / SAMPLE_RATE
+    detections = []
+    vad_cpu = 0.0
+    data = pcm.tobytes()
+    size = FRAME_SAMPLES * 2
+    for i in range(len(data) // size):
+        frame = data[i * size:(i + 1) * size]
+        start = time.thread_time()
+        is_speech = vad.is_speech(frame)
+        vad_cpu += time.thread_time() - start
+        if detector.process(frame, is_speech):
+            detections.append((i + 1) * frame_seconds)
+
+    hit = [False] * len(events)
+    false_accepts = 0
+    for t in detections:
+        match = next((j for j, (start, end) in enumerate(events) if start <= t <= end + 0.5), None)
+        if match is None:
+            false_accepts += 1
+        else:
+            hit[match] = True
+    return {
+        "hours": len(pcm) / SAMPLE_RATE / 3600,
+        "false_rejects": hit.count(False),
+        "false_accepts": false_accepts,
+        "detector_cpu": detector.cpu_seconds,
+        "vad_cpu": vad_cpu,
+        "active": detector.active_frames / max(1, detector.frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake word false accept / reject and CPU benchmark")
+    parser.add_argument("--minutes", type=float, default=30.0, help="minutes of background audio")
+    parser.add_argument("--positives", type=int, default=100, help="wake phrases inserted")
+    parser.add_argument("--enroll", type=int, default=3, help="recordings used as templates")
+    parser.add_argument("--wake", help="directory of wake phrase recordings (default: synthesized)")
+    parser.add_argument("--background", nargs="+", default=[], help="background WAV files or directories")
+    parser.add_argument("--detector", default="template", help="template, or an openWakeWord model name")
+    parser.add_argument("--threshold", type=float, nargs="+", help="default: derived from the enrollment")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.wake:
+        source = Recorded(wav_paths([args.wake]), wav_paths(args.background), args.enroll, args.seed)
+        enrollment = source.enrollment
+    else:
+        source = Synthetic(args.seed)
+        enrollment = [source.wake() for _ in range(args.enroll)]
+    pcm, events = build_stream(source, args.minutes, args.positives, rng)
+
+    print(f"\n=== {len(pcm) / SAMPLE_RATE / 60:.0f} min of {'recorded' if args.wake else 'synthesized'} audio, "
+          f"{len(events)} wake phrases ===")
+    print(f"{'detector':<14}{'threshold':>10}{'false rejects':>15}{'FA/hour':>9}{'CPU %':>8}"
+          f"{'CPU s/hour':>12}{'active':>8}")
+    for threshold in args.threshold or [None]:
+        kwargs = {"sample_rate": SAMPLE_RATE, "frame_samples": FRAME_SAMPLES}
+        if threshold is not None:
+            kwargs["threshold"] = threshold
+        if args.detector == "template":
+            templates = [(np.clip(t, -1, 1) * 32767).astype("<i2").tobytes() for t in enrollment]
+            detector = TemplateWakeWord(templates, **kwargs)
+        else:
+            detector = create_wake_word(args.detector, **kwargs)
+        result = run(detector, pcm, events)
+        hours = result["hours"]
+        print(f"{detector.name:<14}{detector.threshold:>10.2f}"
+              f"{100 * result['false_rejects'] / len(events):>14.1f}%{result['false_accepts'] / hours:>9.1f}"
+              f"{100 * result['detector_cpu'] / (hours * 3600):>8.2f}{result['detector_cpu'] / hours:>12.1f}"
+              f"{100 * result['active']:>7.0f}%")
+    print(f"{'VAD':<24}{'':>24}{100 * result['vad_cpu'] / (hours * 3600):>8.2f}{result['vad_cpu'] / hours:>12.1f}")
+
+if __name__ == "__main__":
+    main()
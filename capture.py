@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Long-lived audio capture
+- The input device is opened once per session, not once per turn
+- A reader thread pulls fixed-size frames into a ring buffer
+- Frame-level VAD tracks the noise floor continuously and closes an
+  utterance as soon as speech ends - no per-turn calibration
+- Utterances keep pre-roll audio from just before speech onset
+- Bursts too short to be speech are dropped before they reach STT
+- An optional wake word (wake_word.py) gates everything after capture:
+  utterances heard while asleep never reach STT
+"""
+
+import queue
+import time
+import wave
+import threading
+from collections import deque
+
+import speech_recognition as sr
+
+from vad import create_vad
+
+
+class MicrophoneSource:
+    """Default input device (PyAudio via speech_recognition)"""
+
+    def __init__(self, sample_rate=16000, device_index=None):
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.device_index = device_index
+        self.microphone = None
+        self.stream = None
+
+    def open(self, frame_samples):
+        self.microphone = sr.Microphone(device_index=self.device_index,
+                                        sample_rate=self.sample_rate,
+                                        chunk_size=frame_samples)
+        self.stream = self.microphone.__enter__().stream
+
+    def read(self, frame_samples):
+        return self.stream.read(frame_samples)
+
+    def close(self):
+        if self.microphone is not None:
+            self.microphone.__exit__(None, None, None)
+            self.microphone = None
+
+
+class WavFileSource:
+    """
+    Replays WAV files as if they came from a microphone (headless runs,
+    benchmarks). Silence is produced between and after files.
+    """
+
+    def __init__(self, paths=(), realtime=True, gap_seconds=1.0):
+        self.paths = deque(paths)
+        self.realtime = realtime
+        self.gap_seconds = gap_seconds
+        self.sample_rate = 16000
+        self.sample_width = 2
+        self.pending = b""
+        self.lock = threading.Lock()
+        if self.paths:
+            with wave.open(str(self.paths[0]), "rb") as wav:
+                self.sample_rate = wav.getframerate()
+
+    def add(self, path):
+        """Queue another file for playback into the session"""
+        with self.lock:
+            self.paths.append(path)
+
+    def open(self, frame_samples):
+        self.next_read = time.monotonic()
+
+    def _load_next(self):
+        path = self.paths.popleft()
+        with wave.open(str(path), "rb") as wav:
+            if wav.getframerate() != self.sample_rate or wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError(f"{path}: expected 16-bit mono at {self.sample_rate} Hz")
+            data = wav.readframes(wav.getnframes())
+        gap = b"\0\0" * int(self.sample_rate * self.gap_seconds)
+        return data + gap
+
+    def read(self, frame_samples):
+        if self.realtime:
+            self.next_read += frame_samples / self.sample_rate
+            delay = self.next_read - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        size = frame_samples * 2
+        with self.lock:
+            while len(self.pending) < size and self.paths:
+                self.pending += self._load_next()
+            frame = self.pending[:size]
+            self.pending = self.pending[size:]
+        return frame.ljust(size, b"\0")
+
+    def close(self):
+        pass
+
+
+class CaptureSession:
+    """
+    Continuous capture with built-in endpointing.
+
+    listen() returns speech_recognition.AudioData, so it works with any
+    recognize_* backend, and the session plugs straight into VoicePipeline.
+    """
+
+    def __init__(self, source=None, vad=None, frame_ms=30, preroll_ms=300, onset_ms=90,
+                 phrase_time_limit=15, ring_seconds=30, barge_in_db=10.0):
+        self.source = source or MicrophoneSource()
+        self.sample_rate = self.source.sample_rate
+        self.sample_width = self.source.sample_width
+        # End of speech is decided by the VAD hangover, not a fixed pause
+        self.vad = vad or create_vad(sample_rate=self.sample_rate, frame_ms=frame_ms)
+        self.frame_samples = self.vad.frame_samples
+        self.frame_seconds = self.frame_samples / self.sample_rate
+        self.onset_frames = max(1, int(round(onset_ms / self.vad.frame_ms)))
+        self.max_frames = int(phrase_time_limit / self.frame_seconds)
+        # While the assistant is talking its own voice reaches the mic, so
+        # barge-in needs to be noticeably louder than the normal threshold
+        self.barge_in_db = barge_in_db
+
+        # Ring buffer of the most recent frames (also serves as pre-roll)
+        self.ring = deque(maxlen=int(ring_seconds / self.frame_seconds))
+        self.preroll_frames = max(self.onset_frames, int(preroll_ms / self.vad.frame_ms))
+        self.utterances = queue.Queue()
+        self.in_speech = threading.Event()
+        self.running = threading.Event()
+        self.reader = None
+        self.on_speech_start = lambda: None
+        self.is_speaking = lambda: False
+        self.stream_listener = None
+        self.discarded = 0  # Non-speech bursts dropped before STT
+        self.wake_word = None
+        self.on_wake = lambda: None
+        self.awake_seconds = 8.0
+        self.awake_until = 0.0
+        self.gated = 0  # Utterances dropped because the wake word wasn't said
+
+    def set_stream_listener(self, listener):
+        """
+        Receive live utterance audio while the user is speaking, e.g. an
+        stt.StreamingTranscriber. The listener gets speech_started(rate),
+        speech_frame(frame) and speech_ended() -> Future of the transcript.
+        """
+        self.stream_listener = listener
+
+    def set_wake_word(self, detector, on_wake=None, awake_seconds=8.0):
+        """
+        Only pass on speech after the wake word: the rest of the utterance
+        it was said in, or the next one within awake_seconds. The detector
+        (a wake_word.WakeWordDetector) runs on the capture thread.
+        """
+        self.wake_word = detector
+        self.on_wake = on_wake or (lambda: None)
+        self.awake_seconds = awake_seconds
+
+    @property
+    def awake(self):
+        return self.wake_word is None or time.monotonic() < self.awake_until
+
+    # -- pipeline interface ----------------------------------------------
+
+    def attach(self, on_speech_start, is_speaking):
+        """Receive speech-onset events (used by VoicePipeline for barge-in)"""
+        self.on_speech_start = on_speech_start
+        self.is_speaking = is_speaking
+
+    def open(self):
+        """Open the device and start the reader thread (idempotent)"""
+        if self.running.is_set():
+            return
+        self.source.open(self.frame_samples)
+        self.running.set()
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def close(self):
+        if not self.running.is_set():
+            return
+        self.running.clear()
+        if self.reader and self.reader is not threading.current_thread():
+            self.reader.join(timeout=1)
+        self.source.close()
+
+    def listen(self, timeout=10):
+        """
+        Return the next utterance as AudioData, or None if no speech
+        started within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.1
+            if deadline is not None and not self.in_speech.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            try:
+                frames, transcript_future = self.utterances.get(timeout=wait)
+            except queue.Empty:
+                if not self.running.is_set():
+                    return None
+                continue
+            audio = sr.AudioData(b"".join(frames), self.sample_rate, self.sample_width)
+            if transcript_future is not None:
+                audio.transcript_future = transcript_future
+            return audio
+
+    def clear(self):
+        """Drop utterances that were captured but not consumed yet"""
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    @property
+    def noise_floor_db(self):
+        """Noise floor currently tracked by the VAD"""
+        return self.vad.noise_floor_db
+
+    # -- reader thread ---------------------------------------------------
+
+    def _start_utterance(self, frames):
+        """Speech onset (or wake word): announce it and return the listener"""
+        self.in_speech.set()
+        self.on_speech_start()
+        listener = self.stream_listener
+        if listener:
+            listener.speech_started(self.sample_rate)
+            for pending in frames:
+                listener.speech_frame(pending)
+        return listener
+
+    def _read_loop(self):
+        utterance = None
+        awake = False  # The current utterance is meant for us
+        voiced = 0
+        silent = 0
+        listener = None
+        while self.running.is_set():
+            try:
+                frame = self.source.read(self.frame_samples)
+            except Exception as e:
+                if self.running.is_set():
+                    print(f"❌ Audio capture error: {e}")
+                    time.sleep(0.1)
+                continue
+
+            is_speech = self.vad.is_speech(frame, self.barge_in_db if self.is_speaking() else 0.0)
+            self.ring.append(frame)
+
+            woke = self.wake_word is not None and self.wake_word.process(frame, is_speech)
+            if woke:
+                self.awake_until = time.monotonic() + self.awake_seconds
+                self.on_wake()
+                if utterance is not None and not awake:
+                    # The command follows in the same breath: drop the wake phrase
+                    utterance = []
+                    voiced = 0
+                    silent = 0
+                    awake = True
+                    listener = self._start_utterance(utterance)
+
+            if utterance is None:
+                voiced = voiced + 1 if is_speech else 0
+                if voiced >= self.onset_frames:
+                    # Speech onset: start from the pre-roll so first syllables survive
+                    utterance = list(self.ring)[-self.preroll_frames:]
+                    silent = 0
+                    awake = self.awake
+                    if awake:
+                        listener = self._start_utterance(utterance)
+                continue
+
+            utterance.append(frame)
+            if listener:
+                listener.speech_frame(frame)
+            if is_speech:
+                voiced += 1
+                silent = 0
+            else:
+                silent += 1
+
+            if silent > self.vad.hangover_frames or len(utterance) >= self.max_frames:
+                transcript_future = listener.speech_ended() if listener else None
+                if not awake:
+                    self.gated += 1
+                elif voiced >= self.vad.min_speech_frames:
+                    self.utterances.put((utterance, transcript_future))
+                    if self.wake_word is not None:
+                        self.awake_until = 0.0  # One command per wake word
+                else:
+                    self.discarded += 1
+                utterance = None
+                listener = None
+                awake = False
+                voiced = 0
+                self.in_speech.clear()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Conversation history storage
+- SQLite in WAL mode: every exchange is a single appended row
+- Fast "last N" reads without loading the whole history
+- Full-text search over past exchanges (FTS5 when available)
+- One-time migration from the old conversation_history.json
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class HistoryStore:
+    """Append-only conversation history backed by SQLite"""
+
+    def __init__(self, db_path="conversation_history.db"):
+        self.db_path = str(db_path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: appends don't rewrite the database and readers never block the writer
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS exchanges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                user TEXT NOT NULL,
+                assistant TEXT NOT NULL
+            )
+        """)
+        self.has_fts = self._create_fts()
+        self.conn.commit()
+
+    def _create_fts(self):
+        """Create the full-text index (kept in sync by triggers)"""
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS exchanges_fts USING fts5(
+                    user, assistant, content='exchanges', content_rowid='id'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 - search falls back to LIKE
+            return False
+        self.conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS exchanges_ai AFTER INSERT ON exchanges BEGIN
+                INSERT INTO exchanges_fts(rowid, user, assistant)
+                VALUES (new.id, new.user, new.assistant);
+            END;
+            CREATE TRIGGER IF NOT EXISTS exchanges_ad AFTER DELETE ON exchanges BEGIN
+                INSERT INTO exchanges_fts(exchanges_fts, rowid, user, assistant)
+                VALUES ('delete', old.id, old.user, old.assistant);
+            END;
+        """)
+        return True
+
+    @staticmethod
+    def _to_entry(row):
+        return {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "user": row["user"],
+            "assistant": row["assistant"]
+        }
+
+    def append(self, entry):
+        """Append one exchange ({"timestamp", "user", "assistant"}), return its id"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO exchanges (timestamp, user, assistant) VALUES (?, ?, ?)",
+                (entry.get("timestamp") or datetime.now().isoformat(),
+                 entry["user"], entry["assistant"])
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def recent(self, n=10):
+        """Return the last n exchanges, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, timestamp, user, assistant FROM exchanges ORDER BY id DESC LIMIT ?",
+                (n,)
+            ).fetchall()
+        return [self._to_entry(row) for row in reversed(rows)]
+
+    def get(self, ids):
+        """Exchanges with the given ids, in the same order (missing ids are skipped)"""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, timestamp, user, assistant FROM exchanges WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        by_id = {row["id"]: self._to_entry(row) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def since(self, last_id, limit=1000):
+        """Exchanges with id > last_id, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, timestamp, user, assistant FROM exchanges WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def search(self, query, limit=10):
+        """Find past exchanges matching all words in query, best matches first"""
+        words = query.split()
+        if not words:
+            return []
+        with self.lock:
+            if self.has_fts:
+                # Quote every word so user text can't be parsed as FTS syntax
+                match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+                rows = self.conn.execute("""
+                    SELECT e.id, e.timestamp, e.user, e.assistant
+                    FROM exchanges_fts f JOIN exchanges e ON e.id = f.rowid
+                    WHERE exchanges_fts MATCH ?
+                    ORDER BY bm25(exchanges_fts) LIMIT ?
+                """, (match, limit)).fetchall()
+            else:
+                clauses = " AND ".join(["(user LIKE ? OR assistant LIKE ?)"] * len(words))
+                params = []
+                for word in words:
+                    params += [f"%{word}%", f"%{word}%"]
+                rows = self.conn.execute(
+                    f"SELECT id, timestamp, user, assistant FROM exchanges WHERE {clauses} "
+                    "ORDER BY id DESC LIMIT ?",
+                    params + [limit]
+                ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def count(self):
+        """Number of stored exchanges"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+    def clear(self):
+        """Delete all exchanges"""
+        with self.lock:
+            self.conn.execute("DELETE FROM exchanges")
+            self.conn.commit()
+
+    def migrate_json(self, json_path):
+        """
+        Import an old conversation_history.json once.
+        The JSON file is renamed to *.migrated afterwards so it isn't imported again.
+        Returns the number of imported exchanges.
+        """
+        json_path = Path(json_path)
+        if not json_path.exists() or json_path.stat().st_size == 0:
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not read {json_path} for migration: {e}")
+            return 0
+
+        rows = [
+            (entry.get("timestamp"), entry["user"], entry["assistant"])
+            for entry in entries
+            if "user" in entry and "assistant" in entry
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO exchanges (timestamp, user, assistant) VALUES (?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+        json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
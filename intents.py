@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Local intent routing
+- Intents are registered with regex patterns and a handler
+- All patterns are compiled into one alternation and matched in a single
+  pass over the normalized utterance; registration order is priority
+- Deterministic questions (time, date, settings, history, voice) are
+  answered locally; only unmatched input goes to the language model
+- Every routing decision can be appended to a JSONL log to measure hit rate
+"""
+
+import re
+import json
+import time
+import threading
+from datetime import datetime
+from collections import Counter
+
+from response_cache import normalize
+
+# Named slots are stripped from the combined pattern (names may repeat
+# across intents) and read back from the winning intent's own pattern
+SLOT = re.compile(r"\(\?P<\w+>")
+
+
+def spoken_time(now=None):
+    """'It's 3:05 PM.'"""
+    now = now or datetime.now()
+    return f"It's {now.strftime('%I:%M %p').lstrip('0')}."
+
+
+def spoken_date(now=None):
+    """'Today is Saturday, October 17, 2026.'"""
+    now = now or datetime.now()
+    return f"Today is {now.strftime('%A, %B')} {now.day}, {now.year}."
+
+
+# Common phrasings, shared by the assistants
+TIME_PATTERNS = [
+    r"what(?:'s| is) the time(?: now| right now)?",
+    r"what time is it(?: now| right now)?",
+    r"(?:can you )?tell me the time",
+    r"time",
+]
+DATE_PATTERNS = [
+    r"what(?:'s| is) (?:the date|today's date|the date today)",
+    r"what day is (?:it|today)(?: today)?",
+    r"what(?:'s| is) today",
+    r"(?:can you )?tell me the date",
+    r"date",
+]
+EXIT_PATTERNS = [r"exit|quit|goodbye"]
+# "stop" and "cancel" only silence the current reply (talking over it
+# already interrupted it); they never end the session
+STOP_PATTERNS = [r"(?:please )?(?:stop|cancel)(?: (?:it|that|talking|speaking))?(?: please)?"]
+
+
+class IntentRouter:
+    """Registry of local intents, matched in one pass"""
+
+    def __init__(self, log_path=None):
+        self.intents = []  # (name, compiled pattern, handler)
+        self.combined = None
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.unmatched = 0
+
+    def register(self, name, patterns, handler):
+        """
+        Add an intent. patterns are full-utterance regexes over normalized
+        text (lowercase, no punctuation); handler(match) gets the re.Match,
+        so named groups work as slots.
+        """
+        pattern = re.compile("|".join(f"(?:{p})" for p in patterns))
+        self.intents.append((name, pattern, handler))
+        self.combined = None
+
+    def _compile(self):
+        self.combined = re.compile("|".join(
+            f"(?P<i{i}>{SLOT.sub('(?:', pattern.pattern)})"
+            for i, (name, pattern, handler) in enumerate(self.intents)
+        ))
+
+    def match(self, text):
+        """(name, handler, match) of the first matching intent, or None"""
+        if self.combined is None:
+            self._compile()
+        normalized = normalize(text)
+        found = self.combined.fullmatch(normalized)
+        if not found:
+            return None
+        name, pattern, handler = self.intents[int(found.lastgroup[1:])]
+        return name, handler, pattern.fullmatch(normalized)
+
+    def route(self, text):
+        """
+        Run the handler of the matching intent.
+        Returns (intent name, handler result), or (None, None) when the
+        input should go to the language model.
+        """
+        start = time.perf_counter()
+        matched = self.match(text)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        name = matched[0] if matched else None
+        self._record(text, name, elapsed_us)
+        if not matched:
+            return None, None
+        name, handler, found = matched
+        return name, handler(found)
+
+    def _record(self, text, name, elapsed_us):
+        with self.lock:
+            if name:
+                self.counts[name] += 1
+            else:
+                self.unmatched += 1
+            if not self.log_path:
+                return
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({
+                        "timestamp": datetime.now().isoformat(),
+                        "text": text,
+                        "intent": name,
+                        "route": "local" if name else "llm",
+                        "match_us": round(elapsed_us, 1),
+                    }) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write intent log: {e}")
+
+    def stats(self):
+        with self.lock:
+            local = sum(self.counts.values())
+            total = local + self.unmatched
+            return {
+                "local": local,
+                "llm": self.unmatched,
+                "hit_rate": round(local / total, 3) if total else 0.0,
+                "by_intent": dict(self.counts),
+            }
+
+
+def log_summary(log_path):
+    """Hit rate per intent from a routing log"""
+    counts = Counter()
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                counts[json.loads(line)["intent"] or "(llm)"] += 1
+    total = sum(counts.values())
+    local = total - counts.get("(llm)", 0)
+    return {
+        "decisions": total,
+        "hit_rate": round(local / total, 3) if total else 0.0,
+        "by_intent": dict(counts.most_common()),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Usage: python3 intents.py intent_log.jsonl")
+        sys.exit(1)
+    summary = log_summary(sys.argv[1])
+    print(f"Routing decisions: {summary['decisions']}")
+    print(f"Answered locally:  {summary['hit_rate']:.1%}")
+    for name, count in summary["by_intent"].items():
+        print(f"  {name}: {count}")
@@ -1,81 +1,373 @@
 #!/usr/bin/env python3
 """
 Jarvis-style Text-to-Speech using Coqui TTS
-Provides a sophisticated British AI assistant voice
+Provides a sophisticated British AI assistant voice, with lighter engines
+(Piper, espeak-ng, macOS say - see tts_engines.py) for short phrases,
+tight latency budgets and while the model is loading
 """
 
-import subprocess
-import os
-from pathlib import Path
+import time
+import queue
+import threading
+import importlib.util
 
-# Try Coqui TTS (better quality)
-try:
-    from TTS.api import TTS
-    HAS_TTS = True
-except ImportError:
-    HAS_TTS = False
-    print("⚠️  Coqui TTS not installed. Using macOS system voice.")
+from tts_cache import SynthesisCache
+from audio_output import default_sink, samples_to_wav
+from sentence_stream import split_sentences
+from startup import load_in_background
+from tts_engines import CoquiEngine, EngineSelector, create_engines
+from vits_cpu import VitsRunner
+
+# Coqui TTS (better quality) is only imported when the model is loaded:
+# importing it pulls in torch, which takes seconds on its own
+HAS_TTS = importlib.util.find_spec("TTS") is not None
+if not HAS_TTS:
+    print("⚠️  Coqui TTS not installed. Using a lightweight voice.")
+
+
+MODEL_NAME = "tts_models/en/vctk/vits"
+
+
+class SpeechQueue:
+    """
+    Speaks phrases in order while synthesizing ahead: phrase N+1 is
+    rendered on a background thread while phrase N plays, so neither the
+    CPU nor the speaker sits idle between phrases.
+    
+    put() splits text at sentence boundaries; close() marks the end;
+    wait() blocks until everything has played; stop() interrupts.
+    The engine is picked for the first sentence and kept for the rest,
+    so a reply is spoken in one voice. on_phrase(text), if given, is
+    called as each phrase starts playing.
+    """
+    
+    def __init__(self, voice, lookahead=1, on_phrase=None):
+        self.voice = voice
+        self.on_phrase = on_phrase
+        self.engine = None
+        self.texts = queue.Queue()
+        self.audio = queue.Queue(maxsize=lookahead)  # Rendered phrases waiting to play
+        self.stopped = threading.Event()
+        self.started = time.perf_counter()
+        self.synthesis_seconds = 0.0
+        self.playback_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.first_audio_seconds = None
+        self.gaps = []  # Silence between the end of one phrase and the start of the next
+        self.synth_thread = threading.Thread(target=self._synthesize_loop, daemon=True)
+        self.play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self.synth_thread.start()
+        self.play_thread.start()
+    
+    def put(self, text):
+        """Queue text to be spoken, one sentence at a time"""
+        for sentence in split_sentences(text):
+            self.texts.put(sentence)
+    
+    def close(self):
+        """No more text will be added"""
+        self.texts.put(None)
+    
+    def wait(self, timeout=None):
+        """Block until everything queued has played; True when finished"""
+        self.play_thread.join(timeout)
+        return not self.play_thread.is_alive()
+    
+    def stop(self):
+        """Drop everything queued and interrupt the current phrase"""
+        self.stopped.set()
+        self.texts.put(None)
+        while True:
+            try:
+                self.audio.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            self.audio.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.voice.sink:
+            self.voice.sink.stop()
+    
+    def timing(self):
+        """Totals in the same form as JarvisVoice.last_timing, plus gaps"""
+        timing = {
+            "synthesis_seconds": self.synthesis_seconds,
+            "playback_seconds": self.playback_seconds,
+            "audio_seconds": self.audio_seconds,
+            "rtf": self.synthesis_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+            "phrases": len(self.gaps) + (self.first_audio_seconds is not None),
+            "max_gap_seconds": max(self.gaps, default=0.0),
+        }
+        if self.engine:
+            timing["engine"] = self.engine.name
+        if self.first_audio_seconds is not None:
+            timing["first_audio_seconds"] = self.first_audio_seconds
+        return timing
+    
+    def _put_audio(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.audio.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def _synthesize_loop(self):
+        while True:
+            text = self.texts.get()
+            if text is None or self.stopped.is_set():
+                self._put_audio(None)
+                return
+            if self.engine is None:
+                self.engine = self.voice.selector.choose(text, short=False)
+            samples = sample_rate = None
+            start = time.perf_counter()
+            try:
+                samples, sample_rate = self.voice.synthesize_with(self.engine, text)
+            except Exception as e:
+                print(f"❌ TTS error: {e}")
+                # Finish the reply with the next fastest engine
+                self.engine = self.voice.selector.fastest(text, exclude=[self.engine])
+                if self.engine:
+                    try:
+                        samples, sample_rate = self.voice.synthesize_with(self.engine, text)
+                    except Exception as e:
+                        print(f"❌ TTS error: {e}")
+            self.synthesis_seconds += time.perf_counter() - start
+            self._put_audio((text, samples, sample_rate))
+    
+    def _play_loop(self):
+        last_end = None
+        while True:
+            item = self.audio.get()
+            if item is None or self.stopped.is_set():
+                return
+            text, samples, sample_rate = item
+            start = time.perf_counter()
+            if last_end is None:
+                self.first_audio_seconds = start - self.started
+            else:
+                self.gaps.append(start - last_end)
+            if self.on_phrase:
+                self.on_phrase(text)
+            if samples is not None:
+                self.voice.output().play(samples, sample_rate)
+                self.audio_seconds += len(samples) / sample_rate
+            last_end = time.perf_counter()
+            self.playback_seconds += last_end - start
 
 
 class JarvisVoice:
     """Jarvis-style voice synthesis"""
     
-    def __init__(self, use_coqui=True):
+    def __init__(self, use_coqui=True, use_cache=True, sink=None, background=True,
+                 engines=("piper", "espeak", "say"), latency_budget=2.0, engine_options=None,
+                 backend="torch"):
         self.use_coqui = use_coqui and HAS_TTS
         self.tts = None
+        self.backend = backend  # How the model runs on the CPU: "default", "torch" or "onnx" (vits_cpu.py)
+        self.runner = None
+        self.sink = sink  # Where audio goes: speakers, a file, or nowhere
+        self.model_name = MODEL_NAME
+        self.speaker = "p227"  # VCTK speaker, British voice
+        self.rate = 1.0  # Speaking rate, part of the cache key
+        self.cache = SynthesisCache() if use_cache else None
+        self.model_lock = threading.Lock()  # The model isn't safe to run from two threads
+        self.ready = threading.Event()  # Set once loading finished (or failed)
+        self.last_timing = {}  # Synthesis/playback timing of the last utterance
+        self.current_queue = None  # SpeechQueue being spoken, so stop() can interrupt it
         
-        if self.use_coqui:
-            try:
-                # Use VCTK model - has multiple British voices
-                print("🎙️  Loading Jarvis voice model...")
-                self.tts = TTS(model_name="tts_models/en/vctk/vits", progress_bar=False)
-                # Speaker p326 is a good British male voice
-                self.speaker = "p227"  
-                print("✅ Jarvis voice ready!")
-            except Exception as e:
-                print(f"⚠️  Could not load Coqui TTS: {e}")
-                print("Falling back to macOS Daniel voice...")
-                self.use_coqui = False
+        # Jarvis plus the lighter engines; the selector picks one per phrase
+        self.coqui = CoquiEngine(self)
+        self.selector = EngineSelector([self.coqui] + create_engines(engines, **(engine_options or {})),
+                                       latency_budget=latency_budget)
+        
+        if not self.use_coqui:
+            self.ready.set()
+        elif background:
+            # Speak with a lighter engine until the model is loaded
+            load_in_background(self._load_model)
+        else:
+            self._load_model()
     
-    def speak(self, text):
-        """Speak text using Jarvis voice"""
-        if self.use_coqui and self.tts:
+    def _load_model(self):
+        """Import Coqui TTS and load the voice model"""
+        try:
+            from TTS.api import TTS
+            # Use VCTK model - has multiple British voices
+            print("🎙️  Loading Jarvis voice model...")
+            tts = TTS(model_name=self.model_name, progress_bar=False)
             try:
-                # Generate speech with Coqui TTS
-                temp_file = "/tmp/jarvis_speech.wav"
-                self.tts.tts_to_file(
-                    text=text,
-                    speaker=self.speaker,
-                    file_path=temp_file
-                )
-                # Play the audio
-                subprocess.run(["afplay", temp_file], check=True)
-                # Clean up
-                os.remove(temp_file)
+                runner = VitsRunner(tts, self.model_name, backend=self.backend)
+                runner.release_torch_weights()
             except Exception as e:
-                print(f"❌ TTS error: {e}")
-                # Fallback to system voice
-                self._speak_system(text)
-        else:
-            self._speak_system(text)
+                print(f"⚠️  TTS backend '{self.backend}' unavailable ({e}), using torch")
+                runner = VitsRunner(tts, self.model_name, backend="torch")
+            if self.sink is None:
+                self.sink = default_sink()
+            self.runner = runner
+            self.tts = tts
+            print("✅ Jarvis voice ready!")
+        except Exception as e:
+            print(f"⚠️  Could not load Coqui TTS: {e}")
+            print("Falling back to a lightweight voice...")
+            self.use_coqui = False
+        finally:
+            self.ready.set()
+    
+    def wait_until_ready(self, timeout=None):
+        """Block until the model finished loading; True if Coqui is usable"""
+        self.ready.wait(timeout)
+        return bool(self.use_coqui and self.tts)
+    
+    def _render(self, text):
+        """Run the model and return WAV bytes"""
+        with self.model_lock:
+            waveform = self.runner.synthesize(text, self.speaker)
+        return samples_to_wav(waveform, self.runner.sample_rate)
+    
+    def synthesize(self, text):
+        """
+        Return WAV bytes for text, from the cache when possible.
+        Cache hits skip model inference entirely.
+        """
+        key = None
+        if self.cache:
+            key = SynthesisCache.make_key(text, self.model_name, self.speaker, self.rate)
+            wav_bytes = self.cache.get(key)
+            if wav_bytes is not None:
+                return wav_bytes
+        
+        wav_bytes = self._render(text)
+        if self.cache:
+            self.cache.put(key, wav_bytes)
+        return wav_bytes
+    
+    def _is_cached(self, text):
+        key = SynthesisCache.make_key(text, self.model_name, self.speaker, self.rate)
+        return bool(self.cache) and self.cache.contains(key)
+    
+    def output(self):
+        """The sink, opened on first use"""
+        if self.sink is None:
+            self.sink = default_sink()
+        return self.sink
+    
+    def synthesize_with(self, engine, text):
+        """(int16 samples, sample_rate) of text from one engine"""
+        if engine is None:
+            raise RuntimeError("no TTS engine available")
+        return engine.synthesize(text)
     
-    def _speak_system(self, text):
-        """Fallback: Use macOS Daniel voice (British)"""
+    def voices(self):
+        """Voice names by engine"""
+        return {engine.name: engine.voices() for engine in self.selector.engines}
+    
+    def set_voice(self, name):
+        """Use voice name in whichever engine has it; returns that engine or None"""
+        for engine in self.selector.engines[1:]:
+            if name in engine.voices():
+                engine.set_voice(name)
+                return engine
+        return None
+    
+    def engine_stats(self):
+        """Measured overhead and real-time factor per engine, and how often each was picked"""
+        return self.selector.stats()
+    
+    def prewarm(self, phrases):
+        """Synthesize fixed phrases into the cache on a background thread"""
+        if not (self.use_coqui and self.cache):
+            return None
+        
+        def worker():
+            if not self.wait_until_ready():
+                return
+            for phrase in phrases:
+                key = SynthesisCache.make_key(phrase, self.model_name, self.speaker, self.rate)
+                if self.cache.contains(key):
+                    continue
+                try:
+                    self.cache.put(key, self._render(phrase))
+                except Exception as e:
+                    print(f"⚠️  Could not pre-synthesize '{phrase}': {e}")
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+    
+    def cache_stats(self):
+        """Hit/miss counters of the synthesis cache"""
+        return self.cache.stats() if self.cache else {}
+    
+    def speech_queue(self, lookahead=1, on_phrase=None):
+        """
+        Start a SpeechQueue: put() sentences as they arrive (e.g. from a
+        streamed reply) and they are synthesized ahead of playback.
+        """
+        self.current_queue = SpeechQueue(self, lookahead, on_phrase)
+        return self.current_queue
+    
+    def speak_many(self, texts, lookahead=1):
+        """Speak several phrases back to back, synthesizing each while the previous one plays"""
+        speech = self.speech_queue(lookahead)
+        for text in texts:
+            speech.put(text)
+        speech.close()
+        speech.wait()
+        self.last_timing = speech.timing()
+    
+    def speak(self, text, engine=None):
+        """Speak text with the engine the selector picks (or the one given)"""
+        self.last_timing = {}
+        engine = engine or self.selector.choose(text)
+        if engine is None:
+            print(f"❌ No TTS engine available: {text}")
+            return
+        if engine is self.coqui and len(split_sentences(text)) > 1 and not self._is_cached(text):
+            # Long reply: synthesize the next sentence while this one plays
+            self.speak_many([text])
+            return
         try:
-            # Daniel is the closest to Jarvis - British male
-            subprocess.run([
-                "say", 
-                "-v", "Daniel",
-                "-r", "190",  # Slightly slower for sophistication
-                text
-            ], check=True)
+            start = time.perf_counter()
+            samples, sample_rate = self.synthesize_with(engine, text)
         except Exception as e:
-            print(f"❌ System TTS error: {e}")
+            print(f"❌ TTS error ({engine.name}): {e}")
+            # Fall back to the next fastest engine
+            engine = self.selector.fastest(text, exclude=[engine])
+            if engine is None:
+                return
+            start = time.perf_counter()
+            samples, sample_rate = self.synthesize_with(engine, text)
+        synthesized = time.perf_counter()
+        # Play straight from memory at the engine's sample rate
+        self.output().play(samples, sample_rate)
+        audio_seconds = len(samples) / sample_rate
+        self.last_timing = {
+            "engine": engine.name,
+            "synthesis_seconds": synthesized - start,
+            "playback_seconds": time.perf_counter() - synthesized,
+            "audio_seconds": audio_seconds,
+            "rtf": (synthesized - start) / audio_seconds if audio_seconds else 0.0,
+        }
+    
+    def stop(self):
+        """Interrupt the current playback"""
+        if self.current_queue:
+            self.current_queue.stop()
+        if self.sink:
+            self.sink.stop()
 
 
 # Quick test
 if __name__ == "__main__":
-    jarvis = JarvisVoice()
+    import sys
+    from audio_output import WavFileSink
+    
+    # python3 jarvis_voice.py [output_dir]  - write WAVs instead of playing (headless)
+    sink = WavFileSink(sys.argv[1]) if len(sys.argv) > 1 else None
+    jarvis = JarvisVoice(use_cache=False, sink=sink, background=False)
     print("\n🤖 Testing Jarvis voice...\n")
     
     test_phrases = [
@@ -85,7 +377,16 @@ if __name__ == "__main__":
         "At your service, as always."
     ]
     
+    # One after another: the speaker waits for every synthesis
+    start = time.perf_counter()
     for phrase in test_phrases:
         print(f"Speaking: {phrase}")
         jarvis.speak(phrase)
-        print()
+    print(f"\n⏱️  One at a time: {time.perf_counter() - start:.2f}s\n")
+    
+    # Synthesis ahead: the next phrase is ready when the current one ends
+    start = time.perf_counter()
+    jarvis.speak_many(test_phrases)
+    timing = jarvis.last_timing
+    print(f"⏱️  speak_many: {time.perf_counter() - start:.2f}s, "
+          f"longest gap between phrases {timing['max_gap_seconds'] * 1000:.0f} ms")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+LLM backends with hedged requests
+- OllamaBackend: local model through /api/generate
+- OpenAIBackend: any OpenAI-compatible /chat/completions server (OpenAI,
+  llama.cpp, vLLM, ...), streamed as server-sent events
+- HedgedLLM: sends a request to the primary backend; if no token arrived
+  within hedge_after seconds the next backend is asked too, the first to
+  answer wins and the other request is cancelled
+
+Per-backend first-token and total latency of the last requests are kept
+for p50/p95/p99.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ollama_client import iter_ollama_tokens
+from telemetry import percentile
+
+
+class BackendError(RuntimeError):
+    """A backend answered with an error status"""
+
+
+class LLMRequest:
+    """
+    One prompt for any backend. prompt/extra may rely on Ollama's carried
+    context; full_prompt is the self-contained version for other backends.
+    """
+
+    def __init__(self, prompt, extra=None, full_prompt=None):
+        self.prompt = prompt
+        self.extra = extra or {}
+        self.full_prompt = full_prompt or prompt
+
+
+class OllamaBackend:
+    """Streams from the local Ollama server"""
+
+    def __init__(self, client, model, options=None):
+        self.client = client
+        self.model = model
+        self.options = options
+        self.name = "ollama"
+
+    def open(self, request):
+        return self.client.generate(self.model, request.prompt, options=self.options, stream=True,
+                                    **request.extra)
+
+    def iter_tokens(self, response, stats):
+        return iter_ollama_tokens(response, stats)
+
+
+class OpenAIBackend:
+    """Streams from an OpenAI-compatible chat completions endpoint"""
+
+    def __init__(self, model="gpt-4o-mini", base_url=None, api_key=None, max_tokens=100,
+                 temperature=0.7, stop=None, connect_timeout=3.05, read_timeout=60):
+        self.model = model
+        self.stop = stop
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = (connect_timeout, read_timeout)
+        self.name = "openai"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def open(self, request):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": request.full_prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+        if self.stop:
+            payload["stop"] = self.stop
+        return self.session.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=self.timeout,
+            stream=True
+        )
+
+    def iter_tokens(self, response, stats):
+        """Content deltas from 'data: {...}' lines, until 'data: [DONE]'"""
+        count = 0
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            for choice in chunk.get("choices", []):
+                fragment = (choice.get("delta") or {}).get("content")
+                if fragment:
+                    count += 1
+                    yield fragment
+        stats["eval_count"] = count
+
+
+class BackendCall:
+    """One request to one backend, read on its own thread into a shared event queue"""
+
+    def __init__(self, backend, request, events):
+        self.backend = backend
+        self.events = events
+        self.response = None
+        self.cancelled = threading.Event()
+        self.stats = {}
+        self.started = time.perf_counter()
+        self.first_token = None  # Seconds from start
+        self.finished = None
+        self.thread = threading.Thread(target=self._run, args=(request,), daemon=True)
+        self.thread.start()
+
+    def _run(self, request):
+        try:
+            self.response = self.backend.open(request)
+            if self.cancelled.is_set():
+                self.response.close()
+                return
+            with self.response as response:
+                if response.status_code != 200:
+                    raise BackendError(f"{self.backend.name} returned status code {response.status_code}")
+                for token in self.backend.iter_tokens(response, self.stats):
+                    if self.cancelled.is_set():
+                        return
+                    if self.first_token is None:
+                        self.first_token = time.perf_counter() - self.started
+                    self.events.put((self, "token", token))
+            self.finished = time.perf_counter() - self.started
+            self.events.put((self, "done", None))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.events.put((self, "error", e))
+
+    def cancel(self):
+        """Stop reading; closing the response aborts generation on the server"""
+        self.cancelled.set()
+        response = self.response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+
+class HedgedLLM:
+    """
+    Streams a reply from the first backend that answers.
+
+    backends     primary first; later ones are only asked when the earlier
+                 ones are slow (or fail)
+    hedge_after  seconds without a first token before the next backend is
+                 asked (None: only on failure)
+    window       latency samples kept per backend for the percentiles
+    """
+
+    def __init__(self, backends, hedge_after=2.0, window=1000):
+        self.backends = list(backends)
+        self.hedge_after = hedge_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.latency = {b.name: {"first_token": deque(maxlen=window), "total": deque(maxlen=window),
+                                 "wins": 0, "cancelled": 0, "errors": 0}
+                        for b in self.backends}
+
+    def stream(self, request, cancel_event=None, info=None):
+        """
+        Yield reply fragments. info (a dict) receives the winning backend's
+        name, model and stats (for Ollama: the final chunk, with context),
+        and whether the request was hedged.
+        """
+        info = {} if info is None else info
+        events = queue.Queue()
+        pending = list(self.backends)
+        calls = [BackendCall(pending.pop(0), request, events)]
+        hedge_at = time.perf_counter() + self.hedge_after if self.hedge_after is not None else None
+        winner = None
+        failed = set()
+        with self.lock:
+            self.requests += 1
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                timeout = 0.05
+                if winner is None and pending and hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - time.perf_counter()))
+                try:
+                    call, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    if winner is None and pending and hedge_at is not None and time.perf_counter() >= hedge_at:
+                        calls.append(BackendCall(pending.pop(0), request, events))
+                        hedge_at = time.perf_counter() + self.hedge_after
+                        info["hedged"] = True
+                    continue
+
+                if kind == "error":
+                    self._count(call.backend.name, "errors")
+                    failed.add(call)
+                    if call is winner:
+                        raise value
+                    if winner is None:
+                        if pending:
+                            # Failed before answering: ask the next backend right away
+                            calls.append(BackendCall(pending.pop(0), request, events))
+                            info["hedged"] = True
+                        elif all(c in failed for c in calls):
+                            raise value
+                    continue
+
+                if winner is None:
+                    winner = call
+                    info.update(backend=call.backend.name, model=call.backend.model)
+                    for other in calls:
+                        if other is not call:
+                            other.cancel()
+                if call is not winner:
+                    continue
+                if kind == "token":
+                    yield value
+                else:
+                    info["stats"] = call.stats
+                    return
+        finally:
+            for call in calls:
+                if call is not winner or call.finished is None:
+                    call.cancel()
+            self._record(calls, winner, info, failed)
+
+    def _count(self, name, key):
+        with self.lock:
+            self.latency[name][key] += 1
+
+    def _record(self, calls, winner, info, failed):
+        with self.lock:
+            if info.get("hedged"):
+                self.hedged += 1
+            for call in calls:
+                latency = self.latency[call.backend.name]
+                if call.first_token is not None:
+                    latency["first_token"].append(call.first_token)
+                if call is winner:
+                    latency["wins"] += 1
+                    if call.finished is not None:
+                        latency["total"].append(call.finished)
+                elif call not in failed:
+                    latency["cancelled"] += 1
+
+    def stats(self):
+        """Per-backend wins and first-token / total latency percentiles (ms)"""
+        with self.lock:
+            result = {"requests": self.requests, "hedged": self.hedged, "backends": {}}
+            for name, latency in self.latency.items():
+                entry = {key: latency[key] for key in ("wins", "cancelled", "errors")}
+                for key in ("first_token", "total"):
+                    if latency[key]:
+                        for q in (50, 95, 99):
+                            entry[f"{key}_p{q}_ms"] = round(percentile(latency[key], q) * 1000, 1)
+                result["backends"][name] = entry
+            return result
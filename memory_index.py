@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Long-term conversation memory
+- Every exchange is embedded into a fixed-size vector
+- Vectors live in one float32 matrix, memory-mapped from disk and grown
+  in place as exchanges are added (no rebuild)
+- Each turn, the most similar past exchanges are recalled into the prompt,
+  so recall spans the whole history while the prompt stays small
+
+Embedders:
+- HashingEmbedder: feature hashing of words and word pairs, no model needed
+- OllamaEmbedder: an Ollama embedding model (e.g. nomic-embed-text)
+"""
+
+import re
+import json
+import zlib
+import threading
+from pathlib import Path
+
+import numpy as np
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about an and are as at be but by can do does did for from has have he her him his how i if in is it
+its me my of on or our please she so tell that the their them there they this to was we what when where
+which who why will with would you your
+""".split())
+
+
+def stem(word):
+    """Crude suffix stripping so 'loves', 'loved' and 'loving' share a feature"""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+class HashingEmbedder:
+    """Signed feature hashing of content words and word pairs, L2-normalized"""
+
+    min_score = 0.15  # Cosine similarity worth recalling
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _add(self, vector, text, weight):
+        words = [stem(word) for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        # The first line (the user's words) counts more than the reply
+        question, _, answer = text.partition("\n")
+        self._add(vector, question, 1.0)
+        self._add(vector, answer, 0.5)
+        return vector
+
+    def embed(self, texts):
+        vectors = np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+        return normalize_rows(vectors)
+
+
+class OllamaEmbedder:
+    """Embeddings from an Ollama model"""
+
+    def __init__(self, client, model="nomic-embed-text"):
+        self.client = client
+        self.model = model
+        self.name = f"ollama-{model}"
+        self.dim = None  # Known after the first call
+        self.min_score = 0.5
+
+    def embed(self, texts):
+        vectors = np.asarray(self.client.embed(self.model, texts), dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return normalize_rows(vectors)
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def exchange_text(entry):
+    return f"{entry['user']}\n{entry['assistant']}"
+
+
+class MemoryIndex:
+    """
+    Append-only vector index over history exchanges.
+
+    Files in directory:
+        vectors.f32  (capacity x dim float32, memory-mapped)
+        ids.i64      (history ids, one per row)
+        index.json   (embedder name, dim, count, capacity)
+    """
+
+    def __init__(self, directory="memory_index", embedder=None, initial_capacity=1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self.initial_capacity = initial_capacity
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()  # One sync at a time keeps ids in order
+        self.meta_path = self.directory / "index.json"
+        self.vectors_path = self.directory / "vectors.f32"
+        self.ids_path = self.directory / "ids.i64"
+        self.vectors = None
+        self.ids = None
+        self.count = 0
+        self.capacity = 0
+        self.dim = None
+
+        meta = self._read_meta()
+        if meta and meta.get("embedder") == self.embedder.name and self.vectors_path.exists():
+            self.dim = meta["dim"]
+            self.count = meta["count"]
+            self._map(meta["capacity"])
+
+    # -- storage ---------------------------------------------------------
+
+    def _read_meta(self):
+        try:
+            return json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "embedder": self.embedder.name,
+            "dim": self.dim,
+            "count": self.count,
+            "capacity": self.capacity,
+        }))
+        tmp.replace(self.meta_path)
+
+    def _map(self, capacity):
+        """(Re)map both files at the given capacity, growing them if needed"""
+        for path, itemsize in ((self.vectors_path, 4 * self.dim), (self.ids_path, 8)):
+            with open(path, "ab") as f:
+                if f.tell() < capacity * itemsize:
+                    f.truncate(capacity * itemsize)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.ids = np.memmap(self.ids_path, dtype=np.int64, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def _ensure_capacity(self, needed):
+        if needed <= self.capacity:
+            return
+        capacity = max(self.initial_capacity, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.ids.flush()
+        self._map(capacity)
+
+    # -- public API ------------------------------------------------------
+
+    @property
+    def last_id(self):
+        """History id of the newest indexed exchange (0 if empty)"""
+        with self.lock:
+            return int(self.ids[self.count - 1]) if self.count else 0
+
+    def add(self, entries):
+        """Embed and append history entries (dicts with id, user, assistant)"""
+        entries = [entry for entry in entries if entry.get("id") is not None]
+        if not entries:
+            return 0
+        vectors = self.embedder.embed([exchange_text(entry) for entry in entries])
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            start = self.count
+            self._ensure_capacity(start + len(entries))
+            self.vectors[start:start + len(entries)] = vectors
+            self.ids[start:start + len(entries)] = [entry["id"] for entry in entries]
+            self.count += len(entries)
+            self.vectors.flush()
+            self.ids.flush()
+            self._write_meta()
+        return len(entries)
+
+    def search(self, text, k=3, exclude=(), min_score=None):
+        """
+        [(history id, cosine similarity)] of the k most similar exchanges
+        scoring at least min_score (default: the embedder's threshold)
+        """
+        if min_score is None:
+            min_score = self.embedder.min_score
+        if not self.count:
+            return []
+        query = self.embedder.embed([text])[0]
+        with self.lock:
+            if not self.count:
+                return []
+            scores = self.vectors[:self.count] @ query
+            if exclude:
+                scores[np.isin(self.ids[:self.count], list(exclude))] = -1.0
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def sync(self, history_store, batch=256):
+        """
+        Index every stored exchange newer than the last indexed one.
+        Called at startup to catch up and after each new exchange.
+        """
+        added = 0
+        with self.sync_lock:
+            while True:
+                entries = history_store.since(self.last_id, limit=batch)
+                if not entries:
+                    return added
+                added += self.add(entries)
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+            if self.dim is not None:
+                self._write_meta()
+
+    def close(self):
+        with self.lock:
+            if self.vectors is not None:
+                self.vectors.flush()
+                self.ids.flush()
+            self.vectors = None
+            self.ids = None
+            self.count = self.capacity = 0
+
+
+def create_embedder(name="hashing", client=None, model="nomic-embed-text"):
+    """'ollama' uses an Ollama embedding model, anything else feature hashing"""
+    if name == "ollama" and client is not None:
+        return OllamaEmbedder(client, model)
+    return HashingEmbedder()
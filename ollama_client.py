@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Helpers for talking to the local Ollama server
+- One pooled, keep-alive HTTP session shared by every request
+- Bounded connect/read timeouts
+- Keeps the model loaded between turns and preloads it at startup
+"""
+
+import os
+import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from sentence_stream import SentenceBuffer
+
+OLLAMA_URL = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+if not OLLAMA_URL.startswith("http"):
+    OLLAMA_URL = f"http://{OLLAMA_URL}"
+
+# How long Ollama keeps the model in memory after a request ("30m", "1h", -1 = forever)
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# The model starting the next turn of the transcript ends its reply
+ROLE_STOP_SEQUENCES = ["User:", "\nAssistant:"]
+
+
+class OllamaClient:
+    """Shared client for the Ollama HTTP API"""
+    
+    def __init__(self, base_url=OLLAMA_URL, keep_alive=DEFAULT_KEEP_ALIVE,
+                 connect_timeout=3.05, read_timeout=60, pool_size=4):
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.connect_timeout = connect_timeout
+        
+        # Persistent session: the TCP connection is reused across turns
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def is_available(self):
+        """Check if the Ollama server is up"""
+        try:
+            response = self.session.get(
+                f"{self.base_url}/api/tags",
+                timeout=(self.connect_timeout, 5)
+            )
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+    
+    def generate(self, model, prompt, options=None, stream=False, **extra):
+        """
+        Call /api/generate. Returns the requests Response; with stream=True
+        the body is read lazily (use it as a context manager so the
+        connection goes back to the pool).
+        """
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self.session.post(
+            f"{self.base_url}/api/generate",
+            json=payload,
+            timeout=self.timeout,
+            stream=stream
+        )
+    
+    def embed(self, model, texts):
+        """
+        Embedding vectors for a list of texts. Uses the batch /api/embed
+        endpoint, falling back to one /api/embeddings call per text on
+        older servers.
+        """
+        response = self.session.post(
+            f"{self.base_url}/api/embed",
+            json={"model": model, "input": list(texts), "keep_alive": self.keep_alive},
+            timeout=self.timeout
+        )
+        if response.status_code != 404:
+            response.raise_for_status()
+            return response.json()["embeddings"]
+        vectors = []
+        for text in texts:
+            response = self.session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": model, "prompt": text, "keep_alive": self.keep_alive},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            vectors.append(response.json()["embedding"])
+        return vectors
+    
+    def warm_up(self, model, timeout=120):
+        """
+        Load the model into memory without generating anything.
+        A request with no prompt makes Ollama load the model and return.
+        """
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=(self.connect_timeout, timeout)
+            )
+            return response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️  Could not preload model {model}: {e}")
+            return False
+    
+    def warm_up_in_background(self, model):
+        """Preload the model on a background thread"""
+        thread = threading.Thread(target=self.warm_up, args=(model,), daemon=True)
+        thread.start()
+        return thread
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def format_history(history, token_budget):
+    """
+    Most recent exchanges as 'User: ...\nAssistant: ...' lines, oldest
+    first, keeping as many as fit in token_budget.
+    """
+    lines = []
+    used = 0
+    for entry in reversed(history):
+        line = f"User: {entry['user']}\nAssistant: {entry['assistant']}\n"
+        used += estimate_tokens(line)
+        if used > token_budget:
+            break
+        lines.append(line)
+    return "".join(reversed(lines))
+
+
+class PromptContext:
+    """
+    Carries Ollama's `context` (the token state of the conversation so far)
+    from one /api/generate call to the next, so each turn only sends and
+    evaluates the new user input instead of the whole transcript.
+
+    When the conversation would outgrow token_budget, the next prompt is
+    rebuilt from the system prompt plus the recent exchanges that fit in
+    half the budget, and carrying starts over from there.
+    """
+
+    def __init__(self, system_prompt, token_budget=1536, reply_tokens=128):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.reply_tokens = reply_tokens  # Room left for the answer
+        self.context = None
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.context = None
+            self.tokens = 0
+
+    def next_prompt(self, user_input, history, recalled=""):
+        """
+        (prompt, extra request fields) for the next turn. recalled is
+        optional text (e.g. related earlier exchanges) placed before the
+        user input.
+        """
+        turn = f"{recalled}User: {user_input}\nAssistant:"
+        with self.lock:
+            if self.context and self.tokens + estimate_tokens(turn) + self.reply_tokens <= self.token_budget:
+                return turn, {"context": self.context}
+            self.context = None
+            self.tokens = 0
+        return self.full_prompt(user_input, history, recalled), {}
+
+    def full_prompt(self, user_input, history, recalled=""):
+        """The turn as one self-contained prompt (no carried context)"""
+        history_text = format_history(history, self.token_budget // 2)
+        return f"{self.system_prompt}\n\n{history_text}{recalled}User: {user_input}\nAssistant:"
+
+    def update(self, result):
+        """
+        Keep the context from a finished reply. Pass None when the reply
+        was cut short (no final chunk), which restarts from a full prompt.
+        """
+        context = (result or {}).get("context")
+        with self.lock:
+            self.context = context or None
+            self.tokens = len(context) if context else 0
+
+
+def iter_ollama_tokens(response, stats=None):
+    """
+    Yield response fragments from a streaming /api/generate call.
+
+    Ollama streams one JSON object per line (NDJSON). Every object carries a
+    "response" fragment; the last one has "done": true plus the timing stats,
+    which are copied into the stats dict if one is given.
+    """
+    for line in response.iter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(chunk["error"])
+        fragment = chunk.get("response", "")
+        if fragment:
+            yield fragment
+        if chunk.get("done"):
+            if stats is not None:
+                stats.update(chunk)
+            # Keep reading to the end of the body (normally nothing is left),
+            # so the connection goes back to the pool instead of being closed
+
+
+def iter_sentences(fragments):
+    """Yield complete sentences from a stream of text fragments"""
+    buffer = SentenceBuffer()
+    for fragment in fragments:
+        for sentence in buffer.feed(fragment):
+            yield sentence
+    for sentence in buffer.flush():
+        yield sentence
+
+
+def iter_until_stop(fragments, stop_sequences=ROLE_STOP_SEQUENCES):
+    """
+    Pass fragments through until a stop sequence appears (for backends
+    that ignore the stop option). Only text that could be the start of a
+    stop sequence is held back.
+    """
+    pending = ""
+    for fragment in fragments:
+        pending += fragment
+        cuts = [pending.find(stop) for stop in stop_sequences if stop in pending]
+        if cuts:
+            if min(cuts):
+                yield pending[:min(cuts)]
+            return
+        hold = 0
+        for stop in stop_sequences:
+            for k in range(min(len(stop) - 1, len(pending)), hold, -1):
+                if pending.endswith(stop[:k]):
+                    hold = k
+                    break
+        if len(pending) > hold:
+            yield pending[:len(pending) - hold]
+            pending = pending[len(pending) - hold:]
+    if pending:
+        yield pending
+
+
+class FragmentCounter:
+    """
+    Counts streamed fragments (one per token for Ollama) and where each
+    ends in the text, to tell how many were generated but never used.
+    """
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self.ends = []
+        self.first = self.last = None  # perf_counter of the first / latest fragment
+
+    def __iter__(self):
+        total = 0
+        for fragment in self.fragments:
+            total += len(fragment)
+            self.ends.append(total)
+            self.last = time.perf_counter()
+            if self.first is None:
+                self.first = self.last
+            yield fragment
+
+    @property
+    def count(self):
+        return len(self.ends)
+
+    def rate(self):
+        """Fragments per second as they arrived; None with fewer than two"""
+        if self.count < 2 or self.last <= self.first:
+            return None
+        return round((self.count - 1) / (self.last - self.first), 2)
+
+    def wasted(self, used_chars):
+        """Fragments that start after the first used_chars characters"""
+        return sum(1 for start in [0] + self.ends[:-1] if start >= used_chars)
+
+
+def iter_ollama_sentences(response, stats=None):
+    """Yield complete sentences from a streaming /api/generate call"""
+    return iter_sentences(iter_ollama_tokens(response, stats))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Cache of assistant replies for repeated questions
+- Key: normalized question + model + generation options + hash of the prompt
+  context that shapes a standalone answer (the system prompt), not the rolling
+  conversation, so a repeated question hits
+- LRU eviction with a time-to-live, persisted in SQLite across restarts
+- Follow-ups ("what about it?"), questions about the speaker ("what's my
+  name?") and time-sensitive questions bypass the cache
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Words that make a question depend on what was said before
+FOLLOW_UP = re.compile(
+    r"\b(it|its|it's|that|this|those|these|they|them|their|he|she|him|her|his|hers|"
+    r"there|more|again|else|also|too|same|previous|last one|the other)\b"
+    r"|^(and|but|so|or|what about|how about|why)\b"
+)
+
+# Questions whose answer changes over time
+TIME_SENSITIVE = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|time|date|day|weather|news|latest|current|currently)\b"
+)
+
+# Questions about the speaker, answered from what they said before
+PERSONAL = re.compile(r"\b(i|i'm|i've|i'd|i'll|my|mine|myself|we|we're|our|ours)\b")
+
+FILLER = re.compile(r"^(hey|hi|ok|okay|so|um|uh|please)\s+|\s+please$")
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and filler words, collapse whitespace"""
+    text = text.lower()
+    text = re.sub(r"[^\w\s']", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    previous = None
+    while previous != text:
+        previous = text
+        text = FILLER.sub("", text).strip()
+    return text
+
+
+def is_cacheable(text):
+    """False for follow-ups, questions about the speaker and time-sensitive questions"""
+    normalized = normalize(text)
+    return (bool(normalized) and not FOLLOW_UP.search(normalized) and not PERSONAL.search(normalized)
+            and not TIME_SENSITIVE.search(normalized))
+
+
+class ResponseCache:
+    """LRU + TTL reply cache backed by SQLite"""
+
+    def __init__(self, db_path="response_cache.db", max_entries=1000, ttl_seconds=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                question TEXT,
+                reply TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(text, model, options, context=""):
+        """Cache key for one question in one prompt context"""
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        raw = json.dumps([normalize(text), model, options or {}, context_hash], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Cached reply or None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT reply, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, reply, question=""):
+        """Store a reply and evict expired / least recently used entries"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, question, reply, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, question, reply, now, now)
+            )
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self.conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+
+    def note_bypass(self):
+        with self.lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
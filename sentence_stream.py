@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Sentence segmentation for streamed text
+Cuts a stream of LLM tokens into speakable sentences as they arrive
+"""
+
+import re
+
+# A sentence ends at . ! or ? (optionally followed by closing quotes/brackets)
+# and is followed by whitespace. Requiring the whitespace means we never cut
+# "3.5" or "e.g." in the middle of a token run.
+SENTENCE_END = re.compile(r'([.!?]+["\')\]]*)\s+')
+
+# Abbreviations that end with a period but don't end a sentence
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "approx."}
+
+
+def _ends_with_abbreviation(text):
+    """Check if text ends with a known abbreviation"""
+    words = text.rsplit(None, 1)
+    return bool(words) and words[-1].lower() in ABBREVIATIONS
+
+
+class SentenceBuffer:
+    """Accumulates text fragments and yields complete sentences"""
+
+    def __init__(self, min_length=2):
+        self.buffer = ""
+        self.min_length = min_length
+
+    def feed(self, fragment):
+        """Add a fragment, return the list of sentences it completed"""
+        self.buffer += fragment
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end(1)].strip()
+            if len(candidate) < self.min_length or _ends_with_abbreviation(candidate):
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left over as a final sentence"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return [remainder] if remainder else []
+
+
+def split_sentences(text):
+    """Split a complete text into sentences"""
+    buffer = SentenceBuffer()
+    return buffer.feed(text) + buffer.flush()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Multi-client assistant server
+- One warm Ollama model and one loaded Jarvis voice shared by many thin
+  clients (room devices)
+- Text in, audio out over HTTP: each reply streams back as NDJSON events,
+  sentences as soon as they are generated, then the audio of each sentence
+- Per-session conversation history and Ollama context, kept in memory only:
+  the shared history store and long-term memory index are not opened, so no
+  session ever sees another's conversation
+- Answers to repeated standalone questions are shared through the response
+  cache; follow-ups and questions about the speaker never are cached
+- Requests are queued fairly (sessions take turns) and at most
+  llm_workers Ollama calls run at once
+
+API:
+    POST   /v1/sessions          -> {"session_id": ...}
+    POST   /v1/chat              {"session_id", "text", "audio": true}
+                                 -> NDJSON stream of events:
+                                    start    {"session_id", "queue_ms", "audio"}
+                                    sentence {"index", "text"}
+                                    audio    {"index", "wav" (base64), "audio_seconds"}
+                                    done     {"reply", "intent", "total_ms"}
+    DELETE /v1/sessions/<id>
+    GET    /v1/health
+    GET    /metrics              (Prometheus text)
+
+Usage:
+    python3 server.py [--host 127.0.0.1] [--port 8765] [--llm-workers 2] [--no-audio]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import base64
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Clients send text, so don't load an offline speech recognition model
+os.environ.setdefault("STT_ENGINE", "google")
+
+import assistant_enhanced as assistant  # noqa: E402
+from audio_output import wav_to_samples  # noqa: E402
+from intents import IntentRouter, spoken_time, spoken_date, TIME_PATTERNS, DATE_PATTERNS  # noqa: E402
+from ollama_client import OllamaClient, PromptContext  # noqa: E402
+from sentence_stream import split_sentences  # noqa: E402
+
+CONFIG = assistant.CONFIG
+SESSION_IDLE_SECONDS = 3600  # Sessions unused for this long are dropped
+
+
+class Session:
+    """One client's conversation: recent history and Ollama context"""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.history = []
+        self.prompt_context = PromptContext(assistant.SYSTEM_PROMPT, CONFIG["context_tokens"],
+                                            assistant.GENERATION_OPTIONS["num_predict"])
+        self.last_used = time.time()
+        self.turns = 0
+
+
+class SessionStore:
+    """Sessions by id; idle ones expire"""
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.time() - self.idle_seconds
+        for session_id in [s.id for s in self.sessions.values() if s.last_used < cutoff]:
+            del self.sessions[session_id]
+
+    def create(self):
+        with self.lock:
+            self._expire()
+            session = Session(uuid.uuid4().hex)
+            self.sessions[session.id] = session
+            return session
+
+    def get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session:
+                session.last_used = time.time()
+            return session
+
+    def delete(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.sessions)
+
+
+class FairQueue:
+    """
+    Round-robin over sessions: a session with many queued requests can't
+    starve the others, and each session has at most one request running
+    (its history is updated in order).
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = OrderedDict()  # session id -> deque of jobs, in turn order
+        self.busy = set()  # Sessions with a request running
+
+    def put(self, key, job):
+        with self.cond:
+            self.pending.setdefault(key, deque()).append(job)
+            self.cond.notify()
+
+    def get(self):
+        """Next job from the first session not already running one"""
+        with self.cond:
+            while True:
+                key = next((k for k in self.pending if k not in self.busy), None)
+                if key is not None:
+                    break
+                self.cond.wait()
+            jobs = self.pending.pop(key)
+            job = jobs.popleft()
+            if jobs:
+                self.pending[key] = jobs  # Back of the line
+            self.busy.add(key)
+            return job
+
+    def done(self, key):
+        with self.cond:
+            self.busy.discard(key)
+            self.cond.notify_all()
+
+    def __len__(self):
+        with self.cond:
+            return sum(len(jobs) for jobs in self.pending.values())
+
+
+class Job:
+    """One chat request; the HTTP handler reads its events"""
+
+    def __init__(self, session, text, audio):
+        self.session = session
+        self.text = text
+        self.audio = audio
+        self.events = queue.Queue()
+        self.cancel = threading.Event()  # Set when the client disconnects
+        self.created = time.perf_counter()
+        self.sentences = 0
+        self.reply = ""
+        self.intent = None
+
+    def emit(self, event, **fields):
+        self.events.put(dict(fields, event=event))
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.created) * 1000, 1)
+
+    def finish(self):
+        self.emit("done", reply=self.reply, intent=self.intent, total_ms=self.elapsed_ms())
+
+
+class AssistantServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8765, llm_workers=2, audio=True):
+        super().__init__((host, port), AssistantHandler)
+        self.sessions = SessionStore()
+        self.queue = FairQueue()
+        self.tts_queue = queue.Queue()  # (job, index, sentence); index None = job finished
+        self.llm_workers = llm_workers
+        self.audio = audio and assistant.jarvis_tts is not None
+        self.active = 0
+        self.lock = threading.Lock()
+
+        # Questions answered without the model
+        self.router = IntentRouter(CONFIG["intent_log"])
+        self.router.register("time", TIME_PATTERNS, lambda match: spoken_time())
+        self.router.register("date", DATE_PATTERNS, lambda match: spoken_date())
+
+        for i in range(llm_workers):
+            threading.Thread(target=self._llm_worker, name=f"llm-{i}", daemon=True).start()
+        threading.Thread(target=self._tts_worker, name="tts", daemon=True).start()
+
+    def tts_ready(self):
+        """True once the Jarvis model is loaded (text-only replies until then)"""
+        return self.audio and assistant.jarvis_tts.wait_until_ready(0)
+
+    # -- workers ---------------------------------------------------------
+
+    def _llm_worker(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.active += 1
+            try:
+                self._answer(job)
+            except Exception as e:
+                print(f"❌ Error answering request: {e}")
+                job.emit("error", message=str(e))
+                job.audio = False
+            finally:
+                with self.lock:
+                    self.active -= 1
+                self.queue.done(job.session.id)
+                if job.audio:
+                    # After the audio of the last sentence
+                    self.tts_queue.put((job, None, None))
+                else:
+                    job.finish()
+
+    def _answer(self, job):
+        session = job.session
+        queue_ms = job.elapsed_ms()
+        job.audio = job.audio and self.tts_ready()
+        job.emit("start", session_id=session.id, queue_ms=queue_ms, audio=job.audio)
+
+        def on_sentence(sentence):
+            index = job.sentences
+            job.sentences += 1
+            job.emit("sentence", index=index, text=sentence)
+            if job.audio:
+                self.tts_queue.put((job, index, sentence))
+
+        assistant.tracer.begin_turn()
+        with assistant.tracer.span("request", session=session.id, queue_ms=queue_ms) as span:
+            intent, reply = self.router.route(job.text)
+            if intent is not None:
+                for sentence in split_sentences(reply):
+                    on_sentence(sentence)
+            else:
+                reply = assistant.get_ai_response(job.text, on_sentence, job.cancel,
+                                                  session.history, session.prompt_context)
+                if not job.sentences and reply:
+                    on_sentence(reply)  # Error messages aren't streamed
+            span.set(intent=intent or "llm", sentences=job.sentences, cancelled=job.cancel.is_set())
+        session.turns += 1
+        job.reply = reply
+        job.intent = intent
+
+    def _tts_worker(self):
+        """One synthesis at a time: the model is loaded once and runs on one thread"""
+        while True:
+            job, index, sentence = self.tts_queue.get()
+            if index is None:
+                job.finish()
+                continue
+            if job.cancel.is_set():
+                continue
+            try:
+                with assistant.tracer.span("tts", voice="jarvis", characters=len(sentence)) as span:
+                    start = time.perf_counter()
+                    wav_bytes = assistant.jarvis_tts.synthesize(sentence)
+                    samples, sample_rate = wav_to_samples(wav_bytes)
+                    audio_seconds = len(samples) / sample_rate
+                    span.set(audio_seconds=round(audio_seconds, 3),
+                             rtf=round((time.perf_counter() - start) / audio_seconds, 3) if audio_seconds else 0.0)
+                job.emit("audio", index=index, audio_seconds=round(audio_seconds, 3),
+                         wav=base64.b64encode(wav_bytes).decode("ascii"))
+            except Exception as e:
+                print(f"❌ TTS error: {e}")
+                job.emit("error", index=index, message=f"TTS failed: {e}")
+
+    # -- status ----------------------------------------------------------
+
+    def health(self):
+        with self.lock:
+            active = self.active
+        return {
+            "status": "ok",
+            "model": CONFIG["model"],
+            "sessions": len(self.sessions),
+            "queued": len(self.queue),
+            "active": active,
+            "llm_workers": self.llm_workers,
+            "audio": bool(self.tts_ready()),
+        }
+
+    def metrics_text(self):
+        health = self.health()
+        lines = [
+            "# HELP voice_server_queued_requests Requests waiting for an LLM worker",
+            "# TYPE voice_server_queued_requests gauge",
+            f"voice_server_queued_requests {health['queued']}",
+            "# HELP voice_server_active_requests Requests being answered",
+            "# TYPE voice_server_active_requests gauge",
+            f"voice_server_active_requests {health['active']}",
+            "# HELP voice_server_sessions Open sessions",
+            "# TYPE voice_server_sessions gauge",
+            f"voice_server_sessions {health['sessions']}",
+        ]
+        return assistant.tracer.metrics_text() + "\n".join(lines) + "\n"
+
+
+class AssistantHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # Client dropped an idle keep-alive connection
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        """The request's JSON object, or None when it's missing, malformed or not an object"""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}") if length >= 0 else None
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def _write_chunk(self, body):
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/v1/health":
+            self._send_json(200, self.server.health())
+        elif self.path == "/metrics":
+            data = self.server.metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        prefix = "/v1/sessions/"
+        if self.path.startswith(prefix) and self.server.sessions.delete(self.path[len(prefix):]):
+            self._send_json(200, {"deleted": True})
+        else:
+            self._send_json(404, {"error": "unknown session"})
+
+    def do_POST(self):
+        body = self._read_json()
+        if body is None:
+            self._send_json(400, {"error": "invalid JSON (expected an object)"})
+            self.close_connection = True  # The unread body would be taken as the next request
+        elif self.path == "/v1/sessions":
+            self._send_json(200, {"session_id": self.server.sessions.create().id})
+        elif self.path == "/v1/chat":
+            self._chat(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _chat(self, body):
+        text = str(body.get("text", "")).strip()
+        if not text:
+            self._send_json(400, {"error": "text is required"})
+            return
+        session_id = body.get("session_id")
+        session = self.server.sessions.get(session_id) if session_id else self.server.sessions.create()
+        if session is None:
+            self._send_json(404, {"error": "unknown session"})
+            return
+
+        job = Job(session, text, bool(body.get("audio", True)))
+        self.server.queue.put(session.id, job)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while True:
+                event = job.events.get()
+                self._write_chunk(event)
+                if event["event"] == "done":
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away: stop generating and skip its audio
+            job.cancel.set()
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-client voice assistant server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-workers", type=int, default=2, help="concurrent Ollama requests")
+    parser.add_argument("--no-audio", action="store_true", help="reply with text only")
+    args = parser.parse_args()
+
+    # One pooled connection per LLM worker
+    assistant.ollama = OllamaClient(keep_alive=CONFIG["keep_alive"], pool_size=max(4, args.llm_workers))
+    assistant.llm = assistant.create_llm()
+    if not assistant.check_ollama_installed():
+        print("❌ Ollama is not running! Start it with: ollama serve")
+        sys.exit(1)
+    assistant.ollama.warm_up_in_background(CONFIG["model"])
+    # No load_conversation_history(): the history store and memory index are
+    # shared by everything that uses them, and would recall one client's
+    # exchanges in another's prompt
+
+    server = AssistantServer(args.host, args.port, args.llm_workers, audio=not args.no_audio)
+    print(f"🛰️  Assistant server on http://{args.host}:{server.server_address[1]} "
+          f"(model {CONFIG['model']}, {args.llm_workers} LLM workers, audio {'on' if server.audio else 'off'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+        if assistant.response_cache:
+            assistant.response_cache.close()
+        assistant.tracer.close()
+
+
+if __name__ == "__main__":
+    main()
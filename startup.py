@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Startup helpers
+- Load expensive models (TTS, STT) on background threads
+- Measure the time from launch to the first "Listening..."
+
+Import this module first so START_TIME is taken before any heavy import.
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+
+START_TIME = time.perf_counter()
+_ready_reported = False
+
+
+def load_in_background(factory, *args, **kwargs):
+    """Run factory(*args, **kwargs) on a daemon thread, return a Future of its result"""
+    future = Future()
+
+    def worker():
+        try:
+            future.set_result(factory(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+
+def seconds_since_start():
+    return time.perf_counter() - START_TIME
+
+
+def report_ready():
+    """Print the startup time once, right before the first 'Listening...'"""
+    global _ready_reported
+    if not _ready_reported:
+        _ready_reported = True
+        print(f"⚡ Ready to listen {seconds_since_start():.2f}s after launch")
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Speech-to-text engines
+- VoskSTT: offline, CPU, true streaming partial results
+- WhisperSTT: offline, CPU (faster-whisper), partials by re-decoding the growing buffer
+- GoogleSTT: online Google Web Speech API (the original behaviour)
+
+All engines raise speech_recognition.UnknownValueError when nothing was
+understood and speech_recognition.RequestError when the engine failed,
+so callers handle every backend the same way.
+"""
+
+import os
+import json
+import queue
+import threading
+import importlib.util
+from concurrent.futures import Future
+
+import numpy as np
+import speech_recognition as sr
+
+# Optional offline engines, imported only when an engine is created
+HAS_VOSK = importlib.util.find_spec("vosk") is not None
+HAS_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+
+SAMPLE_RATE = 16000
+
+
+def audio_to_pcm(audio, sample_rate=SAMPLE_RATE):
+    """16-bit mono PCM bytes at sample_rate from AudioData"""
+    return audio.get_raw_data(convert_rate=sample_rate, convert_width=2)
+
+
+class SpeechToText:
+    """Base class for speech-to-text engines"""
+
+    name = "base"
+    streaming = False  # True if start_stream() gives partial results
+
+    def transcribe(self, audio):
+        """
+        AudioData -> text. If the audio came from a CaptureSession with a
+        StreamingTranscriber attached, the transcript is already being
+        computed and we just wait for it.
+        """
+        future = getattr(audio, "transcript_future", None)
+        if future is not None:
+            return future.result()
+        try:
+            return self._transcribe(audio)
+        except (sr.UnknownValueError, sr.RequestError):
+            raise
+        except Exception as e:
+            raise sr.RequestError(f"{self.name} STT failed: {e}")
+
+    def _transcribe(self, audio):
+        raise NotImplementedError
+
+    def start_stream(self):
+        """Return an object with feed(pcm) -> partial text or None, and finish() -> text"""
+        raise NotImplementedError(f"{self.name} does not support streaming")
+
+    @staticmethod
+    def _result(text):
+        text = (text or "").strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class GoogleSTT(SpeechToText):
+    """Google Web Speech API (needs network)"""
+
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def _transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskSTT(SpeechToText):
+    """Vosk/Kaldi offline recognizer with partial hypotheses"""
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        if not HAS_VOSK:
+            raise RuntimeError("vosk is not installed (pip install vosk)")
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path} (set VOSK_MODEL_PATH)")
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def _recognizer(self):
+        return self.vosk.KaldiRecognizer(self.model, SAMPLE_RATE)
+
+    def _transcribe(self, audio):
+        recognizer = self._recognizer()
+        recognizer.AcceptWaveform(audio_to_pcm(audio))
+        return self._result(json.loads(recognizer.FinalResult()).get("text"))
+
+    def start_stream(self):
+        return _VoskStream(self._recognizer())
+
+
+class _VoskStream:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.finished_text = []
+
+    def feed(self, pcm, partial=True):
+        if self.recognizer.AcceptWaveform(pcm):
+            # Vosk closed a segment on its own (long pause inside the utterance)
+            self.finished_text.append(json.loads(self.recognizer.Result()).get("text", ""))
+            return " ".join(self.finished_text).strip() or None
+        if not partial:
+            return None
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.finished_text + [partial]).strip() or None
+
+    def finish(self):
+        self.finished_text.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return SpeechToText._result(" ".join(self.finished_text))
+
+
+class WhisperSTT(SpeechToText):
+    """faster-whisper (CTranslate2) on CPU with int8 weights"""
+
+    name = "whisper"
+    streaming = True
+
+    def __init__(self, model_size=WHISPER_MODEL, compute_type="int8", cpu_threads=0,
+                 partial_interval=1.0, partial_window=8.0):
+        if not HAS_WHISPER:
+            raise RuntimeError("faster-whisper is not installed (pip install faster-whisper)")
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                  cpu_threads=cpu_threads)
+        self.partial_interval = partial_interval
+        self.partial_window = partial_window  # Seconds of trailing audio a partial decodes
+
+    def decode(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language="en", beam_size=1,
+                                            vad_filter=False, without_timestamps=True)
+        return " ".join(segment.text.strip() for segment in segments)
+
+    def _transcribe(self, audio):
+        return self._result(self.decode(audio_to_pcm(audio)))
+
+    def start_stream(self):
+        return _WhisperStream(self)
+
+
+class _WhisperStream:
+    """
+    Decodes the last partial_window seconds every partial_interval seconds,
+    so a partial costs the same however long the utterance gets; the final
+    transcript decodes all of it once
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.buffer = bytearray()
+        self.next_partial = int(engine.partial_interval * SAMPLE_RATE * 2)
+        self.window = int(engine.partial_window * SAMPLE_RATE * 2)
+
+    def feed(self, pcm, partial=True):
+        self.buffer += pcm
+        if not partial or len(self.buffer) < self.next_partial:
+            return None
+        self.next_partial = len(self.buffer) + int(self.engine.partial_interval * SAMPLE_RATE * 2)
+        return self.engine.decode(bytes(self.buffer[-self.window:])).strip() or None
+
+    def finish(self):
+        return SpeechToText._result(self.engine.decode(bytes(self.buffer)))
+
+
+ENGINES = {
+    "google": GoogleSTT,
+    "vosk": VoskSTT,
+    "whisper": WhisperSTT,
+}
+
+
+def create_stt(name="auto", **kwargs):
+    """
+    Create a speech-to-text engine by name.
+    "auto" prefers offline engines (Vosk, then Whisper) and falls back to Google.
+    """
+    name = os.getenv("STT_ENGINE", name)
+    if name != "auto":
+        return ENGINES[name](**kwargs)
+
+    for candidate in ("vosk", "whisper"):
+        try:
+            return ENGINES[candidate]()
+        except Exception as e:
+            print(f"⚠️  {candidate} STT unavailable: {e}")
+    return GoogleSTT()
+
+
+class StreamingTranscriber:
+    """
+    Attach to a CaptureSession to transcribe while the user is still
+    speaking. Decoding runs on its own thread so capture never stalls;
+    the final transcript is handed back through a Future.
+    """
+
+    def __init__(self, engine, on_partial=None):
+        self.engine = engine
+        self.on_partial = on_partial or (lambda text: None)
+        self.events = queue.Queue()
+        self.future = None
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    # Called from the capture thread - must not block
+
+    def speech_started(self, sample_rate):
+        self.future = Future()
+        self.events.put(("start", sample_rate, self.future))
+
+    def speech_frame(self, frame):
+        self.events.put(("frame", frame, None))
+
+    def speech_ended(self):
+        self.events.put(("end", None, self.future))
+        return self.future
+
+    def _take_frames(self, frame):
+        """
+        frame plus every frame queued behind it -> (pcm, next event or None).
+        Frames that piled up during a slow decode are fed in one go, so
+        partials never queue up behind each other.
+        """
+        frames = [frame]
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return b"".join(frames), None
+            if event[0] != "frame":
+                return b"".join(frames), event
+            frames.append(event[1])
+
+    def _run(self):
+        stream = None
+        future = None
+        rate = SAMPLE_RATE
+        pending = None
+        while True:
+            kind, data, event_future = pending or self.events.get()
+            pending = None
+            try:
+                if kind == "start":
+                    stream, future, rate = self.engine.start_stream(), event_future, data
+                elif kind == "frame" and stream is not None:
+                    pcm, pending = self._take_frames(data)
+                    if rate != SAMPLE_RATE:
+                        pcm = sr.AudioData(pcm, rate, 2).get_raw_data(convert_rate=SAMPLE_RATE)
+                    # Once the utterance has ended only the final transcript matters
+                    partial = stream.feed(pcm, partial=pending is None or pending[0] != "end")
+                    if partial:
+                        self.on_partial(partial)
+                elif kind == "end" and stream is not None:
+                    future.set_result(stream.finish())
+                    stream = None
+            except Exception as e:
+                if future is not None and not future.done():
+                    if not isinstance(e, (sr.UnknownValueError, sr.RequestError)):
+                        e = sr.RequestError(f"{self.engine.name} STT failed: {e}")
+                    future.set_exception(e)
+                stream = None
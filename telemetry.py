@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing for the voice loop
+- Spans around capture, STT, LLM, synthesis and playback
+- One JSON line per span in a trace file
+- Optional Prometheus text endpoint (GET /metrics)
+- Ollama token counts/durations become tokens/sec (the rate the stream
+  arrived at when it was closed before Ollama's final chunk); TTS timings
+  become a real-time factor
+
+Summarize a trace (per model / voice):
+    python3 telemetry.py trace.jsonl
+"""
+
+import json
+import time
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets for stage durations (seconds)
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span attributes exported as Prometheus metrics: attr -> (metric, type, help)
+METRIC_ATTRS = {
+    "prompt_eval_count": ("voice_llm_prompt_tokens_total", "counter", "Prompt tokens evaluated by the model"),
+    "eval_count": ("voice_llm_generated_tokens_total", "counter", "Tokens generated by the model"),
+    "wasted_tokens": ("voice_llm_wasted_tokens_total", "counter", "Generated tokens that were never spoken"),
+    "tokens_per_second": ("voice_llm_tokens_per_second", "gauge", "Generation speed of the last reply"),
+    "context_lost": ("voice_llm_context_lost_total", "counter",
+                     "Replies stopped before Ollama's final chunk (early stop, barge-in); "
+                     "the next turn sends the full prompt"),
+    "audio_seconds": ("voice_tts_audio_seconds_total", "counter", "Seconds of speech synthesized"),
+    "rtf": ("voice_tts_real_time_factor", "gauge", "Synthesis time / audio duration of the last utterance"),
+}
+
+
+def ollama_stats(result):
+    """Timing fields of a finished /api/generate reply, plus tokens/sec"""
+    stats = {key: result[key] for key in
+             ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "total_duration")
+             if key in result}
+    if stats.get("eval_count") and stats.get("eval_duration"):
+        stats["tokens_per_second"] = round(stats["eval_count"] / (stats["eval_duration"] / 1e9), 2)
+    return stats
+
+
+class Span:
+    """One timed stage; attributes can be added while it runs"""
+
+    def __init__(self, tracer, name, turn, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.turn = turn
+        self.attrs = attrs
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def mark(self, name):
+        """Record <name>_ms since the span started (first call only)"""
+        self.attrs.setdefault(f"{name}_ms", round((time.perf_counter() - self.start) * 1000, 2))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, time.perf_counter() - self.start)
+        return False
+
+
+class Tracer:
+    """Collects spans into a JSONL trace and in-memory metrics"""
+
+    def __init__(self, path=None, labels=None):
+        self.path = path
+        self.labels = labels or {}  # Added to every span (model, voice, ...)
+        self.lock = threading.Lock()
+        self.turn = 0
+        self.file = open(path, "a", encoding="utf-8") if path else None
+        self.durations = defaultdict(lambda: [0] * (len(BUCKETS) + 1))  # stage -> bucket counts
+        self.sums = defaultdict(float)
+        self.values = {}  # metric name -> counter total / last gauge value
+        self.server = None
+
+    def begin_turn(self):
+        """Start a new turn; later spans are tagged with its number"""
+        with self.lock:
+            self.turn += 1
+            return self.turn
+
+    def span(self, name, **attrs):
+        return Span(self, name, self.turn, attrs)
+
+    def _finish(self, span, seconds):
+        record = {
+            "turn": span.turn,
+            "span": span.name,
+            "start": round(span.start_time, 6),
+            "duration_ms": round(seconds * 1000, 2),
+        }
+        record.update(self.labels)
+        record.update(span.attrs)
+        with self.lock:
+            counts = self.durations[span.name]
+            counts[next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))] += 1
+            self.sums[span.name] += seconds
+            for attr, (metric, kind, _) in METRIC_ATTRS.items():
+                value = span.attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    self.values[metric] = self.values.get(metric, 0) + value if kind == "counter" else value
+            if self.file:
+                self.file.write(json.dumps(record) + "\n")
+                self.file.flush()
+
+    # -- Prometheus ------------------------------------------------------
+
+    def metrics_text(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP voice_stage_seconds Duration of each stage of a turn",
+            "# TYPE voice_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage, counts in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, counts):
+                    cumulative += count
+                    lines.append(f'voice_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'voice_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+                lines.append(f'voice_stage_seconds_sum{{stage="{stage}"}} {self.sums[stage]:.6f}')
+                lines.append(f'voice_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+            for metric, kind, help_text in METRIC_ATTRS.values():
+                if metric in self.values:
+                    lines.append(f"# HELP {metric} {help_text}")
+                    lines.append(f"# TYPE {metric} {kind}")
+                    lines.append(f"{metric} {self.values[metric]}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port, host="127.0.0.1"):
+        """Expose GET /metrics on a background thread"""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.metrics_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+def summarize(path):
+    """Per-stage latency and per-model speed from a trace file"""
+    stages = defaultdict(list)
+    speed = defaultdict(list)  # model -> tokens/sec
+    rtf = defaultdict(list)  # voice -> real-time factor
+    context = defaultdict(lambda: [0, 0])  # model -> [replies, replies without a carried context]
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            stages[record["span"]].append(record["duration_ms"])
+            if record["span"] == "llm" and record.get("backend") == "ollama":
+                context[record.get("model", "?")][0] += 1
+                context[record.get("model", "?")][1] += record.get("context_lost", 0)
+            if record.get("tokens_per_second") is not None:
+                speed[record.get("model", "?")].append(record["tokens_per_second"])
+            if "rtf" in record:
+                rtf[record.get("voice", "?")].append(record["rtf"])
+    return stages, speed, rtf, context
+
+
+def percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Usage: python3 telemetry.py trace.jsonl")
+        sys.exit(1)
+    stages, speed, rtf, context = summarize(sys.argv[1])
+    print(f"{'stage (ms)':<20}{'p50':>9}{'p95':>9}{'n':>6}")
+    for name, values in stages.items():
+        print(f"{name:<20}{percentile(values, 50):>9.1f}{percentile(values, 95):>9.1f}{len(values):>6}")
+    for model, values in speed.items():
+        print(f"🤖 {model}: {sum(values) / len(values):.1f} tokens/sec (n={len(values)})")
+    for model, (replies, lost) in context.items():
+        if lost:
+            print(f"🤖 {model}: {lost} of {replies} replies stopped before the final chunk "
+                  f"(no context carried, full prompt next turn)")
+    for voice, values in rtf.items():
+        print(f"🔊 {voice}: real-time factor {sum(values) / len(values):.3f} (n={len(values)})")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for synthesized speech
+- Key: hash of (text, model, speaker, rate)
+- In-memory LRU for hot phrases
+- Size-bounded on-disk tier that survives restarts
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(os.getenv("JARVIS_TTS_CACHE", Path.home() / ".cache" / "jarvis_voice"))
+
+
+class SynthesisCache:
+    """Two-tier (memory + disk) cache of WAV bytes"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_items=64, disk_max_bytes=200 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.disk_bytes = 0
+        if self.disk_max_bytes:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self.disk_bytes = sum(f.stat().st_size for f in self.cache_dir.glob("*.wav"))
+            except OSError as e:
+                print(f"⚠️  TTS disk cache disabled: {e}")
+                self.disk_max_bytes = 0
+
+    @staticmethod
+    def make_key(text, model, speaker, rate):
+        """Content address for one utterance"""
+        raw = json.dumps([text.strip(), model, speaker, rate], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.wav"
+
+    def _remember(self, key, data):
+        """Insert into the memory LRU (caller holds the lock)"""
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Return cached WAV bytes or None"""
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return data
+
+            if self.disk_max_bytes:
+                path = self._path(key)
+                try:
+                    data = path.read_bytes()
+                    os.utime(path)  # mtime doubles as the disk LRU clock
+                except OSError:
+                    data = None
+                if data is not None:
+                    self._remember(key, data)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return data
+
+            self.misses += 1
+            return None
+
+    def contains(self, key):
+        """Check for an entry without touching the counters"""
+        with self.lock:
+            return key in self.memory or (bool(self.disk_max_bytes) and self._path(key).exists())
+
+    def put(self, key, data):
+        """Store WAV bytes in both tiers"""
+        with self.lock:
+            self._remember(key, data)
+            if not self.disk_max_bytes or len(data) > self.disk_max_bytes:
+                return
+            path = self._path(key)
+            try:
+                old_size = path.stat().st_size if path.exists() else 0
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                self.disk_bytes += len(data) - old_size
+            except OSError as e:
+                print(f"⚠️  Could not write TTS cache entry: {e}")
+                return
+            if self.disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used files until under the size limit"""
+        files = []
+        for f in self.cache_dir.glob("*.wav"):
+            try:
+                stat = f.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, f))
+        files.sort()
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, f in files:
+            if self.disk_bytes <= self.disk_max_bytes:
+                break
+            try:
+                f.unlink()
+                self.disk_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counters and sizes"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_bytes": self.disk_bytes,
+            }
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Text-to-speech engines and the policy that picks one per phrase
+- CoquiEngine: the Jarvis VITS voice (JarvisVoice), best quality, slowest
+- PiperEngine: Piper neural voices (pip install piper-tts, plus a .onnx
+  voice), fast on CPU
+- EspeakEngine: espeak-ng, near-instant and robotic, on every Linux box
+- SayEngine: the macOS `say` voices
+
+Every engine returns int16 samples and their sample rate, so playback
+(and barge-in) always goes through the AudioSink. Each engine keeps its
+own measured fixed overhead and real-time factor on this machine.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from audio_output import wav_to_samples
+
+HAS_PIPER = importlib.util.find_spec("piper") is not None
+
+PIPER_MODEL = os.getenv("PIPER_MODEL", "models/piper/en_GB-alan-medium.onnx")
+WORDS_PER_SECOND = 2.6  # Speaking rate used to guess how long a phrase will sound
+CALIBRATION_PHRASES = [
+    "Okay.",
+    "Good evening. All systems are running normally, and the weather looks clear for the rest of the day.",
+]
+
+
+def estimated_audio_seconds(text):
+    """Rough spoken length of text"""
+    return 0.3 + len(text.split()) / WORDS_PER_SECOND
+
+
+class TTSEngine:
+    """
+    Base class for speech engines.
+
+    synthesize(text) -> (int16 samples, sample_rate), timed. estimate(text)
+    predicts the synthesis time from recent calls (overhead + rtf * audio);
+    default_overhead / default_rtf are used until there are measurements.
+    """
+
+    name = "base"
+    quality = 0  # Higher sounds better; preferred whenever it fits the latency budget
+    default_overhead = 0.05
+    default_rtf = 0.1
+
+    def __init__(self, voice=None):
+        self.voice = voice
+        self.samples = deque(maxlen=20)  # (audio_seconds, synthesis_seconds) of recent calls
+        self.calls = 0
+        self.synthesis_seconds = 0.0
+        self.audio_seconds = 0.0
+
+    def is_ready(self):
+        return True
+
+    def voices(self):
+        """Voice names this engine can use"""
+        return []
+
+    def set_voice(self, voice):
+        """Speak with voice (one of voices()) from now on"""
+        self.voice = voice
+
+    def synthesize(self, text):
+        start = time.perf_counter()
+        samples, sample_rate = self._synthesize(text)
+        seconds = time.perf_counter() - start
+        audio_seconds = len(samples) / sample_rate
+        self.samples.append((audio_seconds, seconds))
+        self.calls += 1
+        self.synthesis_seconds += seconds
+        self.audio_seconds += audio_seconds
+        return samples, sample_rate
+
+    def _synthesize(self, text):
+        raise NotImplementedError
+
+    @property
+    def overhead_and_rtf(self):
+        """(fixed seconds per call, synthesis seconds per second of audio), fitted to recent calls"""
+        if not self.samples:
+            return self.default_overhead, self.default_rtf
+        audio, seconds = np.array(self.samples).T
+        if len(self.samples) >= 2 and audio.max() - audio.min() > 1.0:
+            rtf, overhead = np.polyfit(audio, seconds, 1)
+            return max(0.0, float(overhead)), max(0.0, float(rtf))
+        # All calls about the same length: can't tell overhead from speed
+        return min(self.default_overhead, float(seconds.mean())), float(seconds.sum() / audio.sum())
+
+    def estimate(self, text):
+        """Predicted seconds to synthesize text"""
+        overhead, rtf = self.overhead_and_rtf
+        return overhead + rtf * estimated_audio_seconds(text)
+
+    def calibrate(self, phrases=CALIBRATION_PHRASES):
+        """Measure on a short and a long phrase"""
+        for phrase in phrases:
+            self.synthesize(phrase)
+        return self.stats()
+
+    def stats(self):
+        overhead, rtf = self.overhead_and_rtf
+        return {"engine": self.name, "voice": self.voice, "calls": self.calls,
+                "overhead_ms": round(overhead * 1000, 1), "rtf": round(rtf, 3),
+                "measured": bool(self.samples)}
+
+
+class CoquiEngine(TTSEngine):
+    """The Jarvis VITS model, through JarvisVoice (and its synthesis cache)"""
+
+    name = "jarvis"
+    quality = 3
+    default_overhead = 0.1
+    default_rtf = 0.4
+
+    def __init__(self, jarvis):
+        super().__init__(jarvis.speaker)
+        self.jarvis = jarvis
+
+    def is_ready(self):
+        return bool(self.jarvis.use_coqui and self.jarvis.tts)
+
+    def voices(self):
+        return list(getattr(self.jarvis.tts, "speakers", None) or []) if self.is_ready() else []
+
+    def estimate(self, text):
+        return 0.0 if self.jarvis._is_cached(text) else super().estimate(text)
+
+    def synthesize(self, text):
+        if self.jarvis._is_cached(text):
+            return wav_to_samples(self.jarvis.synthesize(text))  # Not a measurement of the model
+        return super().synthesize(text)
+
+    def _synthesize(self, text):
+        return wav_to_samples(self.jarvis.synthesize(text))
+
+
+class PiperEngine(TTSEngine):
+    """Piper voice kept loaded in memory (piper-tts 1.3+ API)"""
+
+    name = "piper"
+    quality = 2
+    default_overhead = 0.03
+    default_rtf = 0.08
+
+    def __init__(self, voice=PIPER_MODEL):
+        if not HAS_PIPER:
+            raise RuntimeError("piper-tts is not installed (pip install piper-tts)")
+        if not Path(voice).exists():
+            raise RuntimeError(f"Piper voice not found: {voice} "
+                               "(python3 -m piper.download_voices --download-dir models/piper en_GB-alan-medium)")
+        super().__init__(voice)
+        from piper import PiperVoice
+        self.model = PiperVoice.load(voice)
+
+    def voices(self):
+        return sorted(str(p) for p in Path(self.voice).parent.glob("*.onnx"))
+
+    def set_voice(self, voice):
+        """Load the other voice model; the old one keeps speaking until it's ready"""
+        from piper import PiperVoice
+        model = PiperVoice.load(voice)
+        self.model, self.voice = model, voice
+        self.samples.clear()  # Another model, another speed
+
+    def _synthesize(self, text):
+        model = self.model
+        chunks = list(model.synthesize(text))
+        if not chunks:
+            return np.zeros(0, dtype=np.int16), model.config.sample_rate
+        return np.concatenate([chunk.audio_int16_array for chunk in chunks]), chunks[0].sample_rate
+
+
+class EspeakEngine(TTSEngine):
+    """espeak-ng (or espeak) writing WAV to stdout"""
+
+    name = "espeak"
+    quality = 1
+    default_overhead = 0.03
+    default_rtf = 0.02
+
+    def __init__(self, voice="en-gb", rate=175):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed (apt install espeak-ng)")
+        super().__init__(voice)
+        self.rate = rate
+
+    def voices(self):
+        result = subprocess.run([self.binary, "--voices=en"], capture_output=True, text=True)
+        return [line.split()[1] for line in result.stdout.splitlines()[1:] if line.strip()]
+
+    def _synthesize(self, text):
+        result = subprocess.run([self.binary, "-v", self.voice, "-s", str(self.rate), "--stdout", text],
+                                capture_output=True, check=True)
+        return wav_to_samples(result.stdout)
+
+
+class SayEngine(TTSEngine):
+    """macOS `say`, rendered to a WAV file instead of the speakers"""
+
+    name = "say"
+    quality = 2
+    default_overhead = 0.15
+    default_rtf = 0.05
+
+    def __init__(self, voice="Daniel", rate=190):
+        if sys.platform != "darwin" or not shutil.which("say"):
+            raise RuntimeError("`say` is only available on macOS")
+        super().__init__(voice)
+        self.rate = rate
+
+    def voices(self):
+        result = subprocess.run(["say", "-v", "?"], capture_output=True, text=True)
+        return [line.split()[0] for line in result.stdout.splitlines() if line.strip()]
+
+    def _synthesize(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "say.wav"
+            subprocess.run(["say", "-v", self.voice, "-r", str(self.rate), "-o", str(path),
+                            "--file-format=WAVE", "--data-format=LEI16@22050", text], check=True)
+            return wav_to_samples(path.read_bytes())
+
+
+ENGINES = {
+    "piper": PiperEngine,
+    "espeak": EspeakEngine,
+    "say": SayEngine,
+}
+
+
+def create_engines(names=("piper", "espeak", "say"), **kwargs):
+    """
+    Create the named lightweight engines, skipping the ones that aren't
+    installed. kwargs maps an engine name to its constructor arguments.
+    """
+    engines = []
+    for name in names:
+        try:
+            engines.append(ENGINES[name](**kwargs.get(name, {})))
+        except Exception as e:
+            if name != "say" or sys.platform == "darwin":
+                print(f"⚠️  {name} TTS unavailable: {e}")
+    return engines
+
+
+class EngineSelector:
+    """
+    Picks the engine for a phrase.
+
+    - short phrases (up to short_words words, e.g. acknowledgements) go to
+      the fastest engine - unless they are already cached
+    - otherwise the best-sounding engine whose estimated synthesis time
+      fits latency_budget seconds (None: no limit)
+    - if none fits, the fastest one
+    """
+
+    def __init__(self, engines, latency_budget=2.0, short_words=3):
+        self.engines = list(engines)
+        self.latency_budget = latency_budget
+        self.short_words = short_words
+        self.choices = {}  # engine name -> times chosen
+
+    def ready(self, exclude=()):
+        return [e for e in self.engines if e not in exclude and e.is_ready()]
+
+    def fastest(self, text, exclude=()):
+        ready = self.ready(exclude)
+        return min(ready, key=lambda e: (e.estimate(text), -e.quality)) if ready else None
+
+    def choose(self, text, short=True):
+        """Engine for text; short=False ignores the short-phrase rule (the rest of a reply follows)"""
+        ready = self.ready()
+        if not ready:
+            return None
+        fastest = self.fastest(text)
+        if short and len(text.split()) <= self.short_words:
+            engine = fastest
+        else:
+            fitting = [e for e in ready
+                       if self.latency_budget is None or e.estimate(text) <= self.latency_budget]
+            engine = max(fitting, key=lambda e: e.quality) if fitting else fastest
+        self.choices[engine.name] = self.choices.get(engine.name, 0) + 1
+        return engine
+
+    def stats(self):
+        return {"latency_budget": self.latency_budget, "choices": dict(self.choices),
+                "engines": [e.stats() for e in self.engines]}
+
+
+def main():
+    """Measure overhead and real-time factor of every engine on this machine"""
+    import argparse
+    from jarvis_voice import JarvisVoice
+
+    parser = argparse.ArgumentParser(description="Measure TTS engines on this machine")
+    parser.add_argument("--engines", nargs="+", default=["jarvis", "piper", "espeak", "say"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = create_engines([name for name in args.engines if name != "jarvis"])
+    if "jarvis" in args.engines:
+        jarvis = JarvisVoice(use_cache=False, background=False, engines=())
+        if jarvis.wait_until_ready():
+            engines.insert(0, CoquiEngine(jarvis))
+    if not engines:
+        print("❌ No TTS engine available")
+        sys.exit(1)
+
+    print(f"\n{'engine':<10}{'overhead ms':>12}{'rtf':>8}{'short (2 words)':>17}{'sentence':>10}{'reply':>8}")
+    texts = ["Yes, sir.", CALIBRATION_PHRASES[1], " ".join(CALIBRATION_PHRASES[1:] * 3)]
+    for engine in engines:
+        engine.synthesize("Warming up.")
+        engine.samples.clear()
+        for _ in range(args.repeat):
+            engine.calibrate()
+        stats = engine.stats()
+        predicted = [engine.estimate(text) * 1000 for text in texts]
+        print(f"{engine.name:<10}{stats['overhead_ms']:>12.0f}{stats['rtf']:>8.3f}"
+              f"{predicted[0]:>15.0f}ms{predicted[1]:>8.0f}ms{predicted[2]:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
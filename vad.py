@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Voice activity detection
+Classifies short frames (10-30 ms) as speech / non-speech so an utterance
+can be closed as soon as the speaker stops, and noise never reaches STT.
+
+- EnergyVAD: NumPy, vectorized over whole buffers; log energy against an
+  adaptive noise floor plus a zero-crossing-rate check
+- the live noise floor is a low percentile of the last few seconds of
+  frames, speech included (minimum statistics), so it follows a fan or
+  air conditioner switching on instead of calling it speech forever
+- WebRtcVAD: Google's WebRTC VAD (pip install webrtcvad), same interface
+"""
+
+import bisect
+from collections import deque
+
+import numpy as np
+
+try:
+    import webrtcvad
+    HAS_WEBRTCVAD = True
+except ImportError:
+    HAS_WEBRTCVAD = False
+
+
+def to_samples(audio):
+    """int16 bytes or array -> float32 array"""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = np.frombuffer(audio, dtype=np.int16)
+    return np.asarray(audio, dtype=np.float32)
+
+
+def frame_signal(samples, frame_samples):
+    """Split samples into a (n_frames, frame_samples) view, dropping the tail"""
+    n_frames = len(samples) // frame_samples
+    return samples[:n_frames * frame_samples].reshape(n_frames, frame_samples)
+
+
+class EnergyVAD:
+    """
+    Energy + zero-crossing VAD.
+
+    A frame is speech when its energy is energy_ratio_db above the noise
+    floor and its zero-crossing rate is below zcr_max (broadband hiss and
+    clicks cross zero far more often than voiced speech).
+    """
+
+    name = "energy"
+
+    def __init__(self, sample_rate=16000, frame_ms=30, energy_ratio_db=9.0, zcr_max=0.35,
+                 min_energy_db=35.0, hangover_ms=300, min_speech_ms=150, noise_window_ms=5000,
+                 noise_percentile=10):
+        if frame_ms not in (10, 20, 30):
+            raise ValueError("frame_ms must be 10, 20 or 30")
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.energy_ratio_db = energy_ratio_db
+        self.zcr_max = zcr_max
+        self.min_energy_db = min_energy_db
+        self.hangover_frames = max(0, int(round(hangover_ms / frame_ms)))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+        self.noise_percentile = noise_percentile
+        self.noise_energies = deque(maxlen=max(1, int(round(noise_window_ms / frame_ms))))
+        self.noise_sorted = []  # The same energies, kept sorted for the percentile
+        self.noise_floor_db = None
+
+    # -- features --------------------------------------------------------
+
+    def features(self, samples):
+        """Per-frame energy (dB) and zero-crossing rate, vectorized"""
+        frames = frame_signal(to_samples(samples), self.frame_samples)
+        energy = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-9)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_samples - 1)
+        return energy_db, zcr
+
+    def _decide(self, energy_db, zcr, floor_db, scale_db=0.0):
+        threshold = np.maximum(floor_db + self.energy_ratio_db + scale_db, self.min_energy_db)
+        return (energy_db > threshold) & (zcr < self.zcr_max)
+
+    # -- offline (whole buffers) -----------------------------------------
+
+    def classify(self, samples):
+        """Raw speech/non-speech decision for every frame of a buffer"""
+        energy_db, zcr = self.features(samples)
+        if not len(energy_db):
+            return np.zeros(0, dtype=bool)
+        # Quietest 10% of frames approximates the noise floor of the recording
+        floor_db = np.percentile(energy_db, 10)
+        return self._decide(energy_db, zcr, floor_db)
+
+    def smooth(self, raw):
+        """Apply hangover and drop speech runs shorter than min_speech_ms"""
+        raw = np.asarray(raw, dtype=bool)
+        speech = raw.copy()
+        if self.hangover_frames and raw.any():
+            # Extend every speech frame forward by hangover_frames
+            idx = np.flatnonzero(raw)
+            gaps = np.zeros(len(raw) + 1, dtype=np.int32)
+            np.add.at(gaps, idx, 1)
+            np.add.at(gaps, np.minimum(idx + self.hangover_frames + 1, len(raw)), -1)
+            speech = np.cumsum(gaps[:-1]) > 0
+        # Remove short bursts (counted on raw speech frames inside each run)
+        for start, end in self._runs(speech):
+            if np.count_nonzero(raw[start:end]) < self.min_speech_frames:
+                speech[start:end] = False
+        return speech
+
+    @staticmethod
+    def _runs(mask):
+        """(start, end) frame index pairs of True runs"""
+        padded = np.concatenate(([False], mask, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        return list(zip(edges[::2], edges[1::2]))
+
+    def segments(self, samples):
+        """Speech segments as (start_seconds, end_seconds)"""
+        speech = self.smooth(self.classify(samples))
+        frame_seconds = self.frame_samples / self.sample_rate
+        return [(float(start * frame_seconds), float(end * frame_seconds))
+                for start, end in self._runs(speech)]
+
+    # -- streaming (one frame at a time) ---------------------------------
+
+    def track_noise(self, energy_db):
+        """
+        Add one frame's energy to the noise window, whatever it was
+        classified as, and re-estimate the floor. Pauses between words keep
+        the low percentile at the noise while someone talks; a steady new
+        noise fills the window and becomes the floor within a few seconds.
+        """
+        energy_db = float(energy_db)
+        if len(self.noise_energies) == self.noise_energies.maxlen:
+            del self.noise_sorted[bisect.bisect_left(self.noise_sorted, self.noise_energies[0])]
+        self.noise_energies.append(energy_db)
+        bisect.insort(self.noise_sorted, energy_db)
+        index = int(self.noise_percentile / 100 * (len(self.noise_sorted) - 1))
+        self.noise_floor_db = self.noise_sorted[index]
+
+    def is_speech(self, frame, scale_db=0.0):
+        """
+        Raw decision for one live frame; tracks the noise floor on every
+        frame. scale_db raises the threshold (e.g. while our own voice is
+        playing).
+        """
+        energy_db, zcr = self.features(frame)
+        if not len(energy_db):
+            return False
+        energy_db, zcr = energy_db[0], zcr[0]
+        self.track_noise(energy_db)
+        return bool(self._decide(energy_db, zcr, self.noise_floor_db, scale_db))
+
+
+class WebRtcVAD(EnergyVAD):
+    """WebRTC VAD for the per-frame decision; smoothing/segments are shared"""
+
+    name = "webrtc"
+
+    def __init__(self, sample_rate=16000, frame_ms=30, aggressiveness=2, **kwargs):
+        if not HAS_WEBRTCVAD:
+            raise RuntimeError("webrtcvad is not installed (pip install webrtcvad)")
+        if sample_rate not in (8000, 16000, 32000, 48000):
+            raise ValueError("WebRTC VAD needs 8, 16, 32 or 48 kHz audio")
+        super().__init__(sample_rate=sample_rate, frame_ms=frame_ms, **kwargs)
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def _frame_bytes(self, samples):
+        frames = frame_signal(to_samples(samples), self.frame_samples)
+        return frames.astype("<i2")
+
+    def classify(self, samples):
+        return np.array([self.vad.is_speech(frame.tobytes(), self.sample_rate)
+                         for frame in self._frame_bytes(samples)], dtype=bool)
+
+    def is_speech(self, frame, scale_db=0.0):
+        frames = self._frame_bytes(frame)
+        if not len(frames):
+            return False
+        energy_db, zcr = self.features(frames[0])
+        self.track_noise(energy_db[0])
+        speech = self.vad.is_speech(frames[0].tobytes(), self.sample_rate)
+        if speech and scale_db:
+            # WebRTC has no threshold knob; require extra energy instead
+            speech = bool(self._decide(energy_db, zcr, self.noise_floor_db, scale_db)[0])
+        return speech
+
+
+def create_vad(name="auto", **kwargs):
+    """'auto' uses WebRTC VAD when installed, the NumPy energy VAD otherwise"""
+    if name == "webrtc" or (name == "auto" and HAS_WEBRTCVAD):
+        return WebRtcVAD(**kwargs)
+    return EnergyVAD(**kwargs)
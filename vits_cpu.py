@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+CPU inference for the Jarvis VITS voice
+- intra/inter-op thread counts set once, instead of torch's defaults
+- the model called directly under torch.inference_mode(): text -> ids ->
+  waveform, without the Synthesizer's per-call speaker lookup
+- speaker ids (p227) looked up once and kept as ready-made tensors
+- or the same graph exported to ONNX and run with onnxruntime
+
+Backends: "default" (Coqui's tts(), unchanged), "torch", "onnx". The ONNX
+graph is exported on first use and kept next to the TTS cache.
+
+No int8 mode: torch's dynamic quantization only covers Linear/LSTM layers
+and VITS is all convolutions, and onnxruntime's dynamic ConvInteger ran
+4x slower than float32 (benchmarks/vits_cpu_bench.py).
+"""
+
+import os
+import time
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+from tts_cache import DEFAULT_CACHE_DIR
+
+HAS_ONNX = importlib.util.find_spec("onnx") is not None
+HAS_ONNXRUNTIME = importlib.util.find_spec("onnxruntime") is not None
+
+BACKENDS = ("default", "torch", "onnx")
+ONNX_DIR = DEFAULT_CACHE_DIR / "onnx"
+PAD_SILENCE_SAMPLES = 10000  # Silence after each sentence, as Coqui's Synthesizer adds
+
+
+def tts_threads():
+    """
+    Threads for the voice model: JARVIS_TTS_THREADS, else OMP_NUM_THREADS
+    (e.g. the share of the cores a batch.py worker was given), else up to 4
+    """
+    for var in ("JARVIS_TTS_THREADS", "OMP_NUM_THREADS"):
+        value = os.getenv(var, "").split(",")[0].strip()
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+    return min(4, os.cpu_count() or 1)
+
+
+TTS_THREADS = tts_threads()
+
+
+def set_torch_threads(threads=None, interop_threads=1):
+    """Fix torch's thread pools; the inter-op pool can only be sized before its first use"""
+    import torch
+    torch.set_num_threads(threads or tts_threads())
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        pass  # Already started (e.g. by another model in this process)
+
+
+def _waveform_module(model):
+    """(ids, lengths, speaker id) -> waveform, as a module torch.onnx can trace"""
+    import torch
+
+    class VitsWaveform(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, x, x_lengths, sid):
+            aux_input = {"x_lengths": x_lengths, "speaker_ids": sid}
+            return self.model.inference(x, aux_input=aux_input)["model_outputs"]
+
+    return VitsWaveform()
+
+
+def export_onnx(model, path):
+    """
+    Export a Coqui Vits model to ONNX. Uses the TorchScript exporter:
+    Vits.export_onnx goes through torch.export, which can't trace the
+    flows' data-dependent checks.
+    """
+    if not HAS_ONNX:
+        raise RuntimeError("onnx is not installed (pip install onnx)")
+    import torch
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".part")
+    x = torch.randint(1, model.args.num_chars, (1, 64), dtype=torch.long)
+    with torch.inference_mode():
+        torch.onnx.export(_waveform_module(model.eval()), (x, torch.tensor([64]), torch.tensor([0])),
+                          str(partial), dynamo=False, opset_version=15,
+                          input_names=["input", "input_lengths", "sid"], output_names=["output"],
+                          dynamic_axes={"input": {1: "phonemes"}, "output": {2: "samples"}})
+    partial.rename(path)
+    return path
+
+
+class VitsRunner:
+    """
+    Runs a loaded Coqui TTS (TTS.api.TTS) VITS model on the CPU.
+
+    synthesize(text) returns the float waveform like TTS.tts(): sentence by
+    sentence, trimmed the same way, with the same pause after each.
+    """
+
+    def __init__(self, tts, model_name, backend="torch", threads=None, interop_threads=1):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown TTS backend {backend!r} (one of {', '.join(BACKENDS)})")
+        self.tts = tts
+        self.synthesizer = tts.synthesizer
+        self.model = self.synthesizer.tts_model
+        self.backend = backend
+        self.threads = threads or tts_threads()  # Read when the voice loads, after any worker set-up
+        self.speaker_ids = {}  # speaker name -> id tensor (torch) or array (onnx)
+        self.session = None
+        self.load_seconds = 0.0
+
+        start = time.perf_counter()
+        if backend != "default":
+            set_torch_threads(self.threads, interop_threads)
+        if backend == "onnx":
+            self.session = self._load_session(model_name)
+        self.load_seconds = time.perf_counter() - start
+
+    def _load_session(self, model_name):
+        if not HAS_ONNXRUNTIME:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)")
+        import onnxruntime as ort
+
+        path = ONNX_DIR / (model_name.replace("/", "--") + ".onnx")
+        if not path.exists():
+            print(f"🎙️  Exporting the voice model to ONNX ({path.name}), once...")
+            export_onnx(self.model, path)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    def speaker_id(self, speaker):
+        """Id of speaker as the backend takes it, looked up once"""
+        if speaker not in self.speaker_ids:
+            import torch
+            manager = self.model.speaker_manager
+            if manager is None or not manager.name_to_id:
+                index = 0
+            elif speaker in manager.name_to_id:
+                index = manager.name_to_id[speaker]
+            else:
+                raise KeyError(f"{speaker} is not a speaker of this model")
+            self.speaker_ids[speaker] = (np.array([index], dtype=np.int64) if self.session
+                                         else torch.tensor([index], dtype=torch.long))
+        return self.speaker_ids[speaker]
+
+    def _infer(self, ids, speaker):
+        if self.session:
+            ids = np.array([ids], dtype=np.int64)
+            inputs = {"input": ids, "input_lengths": np.array([ids.shape[1]], dtype=np.int64),
+                      "sid": self.speaker_id(speaker)}
+            return self.session.run(["output"], inputs)[0].squeeze()
+        import torch
+        with torch.inference_mode():
+            x = torch.as_tensor(ids, dtype=torch.long).unsqueeze(0)
+            aux_input = {"x_lengths": torch.tensor([x.shape[1]]), "speaker_ids": self.speaker_id(speaker)}
+            return self.model.inference(x, aux_input=aux_input)["model_outputs"].squeeze().numpy()
+
+    def synthesize(self, text, speaker):
+        """Float waveform of text, at self.sample_rate"""
+        if self.backend == "default":
+            return np.asarray(self.tts.tts(text=text, speaker=speaker), dtype=np.float32)
+        audio_config = self.synthesizer.tts_config.audio
+        trim = "do_trim_silence" in audio_config and audio_config["do_trim_silence"]
+        parts = []
+        for sentence in self.synthesizer.split_into_sentences(text):
+            waveform = self._infer(self.model.tokenizer.text_to_ids(sentence), speaker)
+            if trim:
+                waveform = waveform[:self.model.ap.find_endpoint(waveform)]
+            parts += [waveform, np.zeros(PAD_SILENCE_SAMPLES, dtype=np.float32)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    @property
+    def sample_rate(self):
+        return self.synthesizer.output_sample_rate
+
+    def release_torch_weights(self):
+        """ONNX backends only: drop the torch copy of the weights (tokenizer and speakers stay)"""
+        if self.session:
+            self.model.to("meta")
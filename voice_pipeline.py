@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Full-duplex voice pipeline
+capture ─▶ speech-to-text ─▶ LLM ─▶ text-to-speech, each stage on its own thread
+
+- The microphone keeps listening while the assistant talks
+- Speech detected during a reply cancels generation and playback (barge-in)
+- A new question never waits for the previous answer to finish playing
+- Everything is spoken by the TTS stage, one phrase at a time: answers to
+  local commands are queued with say() instead of played directly
+- With open_speech, the sentences of a reply go into one speech stream, so
+  the next sentence is synthesized while the previous one plays
+"""
+
+import queue
+import threading
+from contextlib import ExitStack
+
+
+class Turn:
+    """One question/answer exchange that can be cancelled"""
+
+    def __init__(self, text):
+        self.text = text
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+
+class VoicePipeline:
+    """
+    Runs capture, recognition, generation and playback concurrently.
+
+    capture          object with open(), listen() -> audio or None, close(),
+                     and attach(on_speech_start, is_speaking), e.g. capture.CaptureSession
+    recognize        recognize(audio) -> text or None
+    respond          respond(text, on_sentence, cancel_event) -> full reply
+    speak            speak(sentence), blocks while playing
+    stop_speaking    stop_speaking() interrupts speak() and open_speech() (optional)
+    handle_command   handle_command(text) -> True if handled locally (optional)
+    open_speech      open_speech() -> context manager giving an object with
+                     put(sentence), e.g. over JarvisVoice.speech_queue(); leaving
+                     it blocks until everything put has played (optional, used
+                     instead of speak)
+    """
+
+    def __init__(self, capture, recognize, respond, speak, stop_speaking=None, handle_command=None,
+                 open_speech=None):
+        self.capture = capture
+        self.recognize = recognize
+        self.respond = respond
+        self.speak = speak
+        self.open_speech = open_speech
+        self.stop_speaking = stop_speaking or (lambda: None)
+        self.handle_command = handle_command or (lambda text: False)
+
+        self.audio_queue = queue.Queue()
+        self.text_queue = queue.Queue()
+        self.speech_queue = queue.Queue()
+        self.current_turn = None
+        self.turn_lock = threading.Lock()
+        self.speaking = threading.Event()
+        self.stopped = threading.Event()
+        self.stop_lock = threading.Lock()
+        self.closed = False
+        self.threads = []
+
+        self.capture.attach(self.barge_in, self.speaking.is_set)
+
+    # -- control ---------------------------------------------------------
+
+    def run(self):
+        """Start all stages and block until stop() (or Ctrl+C)"""
+        self.capture.open()
+        for target in (self._capture_loop, self._stt_loop, self._llm_loop, self._tts_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        try:
+            while not self.stopped.wait(0.5):
+                pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop all stages"""
+        with self.stop_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.stopped.set()
+        self.cancel_current()
+        for q in (self.audio_queue, self.text_queue, self.speech_queue):
+            q.put(None)
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1)
+        self.threads = []
+        self.capture.close()
+
+    def cancel_current(self):
+        """Cancel the in-flight turn (generation and playback)"""
+        with self.turn_lock:
+            turn = self.current_turn
+        if turn and not turn.finished.is_set():
+            turn.cancelled.set()
+            self.stop_speaking()
+            return True
+        return False
+
+    def say(self, text):
+        """
+        Speak text from any other stage (e.g. a local command's answer) through
+        the TTS stage, so it never overlaps a reply. Blocks until it has been
+        spoken or interrupted.
+        """
+        turn = Turn(text)
+        with self.turn_lock:
+            self.current_turn = turn  # Talking over it interrupts it like a reply
+        self.speech_queue.put((turn, text))
+        self.speech_queue.put((turn, None))
+        while not turn.finished.wait(0.1):
+            if self.stopped.is_set():
+                break
+
+    def barge_in(self):
+        """Called by the capture stage when the user starts talking"""
+        if self.cancel_current():
+            print("✋ Interrupted")
+
+    # -- stages ----------------------------------------------------------
+
+    def _capture_loop(self):
+        while not self.stopped.is_set():
+            try:
+                audio = self.capture.listen()
+            except Exception as e:
+                if self.stopped.is_set():
+                    break
+                print(f"❌ Capture error: {e}")
+                continue
+            if audio is not None:
+                self.audio_queue.put(audio)
+
+    def _stt_loop(self):
+        while True:
+            audio = self.audio_queue.get()
+            if audio is None or self.stopped.is_set():
+                break
+            text = self.recognize(audio)
+            if not text:
+                continue
+            # A new question replaces whatever is still being answered
+            self.cancel_current()
+            if self.handle_command(text):
+                continue
+            self.text_queue.put(text)
+
+    def _llm_loop(self):
+        while True:
+            text = self.text_queue.get()
+            if text is None or self.stopped.is_set():
+                break
+            turn = Turn(text)
+            with self.turn_lock:
+                self.current_turn = turn
+            spoken = []
+
+            def on_sentence(sentence):
+                if not turn.cancelled.is_set():
+                    spoken.append(sentence)
+                    self.speech_queue.put((turn, sentence))
+
+            reply = self.respond(text, on_sentence, turn.cancelled)
+            # Non-streamed replies and error messages arrive all at once
+            if not spoken and reply and not turn.cancelled.is_set():
+                self.speech_queue.put((turn, reply))
+            self.speech_queue.put((turn, None))
+
+    def _tts_loop(self):
+        speech = None  # (turn, ExitStack, stream) of the reply being spoken
+        try:
+            while True:
+                item = self.speech_queue.get()
+                if item is None:
+                    break
+                turn, sentence = item
+                if speech and speech[0] is not turn:
+                    self._finish_speech(*speech)  # Another turn (say()) took over
+                    speech = None
+                if sentence is None:
+                    if speech:
+                        self._finish_speech(*speech)
+                        speech = None
+                    turn.finished.set()
+                    continue
+                if turn.cancelled.is_set():
+                    continue
+                self.speaking.set()
+                if self.open_speech is None:
+                    try:
+                        self.speak(sentence)
+                    finally:
+                        self.speaking.clear()
+                    continue
+                if speech is None:
+                    stack = ExitStack()
+                    speech = (turn, stack, stack.enter_context(self.open_speech()))
+                speech[2].put(sentence)
+        finally:
+            if speech:
+                self._finish_speech(*speech)
+
+    def _finish_speech(self, turn, stack, stream):
+        """Let a reply's speech stream play out; a cancelled one is stopped first"""
+        try:
+            if turn.cancelled.is_set():
+                self.stop_speaking()
+            stack.close()
+        except Exception as e:
+            print(f"❌ TTS error: {e}")
+        finally:
+            self.speaking.clear()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Always-on wake-word detection
+Runs on the capture thread, on the same frames CaptureSession keeps in
+its ring buffer, and decides when the assistant should listen to the
+next utterance - background chatter never reaches STT or the LLM.
+
+- TemplateWakeWord: NumPy, no model download; MFCC frames of a few
+  enrolled recordings of your wake phrase matched by subsequence DTW
+- OpenWakeWord: openWakeWord's pre-trained models, e.g. "hey_jarvis"
+  (pip install openwakeword), same interface
+
+Both only run while the VAD hears speech (plus a short pre-roll), so a
+quiet room costs next to nothing.
+"""
+
+import sys
+import time
+import wave
+import argparse
+import importlib.util
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from vad import EnergyVAD, to_samples
+
+HAS_OPENWAKEWORD = importlib.util.find_spec("openwakeword") is not None
+
+
+def mel_filterbank(sample_rate, n_fft, n_mels, fmin=100.0, fmax=None):
+    """(n_mels, n_fft // 2 + 1) triangular mel filters"""
+    fmax = fmax or sample_rate / 2
+    mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)  # noqa: E731
+    edges = 700.0 * (10 ** (np.linspace(mel(fmin), mel(fmax), n_mels + 2) / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class MFCC:
+    """MFCCs (without c0, so gain doesn't matter) of fixed-size frames, unit length"""
+
+    def __init__(self, sample_rate=16000, frame_samples=480, n_mels=24, n_ceps=12):
+        self.n_fft = 1 << (frame_samples - 1).bit_length()
+        self.window = np.hamming(frame_samples).astype(np.float32)
+        self.filters = mel_filterbank(sample_rate, self.n_fft, n_mels)
+        k = np.arange(n_mels)
+        self.dct = np.cos(np.pi / n_mels * (k[None, :] + 0.5) * np.arange(1, n_ceps + 1)[:, None]).astype(np.float32)
+
+    def __call__(self, frames):
+        """(n, frame_samples) float samples -> (n, n_ceps)"""
+        spectrum = np.abs(np.fft.rfft(frames * self.window, self.n_fft)) ** 2
+        ceps = np.log(spectrum @ self.filters.T + 1e-3) @ self.dct.T
+        return ceps / (np.linalg.norm(ceps, axis=1, keepdims=True) + 1e-9)
+
+
+def dtw_distance(template, window, ends=None):
+    """
+    Lowest average cosine distance of the template against any stretch of
+    the window (0 = identical); with ends, only stretches ending in the
+    last `ends` frames count. Each template frame advances the window by
+    0, 1 or 2 frames, so speaking up to twice as fast or slow still matches.
+    """
+    cost = 1.0 - template @ window.T
+    total = cost[0].copy()
+    for row in cost[1:]:
+        best = total.copy()
+        best[1:] = np.minimum(best[1:], total[:-1])
+        best[2:] = np.minimum(best[2:], total[:-2])
+        total = row + best
+    return float(total[-ends if ends else 0:].min() / len(template))
+
+
+class WakeWordDetector:
+    """
+    Base class: VAD gating, refractory period and CPU accounting.
+
+    process(frame, is_speech) is called for every capture frame and
+    returns True on the frame where the wake word ends. Subclasses
+    implement _feed(frame) -> True/False and reset().
+    """
+
+    name = "base"
+
+    def __init__(self, sample_rate=16000, frame_samples=480, preroll_ms=300, idle_ms=1000,
+                 refractory_ms=1500):
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        frame_ms = 1000.0 * frame_samples / sample_rate
+        self.recent = deque(maxlen=max(1, int(preroll_ms / frame_ms)))
+        self.idle_frames = int(idle_ms / frame_ms)
+        self.refractory_frames = int(refractory_ms / frame_ms)
+        self.idle = self.idle_frames + 1
+        self.cooldown = 0
+        self.last_score = None
+        self.frames = 0  # Frames seen
+        self.active_frames = 0  # Frames the model actually ran on
+        self.detections = 0
+        self.cpu_seconds = 0.0
+
+    def process(self, frame, is_speech):
+        start = time.thread_time()
+        self.frames += 1
+        self.cooldown = max(0, self.cooldown - 1)
+        self.idle = 0 if is_speech else self.idle + 1
+        detected = False
+        if self.idle > self.idle_frames:
+            # Nothing said for a while: keep a pre-roll, skip the model
+            self.recent.append(frame)
+        else:
+            if self.recent:
+                # Speech onset: catch up on the audio just before it
+                self.reset()
+                backlog = list(self.recent)
+                self.recent.clear()
+                for pending in backlog:
+                    self._feed(pending)
+                self.active_frames += len(backlog)
+            self.active_frames += 1
+            if self._feed(frame) and not self.cooldown:
+                detected = True
+                self.detections += 1
+                self.cooldown = self.refractory_frames
+        self.cpu_seconds += time.thread_time() - start
+        return detected
+
+    def cpu_percent(self):
+        """CPU time as a share of one core, over the audio seen so far"""
+        seconds = self.frames * self.frame_samples / self.sample_rate
+        return 100.0 * self.cpu_seconds / seconds if seconds else 0.0
+
+    def reset(self):
+        pass
+
+    def _feed(self, frame):
+        raise NotImplementedError
+
+
+class TemplateWakeWord(WakeWordDetector):
+    """
+    Matches the last couple of seconds against enrolled recordings of the
+    wake phrase. Features are computed every half frame; DTW runs every
+    `stride` frames. Without a threshold it is derived from how much the
+    recordings differ from each other.
+    """
+
+    name = "template"
+
+    def __init__(self, templates, threshold=None, stride=2, **kwargs):
+        super().__init__(**kwargs)
+        self.mfcc = MFCC(self.sample_rate, self.frame_samples)
+        self.templates = [self._template(samples) for samples in templates]
+        if not self.templates:
+            raise ValueError("at least one wake word recording is needed")
+        if threshold is None:
+            threshold = 0.15
+            if len(self.templates) > 1:
+                pairs = [dtw_distance(a, b) for a in self.templates for b in self.templates if a is not b]
+                threshold = min(0.35, max(0.12, 2 * max(pairs)))
+        self.threshold = threshold
+        self.stride = stride
+        self.window = deque(maxlen=2 * max(len(t) for t in self.templates))
+        self.previous = np.zeros(self.frame_samples, dtype=np.float32)
+        self.since_check = 0
+
+    @classmethod
+    def from_wavs(cls, paths, **kwargs):
+        templates = []
+        for path in paths:
+            with wave.open(str(path), "rb") as wav:
+                if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                    raise ValueError(f"{path}: expected 16-bit mono")
+                if wav.getframerate() != kwargs.setdefault("sample_rate", wav.getframerate()):
+                    raise ValueError(f"{path}: expected {kwargs['sample_rate']} Hz")
+                templates.append(wav.readframes(wav.getnframes()))
+        return cls(templates, **kwargs)
+
+    @classmethod
+    def from_dir(cls, directory, **kwargs):
+        paths = sorted(Path(directory).glob("*.wav"))
+        if not paths:
+            raise ValueError(f"no wake word recordings (*.wav) in {directory}")
+        return cls.from_wavs(paths, **kwargs)
+
+    def _frames(self, samples):
+        """Half-overlapping frames, as _feed sees them"""
+        half = self.frame_samples // 2
+        n = (len(samples) - self.frame_samples) // half + 1
+        return np.stack([samples[i * half:i * half + self.frame_samples] for i in range(max(0, n))])
+
+    def _template(self, audio):
+        """MFCCs of the spoken part of a recording"""
+        samples = to_samples(audio)
+        vad = EnergyVAD(sample_rate=self.sample_rate, frame_ms=round(1000 * self.frame_samples / self.sample_rate))
+        segments = vad.segments(samples)
+        if segments:
+            start = max(0, int((segments[0][0] - 0.05) * self.sample_rate))
+            samples = samples[start:int((segments[-1][1] + 0.05) * self.sample_rate)]
+        if len(samples) < 4 * self.frame_samples:
+            raise ValueError("wake word recording is too short")
+        return self.mfcc(self._frames(samples))
+
+    def reset(self):
+        self.window.clear()
+        self.previous[:] = 0
+        self.since_check = 0
+
+    def _feed(self, frame):
+        samples = to_samples(frame)
+        half = self.frame_samples // 2
+        pair = np.stack([np.concatenate([self.previous[half:], samples[:half]]), samples])
+        self.previous = samples
+        self.window.extend(self.mfcc(pair))
+        self.since_check += 1
+        if self.since_check < self.stride or len(self.window) < len(self.templates[0]) // 2:
+            return False
+        self.since_check = 0
+        window = np.array(self.window)
+        # Only the newest frames can end a match; older ends were checked before
+        self.last_score = min(dtw_distance(t, window, ends=2 * self.stride) for t in self.templates)
+        return self.last_score < self.threshold
+
+
+class OpenWakeWord(WakeWordDetector):
+    """openWakeWord model (16 kHz, scored every 80 ms)"""
+
+    name = "openwakeword"
+    chunk_samples = 1280
+
+    def __init__(self, model="hey_jarvis", threshold=0.5, **kwargs):
+        if not HAS_OPENWAKEWORD:
+            raise RuntimeError("openwakeword is not installed (pip install openwakeword)")
+        super().__init__(**kwargs)
+        if self.sample_rate != 16000:
+            raise ValueError("openWakeWord needs 16 kHz audio")
+        from openwakeword.model import Model
+        self.model = Model(wakeword_models=[model])
+        self.threshold = threshold
+        self.pending = np.zeros(0, dtype=np.int16)
+
+    def reset(self):
+        self.model.reset()
+        self.pending = np.zeros(0, dtype=np.int16)
+
+    def _feed(self, frame):
+        self.pending = np.concatenate([self.pending, np.frombuffer(frame, dtype=np.int16)])
+        detected = False
+        while len(self.pending) >= self.chunk_samples:
+            chunk, self.pending = self.pending[:self.chunk_samples], self.pending[self.chunk_samples:]
+            self.last_score = max(self.model.predict(chunk).values())
+            detected = detected or self.last_score >= self.threshold
+        return detected
+
+
+def create_wake_word(spec, **kwargs):
+    """
+    A directory of WAV recordings of the wake phrase -> TemplateWakeWord,
+    anything else is taken as an openWakeWord model name ("hey_jarvis").
+    """
+    if Path(spec).is_dir():
+        return TemplateWakeWord.from_dir(spec, **kwargs)
+    return OpenWakeWord(model=spec, **kwargs)
+
+
+def attach_wake_word(session, spec, awake_seconds=8.0):
+    """
+    Gate a CaptureSession behind the wake word. Returns the detector, or
+    None (and the session keeps listening to everything) if it can't load.
+    """
+    try:
+        detector = create_wake_word(spec, sample_rate=session.sample_rate, frame_samples=session.frame_samples)
+    except Exception as e:
+        print(f"⚠️  Wake word unavailable, listening to everything: {e}")
+        return None
+    session.set_wake_word(detector, on_wake=lambda: print("\r\033[K👂 Yes?"), awake_seconds=awake_seconds)
+    return detector
+
+
+def main():
+    """Record wake word templates, or try detection live"""
+    from capture import CaptureSession
+
+    parser = argparse.ArgumentParser(description="Wake word enrollment and live test")
+    parser.add_argument("spec", help="directory of recordings, or an openWakeWord model name")
+    parser.add_argument("--enroll", type=int, default=0, metavar="N", help="record N examples into spec first")
+    args = parser.parse_args()
+
+    session = CaptureSession()
+    session.open()
+    if args.enroll:
+        directory = Path(args.spec)
+        directory.mkdir(parents=True, exist_ok=True)
+        start = len(list(directory.glob("*.wav")))
+        for i in range(args.enroll):
+            print(f"🎤 Say the wake phrase ({i + 1}/{args.enroll})...")
+            audio = session.listen(timeout=None)
+            path = directory / f"wake_{start + i + 1:02d}.wav"
+            with open(path, "wb") as f:
+                f.write(audio.get_wav_data())
+            print(f"💾 Saved {path}")
+
+    try:
+        detector = create_wake_word(args.spec, sample_rate=session.sample_rate,
+                                    frame_samples=session.frame_samples)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    session.set_wake_word(detector, on_wake=lambda: print(f"👂 Wake word! (score {detector.last_score:.2f})"))
+    print(f"👂 Listening for the wake word ({detector.name}), Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   CPU {detector.cpu_percent():.2f}% of a core, model active "
+                  f"{100 * detector.active_frames / max(1, detector.frames):.0f}% of the time")
+    except KeyboardInterrupt:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()